@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# ORTS-AssetFootprint - list the shape and texture data loaded by the engines, wagons and consists, in CSV format
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - For each engine, wagon and consist: the number and size of the shape files (wagon shape, freight animations), and
+#   of the texture files of these shapes; the texture pixels, and the estimated texture memory. See
+#   ortsTools.assetFootprints().
+# - The texture memory is estimated from the header of the texture file (width, height, surface format, mipmaps); only
+#   the header is read (memory-mapped). OpenRails uses the .dds instead of the .ace, if there is one.
+# - Each shape and texture is counted once per row: a consist of 40 identical wagons counts the shape of the wagon once.
+# - The rows are sorted by the estimated texture memory (largest first), or by the column of --sort.
+# - Binary shape files are not supported; their textures are not counted (they are counted in the summary).
+#
+
+import argparse
+import collections
+import os
+import pathlib
+import sys
+
+import ortsTools
+
+numWarn = 0
+
+# the columns to sort by
+sortKeys = {'memory': lambda row : row.textureMemory, 'textures': lambda row : row.textureBytes,
+            'shapes': lambda row : row.shapeBytes, 'pixels': lambda row : row.texturePixels}
+
+
+### print a warning and count it
+def warn( *args) :
+    global numWarn
+    numWarn += 1
+    print( "Warning:", *args, file=sys.stderr)
+
+
+### main
+parser = argparse.ArgumentParser( description='List the shape and texture data (files, sizes, estimated texture memory) '
+                                               'loaded by the engines, wagons and consists, in CSV format.')
+parser.add_argument( 'dirPath', type=pathlib.Path, help='Route folder (or ROUTES folder), for the consists used by its services '
+                     'and their engines and wagons. Or content folder, for all its consists, engines and wagons.')
+parser.add_argument( '-s', '--sort', choices=sortKeys.keys(), default='memory',
+                     help='Sort by texture memory, texture size, shape size or texture pixels, largest first. Default is memory.')
+parser.add_argument( '-t', '--type', choices=['Engine', 'Wagon', 'Consist'], action='append',
+                     help='Only list this type of row. May be repeated.')
+parser.add_argument( '--jobs', type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                     help='Number of files read in parallel.')
+parser.add_argument( '-v', '--verbose', action='count', default=0)
+args = parser.parse_args()
+dirPath = args.dirPath
+verbose = args.verbose
+
+if not dirPath.is_dir() :
+    print( "Error: {} is not a directory.".format(args.dirPath), file=sys.stderr)
+    sys.exit(1)
+
+stats = collections.Counter()
+rows = [row for row in ortsTools.assetFootprints( dirPath, warn, stats, args.jobs, verbose) if not args.type or row.type in args.type]
+rows.sort( key=sortKeys[args.sort], reverse=True)
+
+print( ortsTools.footprintHeading)
+for row in rows :
+    print( ortsTools.formatFootprintRow( row))
+
+print( 'Processed {} consists, {} engines, {} wagons; read {} shapes, {} texture headers; generated {} warnings.'.format(
+       stats['Consist'], stats['Engine'], stats['Wagon'], stats['shapes'], stats['textures'], numWarn), file=sys.stderr)
+for name in ('binary shapes (textures not counted)', 'unknown textures') :
+    if stats[name] : print( '  {}: {}'.format(name, stats[name]), file=sys.stderr)
+exit(0)
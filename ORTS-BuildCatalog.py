@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# ORTS-BuildCatalog - create or update the catalog (SQLite) of the content files below a content root
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# The catalog is used by ORTS-RollingStockScanner, ORTS-ListRollingStockUsed, ORTS-CopyTrains and
+# ORTS-FindConfigParam with --catalog. See ortsCatalog.py.
+#
+
+import argparse
+import pathlib
+import sys
+
+import ortsCatalog
+
+parser = argparse.ArgumentParser( description='Create or update the catalog of the content files (eng, wag, con, srv, etc.) '
+                                               'below a content root.')
+parser.add_argument( 'contentRoot', type=pathlib.Path, help='Content folder, or folder with several content folders (packages).')
+parser.add_argument( 'catalogPath', type=pathlib.Path, nargs='?', help='Catalog file. Default is orts-catalog.sqlite in the content root.')
+parser.add_argument( '--full', action='store_true', help='Read all the files again, not only the new and modified ones.')
+parser.add_argument( '-v', '--verbose', action='count', default=0)
+args = parser.parse_args()
+contentRoot = args.contentRoot
+catalogPath = args.catalogPath or contentRoot / 'orts-catalog.sqlite'
+verbose = args.verbose
+
+if not contentRoot.is_dir() :
+    print( 'Error: "{}" is not a folder.'.format(contentRoot), file=sys.stderr)
+    sys.exit(1)
+
+try :
+    catalog = ortsCatalog.openCatalog( catalogPath, contentRoot)
+except ortsCatalog.CatalogError as e :
+    print( 'Error: {}'.format(e), file=sys.stderr)
+    sys.exit(1)
+numRead, numRemoved = catalog.update( full=args.full, verbose=verbose)
+numFiles = catalog.conn.execute( 'SELECT COUNT(*) FROM files').fetchone()[0]
+catalog.close()
+
+print( 'Catalog {}: {} files, {} read, {} removed.'.format(catalogPath, numFiles, numRead, numRemoved), file=sys.stderr)
+exit(0)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# ORTS-ConsistReport - list the length, mass, power and weakest coupler of consists, in CSV format
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - Joins the engines and wagons of the consists (EngineData, WagonData) with the attributes of the engine and
+#   wagon files, as listed by ORTS-RollingStockScanner.
+# - Each engine or wagon file is read once, no matter how many consists use it. The vehicles are kept as columns
+#   (mass, length, power, coupler strength), and the consists as a flat list of (consist, vehicle) entries.
+#   The aggregates of all the consists are computed in one pass over the entries.
+# - The length is the length between coupler faces (ORTSLengthCouplerFace) if specified, else the size.
+#   The trailing mass is the mass of the wagons (not engines). The weakest coupler is the smallest coupler
+#   strength (Break) of the vehicles of the consist.
+# - Vehicles that are missing, or that have no (known) mass or length, are counted in the Incomplete column;
+#   the aggregates of such a consist are too low.
+#
+
+import argparse
+import math
+import pathlib
+import sys
+from array import array
+
+import ortsCatalog
+from ortsContent import (readFile, getRollingStockValues, getServiceConsistName, parseConsist, getQuantity,
+                         massUnits, lengthUnits, powerUnits, forceUnits)
+
+# global variables
+numWarn = numVehicleWarn = 0
+
+# the vehicles (engine and wagon files), as columns; unknown values are NaN
+vehicleIndex = {}  # path -> index in the columns
+vehicleNames = [] ; vehicleIsEngine = array('b')
+vehicleMass = array('d') ; vehicleLength = array('d') ; vehiclePower = array('d') ; vehicleCoupler = array('d')
+
+# the consists, and their entries as columns; the vehicle of a missing file is -1
+consistPaths = []
+entryConsist = array('l') ; entryVehicle = array('l')
+
+
+### print a warning and count it
+def warn( *args) :
+    global numWarn
+    numWarn += 1
+    print( "Warning:", *args, file=sys.stderr)
+
+
+### count a warning of an engine or wagon file; they are listed by ORTS-RollingStockScanner, here only with -v
+def vehicleWarn( *args) :
+    global numVehicleWarn
+    numVehicleWarn += 1
+    if verbose > 0 : print( "Warning:", *args, file=sys.stderr)
+
+
+### get the actual path of a file, None if it does not exist; from the catalog or the folder tree
+def getFile( filePath) :
+    if catalog :
+        return catalog.getFile( filePath)
+    return filePath if filePath.is_file() else None
+
+
+### get the columns of an engine or wagon file, as listed by ORTS-RollingStockScanner; None if not readable
+def getRollingStock( path, isEngine) :
+    if catalog :
+        values, warnings = catalog.getRollingStock( path)
+        for message in warnings :
+            vehicleWarn( message)
+        return values
+    return getRollingStockValues( path, isEngine, vehicleWarn, verbose)
+
+
+### get the index of a vehicle; the file is read the first time
+def getVehicle( path, isEngine) :
+    key = str(path)
+    if key in vehicleIndex :
+        return vehicleIndex[key]
+    if verbose > 1 : print( "...processing", path, file=sys.stderr)
+    values = getRollingStock( path, isEngine) or {}
+    quantities = [getQuantity( values.get( 'Weight', '_'), massUnits),
+                  getQuantity( values.get( 'TotalLength', '_'), lengthUnits) or getQuantity( values.get( 'Length', '_'), lengthUnits),
+                  getQuantity( values.get( 'MaxPower', '_'), powerUnits) if isEngine else 0.0,
+                  getQuantity( values.get( 'CouplerStrength', '_'), forceUnits)]
+    mass, length, power, coupler = [math.nan if q is None else q for q in quantities]
+    vehicleIndex[key] = len(vehicleNames)
+    vehicleNames.append( '{}/{}'.format(path.parent.name, path.name)) ; vehicleIsEngine.append( isEngine)
+    vehicleMass.append( mass) ; vehicleLength.append( length) ; vehiclePower.append( power) ; vehicleCoupler.append( coupler)
+    return vehicleIndex[key]
+
+
+### add the entries of a consist
+def addConsist( consistPath) :
+    consist = len(consistPaths)
+    consistPaths.append( consistPath)
+    rootPath = consistPath.parents[2]  # content folder, above TRAINS/CONSISTS
+    entries = catalog.getConsist( consistPath) if catalog else parseConsist( readFile( consistPath))[1]
+    if not entries :
+        warn( "No engines or wagons found in consist", consistPath)
+    for entry in entries :
+        vehicle = -1
+        ext = '.eng' if entry.kind == 'Engine' else '.wag'
+        if not entry.fileName or not entry.dirName :
+            warn( 'Failed to parse {}Data value for consist {}: UiD {}'.format(entry.kind, consistPath, entry.uid))
+        else :
+            path = getFile( rootPath / 'TRAINS' / 'TRAINSET' / entry.dirName / (entry.fileName + ext))
+            if path :
+                vehicle = getVehicle( path, ext == '.eng')
+            else :
+                warn( 'Vehicle file does not exist: consist {}; {}/{}{}'.format(consistPath, entry.dirName, entry.fileName, ext))
+        entryConsist.append( consist) ; entryVehicle.append( vehicle)
+
+
+### get the consists used by the services in (or below) a folder
+def getServiceConsists( dirPath) :
+    consists = {}
+    for servicePath in listFiles( dirPath, '.srv') :
+        consistName = catalog.getServiceConsistName( servicePath) if catalog else getServiceConsistName( readFile( servicePath))
+        if not consistName :
+            warn( "Unable to find consist name in", servicePath)
+            continue
+        routesPath = next( p for p in servicePath.parents if p.name.casefold() == 'routes')
+        consistPath = routesPath.parent / 'TRAINS' / 'CONSISTS' / (consistName + '.con')
+        if not getFile( consistPath) :
+            warn( 'Consist file does not exist: service {}; consist {}'.format(servicePath, consistPath))
+            continue
+        consists.setdefault( str(getFile( consistPath)), getFile( consistPath))
+    return list( consists.values())
+
+
+### list the files with the extension in (or below) a folder, from the catalog or the folder tree
+def listFiles( folderPath, ext) :
+    if catalog :
+        return catalog.listFiles( folderPath, ext)
+    return folderPath.rglob( '*' + ext)
+
+
+### compute the aggregates of all consists, in one pass over the entries
+def aggregate() :
+    n = len(consistPaths)
+    numVehicles = [0] * n ; numEngines = [0] * n ; incomplete = [0] * n
+    length = [0.0] * n ; mass = [0.0] * n ; trailingMass = [0.0] * n ; power = [0.0] * n
+    weakest = [math.inf] * n ; weakestVehicle = [-1] * n
+    for c, v in zip( entryConsist, entryVehicle) :
+        numVehicles[c] += 1
+        if v < 0 :
+            incomplete[c] += 1
+            continue
+        if math.isnan( vehicleMass[v]) or math.isnan( vehicleLength[v]) :
+            incomplete[c] += 1
+        if not math.isnan( vehicleMass[v]) :
+            mass[c] += vehicleMass[v]
+            if not vehicleIsEngine[v] : trailingMass[c] += vehicleMass[v]
+        if not math.isnan( vehicleLength[v]) : length[c] += vehicleLength[v]
+        if vehicleIsEngine[v] :
+            numEngines[c] += 1
+            if not math.isnan( vehiclePower[v]) : power[c] += vehiclePower[v]
+        if vehicleCoupler[v] < weakest[c] :
+            weakest[c] = vehicleCoupler[v] ; weakestVehicle[c] = v
+    return numVehicles, numEngines, length, mass, trailingMass, power, weakest, weakestVehicle, incomplete
+
+
+### format a number, "_" if unknown
+def formatNumber( value, digits) :
+    return '_' if math.isnan( value) or math.isinf( value) else '{:.{}f}'.format(value, digits)
+
+
+### main
+parser = argparse.ArgumentParser( description='List the length, mass, power and weakest coupler of consists, in CSV format.')
+parser.add_argument( 'dirPath', type=pathlib.Path, help='Content folder, to list all its consists. Or route folder (or ROUTES '
+                     'folder), to list the consists used by its services.')
+parser.add_argument( '-c', '--catalog', type=pathlib.Path,
+                     help='Optional catalog (see ORTS-BuildCatalog.py). It is updated, then used instead of reading the files.')
+parser.add_argument( '-v', '--verbose', action='count', default=0)
+args = parser.parse_args()
+dirPath = args.dirPath
+verbose = args.verbose
+
+if not dirPath.is_dir() :
+    print( "Error: {} is not a directory.".format(args.dirPath), file=sys.stderr)
+    sys.exit(1)
+
+# a route (below a ROUTES folder) lists the consists of its services; the consists are in the content folder
+absPath = dirPath.resolve()
+routesPath = next( (p for p in [absPath] + list(absPath.parents) if p.name.casefold() == 'routes'), None)
+scanPath = routesPath.parent if routesPath else dirPath
+try :
+    catalog = ortsCatalog.openFreshCatalog( args.catalog, scanPath, verbose) if args.catalog else None
+except ortsCatalog.CatalogError as e :
+    print( 'Error: {}'.format(e), file=sys.stderr)
+    sys.exit(1)
+
+for consistPath in getServiceConsists( dirPath) if routesPath else listFiles( dirPath, '.con') :
+    if verbose > 0 : print( "Info: consist", consistPath, file=sys.stderr)
+    addConsist( consistPath)
+
+numVehicles, numEngines, length, mass, trailingMass, power, weakest, weakestVehicle, incomplete = aggregate()
+
+print( 'Package,Consist,Vehicles,Engines,Length(m),Mass(t),TrailingMass(t),Power(kW),PowerToWeight(kW/t),'
+       'WeakestCoupler(kN),WeakestVehicle,Incomplete')
+for c, consistPath in enumerate( consistPaths) :
+    powerToWeight = power[c] / mass[c] if mass[c] > 0 else math.nan
+    print( '"{}","{}"'.format(consistPath.parents[2].name, consistPath.name), numVehicles[c], numEngines[c],
+           formatNumber( length[c], 1), formatNumber( mass[c], 1), formatNumber( trailingMass[c], 1),
+           formatNumber( power[c], 0), formatNumber( powerToWeight, 2), formatNumber( weakest[c], 0),
+           '"{}"'.format(vehicleNames[weakestVehicle[c]]) if weakestVehicle[c] >= 0 else '_', incomplete[c], sep=',')
+
+print( "Processed {} consists with {} vehicles, read {} engine and wagon files; generated {} warnings, "
+       "{} warnings in engine and wagon files{}.".format(len(consistPaths), len(entryConsist), len(vehicleNames), numWarn,
+       numVehicleWarn, '' if verbose > 0 else ' (-v to list them)'), file=sys.stderr)
+exit(0)
@@ -3,116 +3,81 @@
 #
 # Copyright (c) 2025 Roger Fischer. MIT License.
 #
-
-# TODO: consists with parenthesis in name - these must be quoted in srv file
+# Notes:
+# - The trains can be copied from several content folders, in priority order: a consist or trainset folder is copied
+#   from the first content folder that has it. Each content folder is listed once (see ortsTools.TrainsIndex).
+#
 
 import argparse
+import collections
 import pathlib
-import shutil
-import re
 import sys
 
+import ortsCatalog
+import ortsDiagnostics
+import ortsTools
+
 numConsists = numTrainset = 0
-consistPattern = re.compile('Train_Config\\s*\\(([^)]+)\\)', flags=re.IGNORECASE)
-trainsetSubPattern = '\\(\\s*(\\S+)\\s*(\\S+)\\s\\)'
-#trainsetPattern = re.compile( 'EngineData\\s*' + trainsetSubPattern + '|' + 'WagonData\\s*' + trainsetSubPattern, flags=re.IGNORECASE)
-trainsetPattern = re.compile( '(EngineData|WagonData)\\s*\\(\\s*(\\S+)\\s*(\\S+)\\s\\)', flags=re.IGNORECASE)
+numCopiedFrom = collections.Counter()  # content folder -> number of consists and trainset folders copied
 
-### read a file that is either utf-16 or utf8
-def readFile( filePath) :
-    enc = "utf-16"
-    bytes = filePath.read_bytes()
-    if 0 < bytes[0] < 128: enc = 'utf-8'
-    return bytes.decode(encoding = enc, errors = 'replace' )
 
 ### main
-parser = argparse.ArgumentParser( description='Copy all the consists and rolling stock (trainset) needed by a route from another content folder.')
+parser = argparse.ArgumentParser( description='Copy all the consists and rolling stock (trainset) needed by a route from other content folders.')
 parser.add_argument( '-v', '--verbose', action='count', default=0)
 parser.add_argument( 'routePath', type=pathlib.Path, help='Route folder, to copy the trains to. The folder that contains the Services sub-folder.')
-parser.add_argument( 'contentPath', type=pathlib.Path, help='Content folder, to copy the trains from. The folder that contains the Trains sub-folder')
+parser.add_argument( 'contentPaths', type=pathlib.Path, nargs='+', metavar='contentPath', help='Content folder, to copy the trains from. '
+                     'The folder that contains the Trains sub-folder. Several content folders are searched in the order specified.')
+parser.add_argument( '-c', '--catalog', type=pathlib.Path, help='Optional catalog (see ORTS-BuildCatalog.py) of the content folders to copy from. '
+                     'It is updated, then used instead of reading the services and consists.')
+parser.add_argument( '--warnings', choices=['all', 'summary'], default='all',
+                     help='"all" prints the warnings and errors (buffered) and a summary per code and package, "summary" only the summary. Default is all.')
+parser.add_argument( '--warnings-jsonl', type=pathlib.Path, metavar='FILE',
+                     help='Also write the warnings and errors to a file, one JSON object per line (level, code, package, file, message).')
 
 args = parser.parse_args()
 routePath = args.routePath
-contentPath = args.contentPath
+contentPaths = args.contentPaths
 verbose = args.verbose
 
-# check that the route exists and has services folder (to scan) and consists and trainset folders to copy to
-if not routePath.is_dir() :
-    print( 'Error: "{}" is not a folder.'.format(routePath), file=sys.stderr)
-    sys.exit(1)
-servicesDirPath = routePath / 'Services'
-if not servicesDirPath.is_dir() :
-    print( 'Error: "{}" does not contain a Services folder.'.format(routePath), file=sys.stderr)
-    sys.exit(1)
-targetPath = routePath.parent.parent / 'Trains'
-toConsistsDirPath = targetPath / 'Consists'
-if not toConsistsDirPath.is_dir() :
-    print( 'Error: Content folder of route "{}" does not contain a Consists sub-folder ({}).'.format(routePath.name, toConsistsDirPath), file=sys.stderr)
-    sys.exit(1)
-toTrainsetDirPath = targetPath / 'Trainset'
-if not toTrainsetDirPath.is_dir() :
-    print( 'Error: Content folder of route "{}" does not contain a Trainset sub-folder ({}).'.format(routePath.name, toTrainsetDirPath), file=sys.stderr)
+# check that the route has a services folder (to scan), the content folder of the route consists and trainset folders
+# to copy to, and the content folders to copy from consists and trainset folders
+try :
+    ortsTools.getCopyFolders( routePath, contentPaths)
+except NotADirectoryError as e :
+    print( 'Error: {}'.format(e), file=sys.stderr)
     sys.exit(1)
 
-# check that the content folder exists and has consists and trainset folders (to copy from)
-if not contentPath.is_dir() :
-    print( 'Error: "{}" is not a folder.'.format(contentPath), file=sys.stderr)
-    sys.exit(1)
-sourcePath = contentPath / 'Trains'
-fromConsistsDirPath = sourcePath / 'Consists'
-if not fromConsistsDirPath.is_dir() :
-    print( 'Error: Content folder "{}" to copy from does not contain a Consists sub-folder ({}).'.format(contentPath.name, fromConsistsDirPath), file=sys.stderr)
+try :
+    catalog = ortsCatalog.openFreshCatalog( args.catalog, contentPaths[0], verbose) if args.catalog else None
+except ortsCatalog.CatalogError as e :
+    print( 'Error: {}'.format(e), file=sys.stderr)
     sys.exit(1)
-fromTrainsetDirPath = sourcePath / 'Trainset'
-if not fromTrainsetDirPath.is_dir() :
-    print( 'Error: Content folder "{}" to copy from does not contain a Trainset sub-folder ({}).'.format(contentPath.name, fromTrainsetDirPath), file=sys.stderr)
-    sys.exit(1)
-
-print( 'Info: copying trains (consists, trainset folders) for route "{}" from content folder "{}".'.format( routePath, contentPath), file=sys.stderr)
+for contentPath in contentPaths[1:] :
+    if catalog and catalog.contains( contentPath) : catalog.update( contentPath, verbose=verbose)
 
-# for each service in the services folder
-for serviceFilePath in servicesDirPath.glob('*.srv') :
-    if (verbose > 1) : print( 'Info: processing Service "{}", file "{}".'.format( serviceFilePath.name, serviceFilePath), file=sys.stderr)
-    srvText = readFile(serviceFilePath)
-    match = consistPattern.search(srvText)
-    if not match or match.lastindex < 1 :
-        print('Warning: No train config found in Service "{}".'.format( serviceFilePath), file=sys.stderr)
-        continue
-    consistFileName = match.group(1).strip().strip('\"') + '.con'
-    consistFromPath = fromConsistsDirPath / consistFileName
-    if not consistFromPath.exists() :
-        print( 'Error: Consist "{}" from service "{}" does not exist ({}).'.format(consistFromPath.name, serviceFilePath, consistFromPath), file=sys.stderr)
-        continue
-    consistToPath = toConsistsDirPath / consistFileName
-    if consistToPath.exists() :
-        if verbose > 1 : print( 'Info: Consist "{}" from Service "{}" already exists - skipping it.'.format(consistToPath.name, serviceFilePath), file=sys.stderr)
-        continue
-    if verbose > 0 : print( 'Info: copying Consist "{}" from "{}" to "{}".'.format(consistFileName, consistFromPath, consistToPath), file=sys.stderr)
-    shutil.copy2(consistFromPath, consistToPath)
-    numConsists += 1
+print( 'Info: copying trains (consists, trainset folders) for route "{}" from content folders "{}".'.format(
+       routePath, '", "'.join( map( str, contentPaths))), file=sys.stderr)
 
-    # for each wagon or engine in the consist file
-    conText = readFile(consistFromPath)
-    matchList = trainsetPattern.finditer( conText)
-    if matchList is None :
-        print('Warn: No Engines or Wagons found in Consist "{}".'.format(consistFromPath), file=sys.stderr)
-        continue
-    for match in matchList :
-        if match.lastindex < 3 :
-            print('Warning: Unable to parse line "{}" in Consist "{}".'.format(match.group(0), consistFromPath), file=sys.stderr)
-            continue
-        dirName = match.group(3).strip().strip('\"')
-        trainsetFromPath = fromTrainsetDirPath / dirName
-        if not trainsetFromPath.exists():
-            print('Error: Trainset folder "{}" from consist "{}" does not exist ({}).'.format(trainsetFromPath.name, consistFileName, trainsetFromPath), file=sys.stderr)
-            continue
-        trainsetToPath = toTrainsetDirPath / dirName
-        if trainsetToPath.exists():
-            if verbose > 1 : print( 'Info: Trainset "{}" from Consist "{}" already exists - skipping it.'.format(trainsetToPath.name, consistFileName), file=sys.stderr)
-            continue
-        if verbose > 0: print('Info: copying Trainset "{}" from "{}" to "{}".'.format(dirName, consistFromPath, consistToPath), file=sys.stderr)
-        shutil.copytree(trainsetFromPath, trainsetToPath)
-        numTrainset += 1
+diagnostics = ortsDiagnostics.Diagnostics( args.warnings, args.warnings_jsonl)
+diagnostics.setPath( routePath)  # the package of the warnings without a path: the content folder of the route
+for row in ortsTools.copyTrainsRows( routePath, ortsTools.getContentPaths( contentPaths), catalog, diagnostics.warn, verbose) :
+    if row.status == 'missing' :
+        diagnostics.add( 'missing-' + row.type.lower(), '{} "{}" from {} "{}" does not exist in any content folder ({}).'.format(
+                         row.type, row.name, 'service' if row.type == 'Consist' else 'consist', row.reference, row.source), level='Error')
+    elif row.status == 'exists' :
+        if verbose > 1 : print( 'Info: {} "{}" from {} "{}" already exists - skipping it.'.format(
+                                row.type, row.name, 'Service' if row.type == 'Consist' else 'Consist', row.reference), file=sys.stderr)
+    else :
+        if verbose > 0 : print( 'Info: copied {} "{}" from "{}" to "{}".'.format(row.type, row.name, row.source, row.destination), file=sys.stderr)
+        if row.type == 'Consist' : numConsists += 1
+        else : numTrainset += 1
+        numCopiedFrom[row.contentPath] += 1
 
+diagnostics.flush()
 print( 'Sum: copied {} Consists and {} Trainsets folders.'.format( numConsists, numTrainset), file=sys.stderr)
+if len(contentPaths) > 1 :
+    for contentPath in contentPaths :
+        print( '  from "{}": {}'.format(contentPath, numCopiedFrom[contentPath]), file=sys.stderr)
+diagnostics.printSummary()
+diagnostics.close()
 exit(0)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# ORTS-DiffRollingStock - compare eng and wag files by block structure, or find near-duplicates in a library
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Files are read with includes expanded and parsed into a tree of blocks (ortsContent.parseText; comment blocks are
+# dropped). Each block gets a hash over its name, values and the hashes of its nested blocks, so identical sub-trees
+# are skipped without comparing them.
+# - Diff mode compares two files and lists the differences by block path.
+# - Library mode collects the set of block hashes of each file, and groups the files with similar sets.
+#   Candidate pairs are found with a one-permutation MinHash signature and banding (LSH), so that not
+#   all pairs of files need to be compared. The similarity (Jaccard) of the candidates is then computed exactly.
+#
+
+import argparse
+import pathlib
+import sys
+
+from ortsContent import parseText
+from ortsTools import expandFile
+
+sigSize = 64  # MinHash signature size
+bandSize = 4  # signature values per LSH band
+hashMask = (1 << 64) - 1
+
+
+### a block of a config file: Name ( values and nested blocks ); hash covers the whole sub-tree
+class Block :
+    __slots__ = ('name', 'values', 'children', 'hash')
+    def __init__( self, name) :
+        self.name = name ; self.values = [] ; self.children = [] ; self.hash = 0
+
+
+### parse the text of a config file into a tree of blocks (see ortsContent.parseText), and hash each sub-tree
+### the root block has no name
+def parseBlocks( txt) :
+    return hashTree( parseText( txt))
+
+
+### get the hashed tree of a parsed block; names are not case sensitive
+def hashTree( parsed) :
+    block = Block( parsed.name)
+    block.values = parsed.values()
+    block.children = [hashTree( child) for child in parsed.blocks()]
+    block.hash = hash( (block.name.casefold(), tuple(block.values), tuple(c.hash for c in block.children)) ) & hashMask
+    return block
+
+
+### key the nested blocks by name and occurrence, eg. the second Coupling block is ('coupling', 1)
+def getChildKeys( block) :
+    keys = {} ; counts = {}
+    for child in block.children :
+        name = child.name.casefold()
+        n = counts.get(name, 0) ; counts[name] = n + 1
+        keys[(name, n)] = child
+    return keys
+
+
+### format the path of a block, the occurrence is added for repeated blocks, eg. "Wagon/Coupling[2]"
+def formatPath( path, child, n) :
+    name = child.name + ('[{}]'.format(n + 1) if n > 0 else '')
+    return path + '/' + name if path else name
+
+
+### format the values of a block
+def formatValues( block) :
+    txt = '( ' + ' '.join(block.values) + ' )'
+    if block.children : txt += ' +{} blocks'.format(len(block.children))
+    return txt
+
+
+### compare two blocks, only descending into sub-trees with different hashes; yields (kind, path, text)
+def diffBlocks( a, b, path='') :
+    if a.hash == b.hash : return
+    if a.values != b.values :
+        yield '~', path, '{} -> {}'.format( formatValues(a), formatValues(b))
+    aKeys = getChildKeys( a) ; bKeys = getChildKeys( b)
+    for key, aChild in aKeys.items() :
+        bChild = bKeys.get(key)
+        childPath = formatPath( path, aChild, key[1])
+        if bChild is None : yield '-', childPath, formatValues(aChild)
+        else : yield from diffBlocks( aChild, bChild, childPath)
+    for key, bChild in bKeys.items() :
+        if key not in aKeys : yield '+', formatPath( path, bChild, key[1]), formatValues(bChild)
+
+
+### collect the hashes of all the sub-trees of a block
+def collectHashes( block, hashes) :
+    for child in block.children :
+        hashes.add( child.hash)
+        collectHashes( child, hashes)
+    return hashes
+
+
+### one-permutation MinHash signature: the smallest hash in each of sigSize bins
+def getSignature( hashes) :
+    sig = [hashMask] * sigSize
+    for h in hashes :
+        i = h % sigSize ; v = h // sigSize
+        if v < sig[i] : sig[i] = v
+    return sig
+
+
+### find the root of a group (union-find)
+def findGroup( groups, i) :
+    while groups[i] != i :
+        groups[i] = groups[groups[i]]
+        i = groups[i]
+    return i
+
+
+### compare two files
+def diffFiles( pathA, pathB) :
+    rootA = parseBlocks( expandFile( pathA))
+    rootB = parseBlocks( expandFile( pathB))
+    print( '---', pathA)
+    print( '+++', pathB)
+    numDiffs = 0
+    for kind, path, txt in diffBlocks( rootA, rootB) :
+        print( kind, path, txt)
+        numDiffs += 1
+    print( 'Found {} differences.'.format(numDiffs), file=sys.stderr)
+
+
+### find groups of near-duplicate files in a library
+def findDuplicates( dirPath, threshold) :
+    paths = [] ; hashSets = [] ; buckets = {}
+    suffixes = [s for s, do in (('*.eng', doEng), ('*.wag', doWag)) if do]
+    for suffix in suffixes :
+        for path in dirPath.rglob( suffix) :
+            if path.name == 'default.wag' : continue
+            if verbose > 1 : print( "...processing ", path, file=sys.stderr)
+            try :
+                root = parseBlocks( expandFile( path))
+            except (OSError, UnicodeError) as e :
+                print( 'Warning: unable to read {}: {}'.format(path, e), file=sys.stderr)
+                continue
+            hashes = collectHashes( root, set())
+            if not hashes : continue
+            i = len(paths)
+            paths.append( path) ; hashSets.append( hashes)
+            sig = getSignature( hashes)
+            for band in range(0, sigSize, bandSize) :
+                key = tuple(sig[band:band + bandSize])
+                if all(v == hashMask for v in key) : continue  # empty bins, small files would all collide
+                buckets.setdefault( (band, key), []).append(i)
+
+    # compare the candidate pairs (same bucket in any band) exactly
+    groups = list(range(len(paths)))
+    bestMatch = {}  # key is file index, value is (similarity, other file index)
+    compared = set()
+    for members in buckets.values() :
+        for x in range(len(members)) :
+            for y in range(x + 1, len(members)) :
+                i, j = members[x], members[y]
+                if (i, j) in compared : continue
+                compared.add( (i, j))
+                a = hashSets[i] ; b = hashSets[j]
+                if min(len(a), len(b)) < threshold * max(len(a), len(b)) : continue  # cannot reach threshold
+                sim = len(a & b) / len(a | b)
+                if sim < threshold : continue
+                groups[findGroup( groups, i)] = findGroup( groups, j)
+                if sim > bestMatch.get(i, (0, None))[0] : bestMatch[i] = (sim, j)
+                if sim > bestMatch.get(j, (0, None))[0] : bestMatch[j] = (sim, i)
+
+    members = {}
+    for i in bestMatch : members.setdefault( findGroup( groups, i), []).append(i)
+    print( 'Group,Size,File,Similarity,MostSimilarFile')
+    for n, group in enumerate( sorted(members.values(), key=len, reverse=True)) :
+        for i in sorted(group, key=lambda i: str(paths[i])) :
+            sim, j = bestMatch[i]
+            print( '{},{},"{}",{:.3f},"{}"'.format(n + 1, len(group), paths[i], sim, paths[j]))
+    print( 'Processed {} files, compared {} candidate pairs; found {} near-duplicate files in {} groups'.format(
+           len(paths), len(compared), len(bestMatch), len(members)), file=sys.stderr)
+
+
+### main
+parser = argparse.ArgumentParser( description='Compare two eng or wag files by block structure (with includes expanded), '
+                                              'or find groups of near-duplicate eng and wag files in a library.')
+parser.add_argument( 'paths', type=pathlib.Path, nargs='+', help='Two files to compare, or with --library the folder to search.')
+parser.add_argument( '-l', '--library', action='store_true', help='Find near-duplicates of the eng and wag files in (or below) the folder.')
+parser.add_argument( '-t', '--threshold', type=float, default=0.8, help='Minimum similarity (0..1) of near-duplicates. Default is 0.8.')
+parser.add_argument( '-f', '--filter', help='Optional filter for --library. "eng" limits to engines, "wag" limits to wagons.')
+parser.add_argument( '-v', '--verbose', action='count', default=0)
+args = parser.parse_args()
+filter = args.filter
+verbose = args.verbose
+
+doEng = filter != 'wag'
+doWag = filter != 'eng'
+
+if args.library :
+    if len(args.paths) != 1 or not args.paths[0].is_dir() :
+        print( 'Error: --library requires a single folder.', file=sys.stderr)
+        sys.exit(1)
+    findDuplicates( args.paths[0], args.threshold)
+else :
+    if len(args.paths) != 2 :
+        print( 'Error: two files are required to compare.', file=sys.stderr)
+        sys.exit(1)
+    for path in args.paths :
+        if not path.is_file() :
+            print( 'Error: {} is not a file.'.format(path), file=sys.stderr)
+            sys.exit(1)
+    diffFiles( args.paths[0], args.paths[1])
+
+exit(0)
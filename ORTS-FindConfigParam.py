@@ -5,30 +5,43 @@
 #
 
 import argparse
+import collections
 import pathlib
-import re
 import sys
 
-numFiles = numMatches = 0
+import ortsArchive
+import ortsCatalog
+import ortsReadAhead
+import ortsTools
 
-
-### read a file that is either utf-16 or utf8
-def readFile( filePath) :
-    enc = "utf-16"
-    bytes = filePath.read_bytes()
-    if 0 < bytes[0] < 128: enc = 'utf-8'
-    return bytes.decode( encoding = enc, errors = 'replace' )
+numMatches = 0
 
 
 ### main
-parser = argparse.ArgumentParser( description='Find config files that have the specified parameter within the specified context.')
+parser = argparse.ArgumentParser( description='Find config files that have the specified parameter within the specified context, '
+                                               'or the blocks at the specified block paths.')
 parser.add_argument( '-v', '--verbose', action='count', default=0)
-parser.add_argument( 'dirPath', type=pathlib.Path, help='Directory where to search for config files.')
+parser.add_argument( 'dirPath', type=pathlib.Path, help='Directory where to search for config files, including in the zip files '
+                     'below it. Or a zip file (content pack).')
 parser.add_argument( 'filePat', help='Pattern for the config file name, eg: "*.cvf".')
-parser.add_argument( 'paramName', help='Name of parameter to search for. Must be a literal')
-parser.add_argument( 'context', help='A string that needs to be near the parameter to qualify it. May be a regex.')
+parser.add_argument( 'paramName', nargs='?', help='Name of parameter to search for. Must be a literal. Not used with --query.')
+parser.add_argument( 'context', nargs='?', help='A string that needs to be near the parameter to qualify it. May be a regex. '
+                     'Not used with --query.')
 parser.add_argument( '-r', '--range', type=int, default=200, help='Optional. The max distance to look for context. '
                      'Negative if the context is to be found after the parameter. Default is 200 characters.')
+parser.add_argument( '-q', '--query', action='append', help='Block path to search for, eg: "Engine/Effects/DieselSpecialEffects/Exhaust1". '
+                     'Case insensitive; "*" matches any one block, "**" any number of nested blocks. May be repeated.')
+parser.add_argument( '-j', '--jsonl', action='store_true', help='Output one JSON object per match (file, line, value).')
+parser.add_argument( '-n', '--line-number', action='store_true', help='Output the line of each match after the file (file:line: value).')
+parser.add_argument( '-x', '--expand-includes', action='store_true', help='Search the files with includes expanded. '
+                     'Matches report the file (eg. an inc file) where they were found.')
+parser.add_argument( '-c', '--catalog', type=pathlib.Path, help='Optional catalog (see ORTS-BuildCatalog.py). It is updated, '
+                     'then used to only search the files that contain the parameter (block name).')
+parser.add_argument( '--read-ahead', type=int, default=ortsReadAhead.defaultDepth, metavar='K',
+                     help='Number of files read ahead (in the background) while a file is searched; 0 to disable. '
+                     'Default is {}.'.format(ortsReadAhead.defaultDepth))
+parser.add_argument( '--read-ahead-mb', type=int, default=ortsReadAhead.defaultMaxBytes // (1024 * 1024), metavar='MB',
+                     help='Memory cap for the files read ahead, in MB. Default is {}.'.format(ortsReadAhead.defaultMaxBytes // (1024 * 1024)))
 
 args = parser.parse_args()
 dirPath = args.dirPath
@@ -36,39 +49,35 @@ filePat = args.filePat
 paramName = args.paramName
 context = args.context
 range = args.range
+queries = args.query
+jsonOut = args.jsonl
+expandIncludes = args.expand_includes
 verbose = args.verbose
 
-paramRe = re.compile( '\\s(' + paramName + ')\\s*\\(\\s*([^)(]+)[)(]', flags=re.IGNORECASE)
+if not queries and (paramName is None or context is None) :
+    parser.error( 'paramName and context are required unless a --query is specified')
 
-contextRe = re.compile( context, flags=re.IGNORECASE)
-if not contextRe :
-    print( 'Error: "{}" is not a proper regex.'.format(context), file=sys.stderr)
+if not dirPath.is_dir() and not ortsArchive.isArchive( dirPath) :
+    print( 'Error: "{}" is not a directory or a zip file.'.format(args.dirPath), file=sys.stderr)
     sys.exit(1)
+if args.catalog and not dirPath.is_dir() :
+    parser.error( '--catalog is not supported for a zip file')
 
-if not dirPath.is_dir() :
-    print( 'Error: "{}" is not a directory.'.format(args.dirPath), file=sys.stderr)
+try :
+    catalog = ortsCatalog.openFreshCatalog( args.catalog, dirPath, verbose) if args.catalog else None
+except ortsCatalog.CatalogError as e :
+    print( 'Error: {}'.format(e), file=sys.stderr)
     sys.exit(1)
 
-for path in dirPath.rglob( filePat) :
-    if verbose > 0 : print( "...processing config file ", path, file=sys.stderr)
-    numFiles += 1
-    txt = readFile( path)
-
-    for paramMatch in paramRe.finditer( txt) :
-        val = paramMatch.group()
-        if len(val) > 80 : val = val[0:80] + '...'
-
-        if range >=0 :
-            start = paramMatch.start() - range
-            end = paramMatch.start()
-        else :
-            start = paramMatch.start()
-            end = paramMatch.start() - range
-
-        ctxMatch = contextRe.search( txt, pos=start, endpos=end)
-        if ctxMatch :
-            numMatches += 1
-            print( path, val, sep=': ')
+# with --query a structure-aware search (each file parsed once, all the queries evaluated on the block tree);
+# else the parameter with the context nearby
+stats = collections.Counter()
+for match in ortsTools.findConfigParam( dirPath, filePat, paramName, context, range, queries, expandIncludes, catalog,
+                                        stats=stats, readAhead=args.read_ahead,
+                                        readAheadBytes=args.read_ahead_mb * 1024 * 1024, verbose=verbose) :
+    numMatches += 1
+    print( ortsTools.formatFindRow( match, jsonOut, expandIncludes, args.line_number), flush=bool(queries))
 
-print( 'Processed {} config files, found {} matches.'.format(numFiles, numMatches), file=sys.stderr)
+print( 'Processed {} config files, found {} matches.'.format(stats['files'], numMatches), file=sys.stderr)
+if expandIncludes : print( 'Read {} include files.'.format(len(ortsTools.includeCache)), file=sys.stderr)
 exit(0)
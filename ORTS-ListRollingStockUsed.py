@@ -5,63 +5,67 @@
 #
 
 import argparse
+import collections
 import pathlib
-import re
 import sys
 
-
-### read a file that is either utf-16 or utf8
-def readFile( filePath) :
-    enc = "utf-16"
-    bytes = filePath.read_bytes()
-    if 0 < bytes[0] < 128: enc = 'utf-8'
-    return bytes.decode(encoding=enc, errors='replace')
-
-
-### get the root path (where ROUTES and TRAINS resides)
-def getRootPath(filePath) :
-    absPath = filePath.resolve()
-    if (absPath / 'ROUTES').is_dir() :
-        return absPath
-    elif absPath.name.casefold() == 'ROUTES'.casefold() :
-        return absPath.parent
-    else :
-        for i in range(len(absPath.parents)) :
-            if absPath.parents[i].name.casefold() == 'ROUTES'.casefold() :
-                return absPath.parents[i+1]
-    return None
-
-
-### get the root path, content dir, and route dir
-def getContextDirs(filePath) :
-    absPath = filePath.resolve()
-    for i in range(len(absPath.parents)) :
-        if absPath.parents[i].name.casefold() == 'ROUTES'.casefold() and i + 1 < len(absPath.parents) :
-            return absPath.parents[i+1], absPath.parents[i+1].name, absPath.parents[i-1].name
-    return None
-
-
-### get file name and dir name from EngineData or WagonData value
-def getFileAndDirNames(engOrWagData) :
-    filename = dirname = None ; valremain = ''
-    val = engOrWagData.strip()
-    vallist = val.split(maxsplit=5)  # we want to know if there are more than 3 words (not counting the closing parenthesis)
-    if len(vallist) == 2 :
-        return vallist[0].strip('"'), vallist[1].strip('"')
-    if val.startswith('"') :
-        m1 = re.search('"([^"]+)"', val)
-        if m1 and m1.lastindex == 1 :
-            filename = m1.group(1)
-        valremain = val[m1.end() + 1:]
-    else :
-        filename, valremain = val.split(maxsplit=1)
-    if valremain.startswith('"') :
-        m2 = re.search('"([^"]+)"', valremain)
-        if m2 and m2.lastindex == 1 :
-            dirname = m2.group(1)
-    else :
-        dirname, valremain = valremain.split(maxsplit=1)
-    return filename, dirname
+import ortsCatalog
+import ortsDiagnostics
+import ortsReadAhead
+import ortsTools
+import ortsWatch
+
+
+### print a row, and keep it for the comparison in watch mode
+def emit(row) :
+    rows.append(row)
+    if not quiet :
+        print(row, flush=True)
+
+
+### report a warning (see ortsDiagnostics); keep it for the comparison in watch mode
+def warn(*args) :
+    message = ' '.join(str(arg) for arg in args)
+    warnings.append(message)
+    if not quiet :
+        diagnostics.warn(*args)
+
+
+### list the rolling stock used by the services, and optionally the rolling stock not used
+def listRollingStock() :
+    global numSrv, numCon, numEng, numWag, numUnusedCon, numUnusedEng, numUnusedWag, rows, warnings
+    rows = [] ; warnings = []
+    stats = collections.Counter()
+    for row in ortsTools.listRollingStockUsed(dirPath, filter, includeNotUsed, catalog, warn, stats, args.read_ahead,
+                                              args.read_ahead_mb * 1024 * 1024, verbose) :
+        emit(ortsTools.formatUsedRow(row))
+    numSrv = stats['services'] ; numCon = stats['Consist'] ; numEng = stats['Engine'] ; numWag = stats['Wagon']
+    numUnusedCon = stats['unused-Consist'] ; numUnusedEng = stats['unused-Engine'] ; numUnusedWag = stats['unused-Wagon']
+
+
+### watch the content folder; after each change, list again (from the catalog) and print the rows that changed
+def watchFolder() :
+    global quiet
+    watcher = ortsWatch.openWatcher(scanPath, ortsCatalog.catalogExtensions, args.interval, verbose)
+    print(f'Info: watching {scanPath} ({watcher.name}) for changes, Ctrl-C to stop.', file=sys.stderr)
+    quiet = True
+    try :
+        for paths in watcher.changes() :
+            catalog.updateFiles(paths, verbose)
+            oldRows = set(rows) ; oldWarnings = set(warnings)
+            listRollingStock()
+            newRows = set(rows)
+            for row in rows :
+                if row not in oldRows : print('+' + row, flush=True)
+            for row in oldRows - newRows :
+                print('-' + row, flush=True)
+            for message in warnings :
+                if message not in oldWarnings : print('Warning:', message, file=sys.stderr)
+            print(f'Info: {len(paths)} files changed, {len(newRows - oldRows)} rows added, {len(oldRows - newRows)} removed.',
+                  file=sys.stderr)
+    except KeyboardInterrupt :
+        pass
+    watcher.close()
 
 
 ### main
@@ -69,149 +73,65 @@ parser = argparse.ArgumentParser(description='Scan Services files and list the E
 parser.add_argument('dirPath', type=pathlib.Path, help='Folder where to search for services. Should be a specific route or the ROUTES folder.')
 parser.add_argument('-f', '--filter', help='Optional filter. "eng" limits to engines, "wag" limits to wagons.')
 parser.add_argument('-a', '--all', action='store_true', help='Also include Engines and Wagons not used by activites (services).')
+parser.add_argument('-c', '--catalog', type=pathlib.Path,
+                    help='Optional catalog (see ORTS-BuildCatalog.py). It is updated, then used instead of reading the files.')
+parser.add_argument('-w', '--watch', action='store_true',
+                    help='After the list, watch the content folder and print the rows added (+) and removed (-) '
+                    'after each change. Ctrl-C to stop.')
+parser.add_argument('--interval', type=float, default=1.0,
+                    help='With --watch, the polling interval in seconds, if inotify is not available. Default is 1.')
+parser.add_argument('--read-ahead', type=int, default=ortsReadAhead.defaultDepth, metavar='K',
+                    help='Number of files read ahead (in the background) while a file is processed; 0 to disable. '
+                    f'Default is {ortsReadAhead.defaultDepth}.')
+parser.add_argument('--read-ahead-mb', type=int, default=ortsReadAhead.defaultMaxBytes // (1024 * 1024), metavar='MB',
+                    help=f'Memory cap for the files read ahead, in MB. Default is {ortsReadAhead.defaultMaxBytes // (1024 * 1024)}.')
+parser.add_argument('--warnings', choices=['all', 'summary'], default='all',
+                    help='"all" prints the warnings (buffered) and a summary per code and package, "summary" only the summary. Default is all.')
+parser.add_argument('--warnings-jsonl', type=pathlib.Path, metavar='FILE',
+                    help='Also write the warnings to a file, one JSON object per warning (level, code, package, file, message).')
 parser.add_argument('-v', '--verbose', action='count', default=0)
 args = parser.parse_args()
 dirPath = args.dirPath
 filter = args.filter
 includeNotUsed = args.all
 verbose = args.verbose
+quiet = False  # in watch mode, the rows and warnings are compared before they are printed
+diagnostics = ortsDiagnostics.Diagnostics(args.warnings, args.warnings_jsonl)
+diagnostics.setPath(dirPath)  # the package of the warnings without a path: the content folder of the route
 
 if not dirPath.is_dir() :
     print( "Error: {} is not a directory.".format(args.dirPath), file=sys.stderr)
     sys.exit(1)
 
-numSrv = numCon = numEng = numWag = numUnusedCon = numUnusedEng = numUnusedWag = numWarn = 0
-processedConsistList = processedEngineList = processedWagonList = []  # list of already processed objects
-
-doEng = doWag = True
-if not includeNotUsed and filter == 'wag' : doEng = False
-elif not includeNotUsed and filter == 'eng' : doWag = False
+# the consists and rolling stock are in the content folder, above the route
+scanPath = ortsTools.getRootPath(dirPath) or dirPath
+if args.catalog :
+    try :
+        catalog = ortsCatalog.openFreshCatalog(args.catalog, scanPath, verbose)
+    except ortsCatalog.CatalogError as e :
+        print( 'Error: {}'.format(e), file=sys.stderr)
+        sys.exit(1)
+elif args.watch :
+    # the parsed files are kept in memory, so that only the changed files need to be read again
+    catalog = ortsCatalog.openCatalog(':memory:', scanPath)
+    catalog.update(scanPath, verbose=verbose)
+else :
+    catalog = None
 
 # header row
 print('Type,ContentDir,DirName,FileName, Path', flush=True)
 
-# for each service file
-for servicePath in dirPath.rglob("*.srv") :
-    if verbose > 0 : print('Info: service', servicePath, file=sys.stderr)
-
-    # find reference to consist file
-    serviceText = readFile(servicePath)
-    m = re.search('Train_Config\\s*\\(\\s*"([^"]+)"\\s*\\)', serviceText, flags=re.IGNORECASE)
-    if m and m.lastindex > 0 :
-        consistFileName = m.group(1)
-    else :
-        m = re.search('Train_Config\\s*\\(\\s*([^)(]+)\\s*\\)', serviceText, flags=re.IGNORECASE)
-        if m and m.lastindex > 0 :
-            consistFileName = m.group(1).strip()
-        else :
-            print("Warning: Unable to find consist name in", servicePath, file=sys.stderr)
-            numWarn += 1
-            continue
-    numSrv += 1
-
-    rootPath, contentDir, routeDir = getContextDirs(servicePath)
-    consistPath = pathlib.Path(f'{rootPath}\\TRAINS\\CONSISTS\\{consistFileName}.con')
-
-    # skip already processed consist
-    if str(consistPath) in processedConsistList :
-        continue
-    if verbose > 0 : print('Info: unique consist', consistPath, file=sys.stderr)
-
-    if not consistPath.is_file() :
-        print(f'Warning: Consist file does not exist: service {servicePath}; consist {consistPath}', file=sys.stderr)
-        numWarn += 1
-        continue
-
-    print(f'Consist,"{contentDir}","","{consistFileName}.con","{consistPath}"', flush=True)
-    consistText = readFile(consistPath)
-    processedConsistList.append(str(consistPath))
-    numCon += 1
-
-    # simplification: assuming that the closing parenthesis is at the end of the line
-    # ie. the two fields are not split over two lines, and there is no other keyword on the same line
-    engMatchList = re.findall('EngineData\\s*\\(\\s*(.+)\\s*\\)\\s*$', consistText, flags=re.IGNORECASE|re.MULTILINE)
-    wagMatchList = re.findall('WagonData\\s*\\(\\s*(.+)\\s*\\)\\s*$', consistText, flags=re.IGNORECASE|re.MULTILINE)
-    if (not engMatchList or len(engMatchList) < 1) and (not wagMatchList or len(wagMatchList) < 1) :
-        print("Warning: No engines or wagons found in consist", consistPath, file=sys.stderr)
-        numWarn += 1
-        continue
-
-    if doEng and engMatchList :
-        for match in engMatchList :
-            fileName, dirName = getFileAndDirNames(match)
-            if not fileName or not dirName :
-                print(f'Warning: Failed to parse EngineData value for consist {consistPath}: value = >{match}<', file=sys.stderr)
-                numWarn += 1
-                continue
-            engPath = pathlib.Path(f'{rootPath}\\TRAINS\\TRAINSET\\{dirName}\\{fileName}.eng')
-            if str(engPath) in processedEngineList :
-                # engine already processed
-                continue
-            if verbose > 0 : print('Info: unique engine', engPath, file=sys.stderr)
-            if not engPath.is_file() :
-                print(f'Warning: Engine file does not exist: consist {consistPath}; engine {engPath}', file=sys.stderr)
-                numWarn += 1
-            else :
-                print(f'Engine,"{contentDir}","{dirName}","{fileName}.eng","{engPath}"', flush=True)
-                processedEngineList.append(str(engPath))
-                numEng += 1
-
-    if doWag and wagMatchList :
-        for match in wagMatchList :
-            fileName, dirName = getFileAndDirNames(match)
-            if not fileName or not dirName :
-                print(f'Warning: Failed to parse WagonData value for consist {consistPath}: value = >{match}<', file=sys.stderr)
-                numWarn += 1
-                continue
-            wagPath = pathlib.Path(f'{rootPath}\\TRAINS\\TRAINSET\\{dirName}\\{fileName}.wag')
-            if str(wagPath) in processedWagonList:
-                # wagon already processed
-                continue
-            if verbose > 0 : print('Info: unique wagon', wagPath, file=sys.stderr)
-            if not wagPath.is_file() :
-                print(f'Warning: Wagon file does not exist: consist {consistPath}; wagon {wagPath}', file=sys.stderr)
-                numWarn += 1
-            else :
-                print(f'Wagon,"{contentDir}","{dirName}","{fileName}.wag","{wagPath}"', flush=True)
-                processedWagonList.append(str(wagPath))
-                numWag += 1
-# end for each service
-
-if includeNotUsed :
-    rootPath = getRootPath(dirPath)
-    if not rootPath :
-        print('Warning: Unable to find root path in', dirPath, file=sys.stderr)
-    else :
-
-        # unused consists
-        consistPath = rootPath / 'TRAINS' / 'CONSISTS'
-        if not consistPath.is_dir() :
-            print('Warning: Consist folder does not exist:', consistPath, file=sys.stderr)
-        else :
-            for conPath in consistPath.rglob("*.con") :
-                if not str(conPath) in processedConsistList :
-                    print(f'unused-Consist,"{rootPath.name}","","{conPath.name}","{conPath}"', flush=True)
-                    numUnusedCon += 1
-
-        # unused engines and wagons
-        engWagPath = rootPath / 'TRAINS' / 'TRAINSET'
-        if not engWagPath.is_dir() :
-            print('Warning: Engine/Waggon folder does not exist:', engWagPath, file=sys.stderr)
-        else :
-            for engPath in engWagPath.rglob("*.eng") :
-                if not str(engPath) in processedEngineList :
-                    print(f'unused-Engine,"{rootPath.name}","{engPath.parent.name}","{engPath.name}","{engPath}"', flush=True)
-                    numUnusedEng += 1
-            for wagPath in engWagPath.rglob("*.wag") :
-                if not str(wagPath) in processedWagonList :
-                    print(f'unused-Wagon,"{rootPath.name}","{wagPath.parent.name}","{wagPath.name}","{wagPath}"', flush=True)
-                    numUnusedWag += 1
-
-
+listRollingStock()
+diagnostics.flush()
 
 print( "Processed {} Eng and {} Wag files, total {}; generated {} warnings; from {} consists, {} services.".format(
-       numEng, numWag, numEng + numWag, numWarn, numCon, numSrv), file=sys.stderr)
+       numEng, numWag, numEng + numWag, diagnostics.numWarn, numCon, numSrv), file=sys.stderr)
 if numUnusedCon > 0 or numUnusedEng > 0 or numUnusedWag > 0:
     print( f'Unused: {numUnusedCon} Consists, {numUnusedEng} Engines, {numUnusedWag} Wagons', file=sys.stderr)
+diagnostics.printSummary()
+diagnostics.close()
+
+if args.watch :
+    watchFolder()
 
 exit(0)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# ORTS-PhysicsOutliers - list the engines and wagons with suspicious physics values, in CSV format, most severe first
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - Reads the output (CSV) of ORTS-RollingStockScanner, or scans folders the same way. The values are converted to
+#   t, m, kW and kN, and kept as columns; see ortsTools.findOutliers().
+# - Each vehicle is compared to the vehicles of the same Type and SubType (or Type, for a small SubType): weight,
+#   length, and power, tractive force, brake force and coupler strength per weight. The comparison is on a log scale,
+#   by robust z-score (median and median absolute deviation), so that a few bad values do not hide each other.
+#   The Severity is the absolute score; the Ratio is the value divided by the median of the group (eg. 10 for a
+#   mass typo with an extra 0).
+# - Then the vehicles without Davis coefficients (Friction column) or without weight, with Severity "missing".
+# - The scanner output is not quoted; a name with commas (DispName) is joined again from the extra columns.
+#
+
+import argparse
+import collections
+import pathlib
+import sys
+
+import ortsTools
+
+numWarn = numScanWarn = 0
+
+
+### print a warning and count it
+def warn( *args) :
+    global numWarn
+    numWarn += 1
+    print( "Warning:", *args, file=sys.stderr)
+
+
+### count a warning of an engine or wagon file; they are listed by ORTS-RollingStockScanner, here only with -v
+def scanWarn( *args) :
+    global numScanWarn
+    numScanWarn += 1
+    if verbose > 0 : print( "Warning:", *args, file=sys.stderr)
+
+
+### read the rows (values by column name) of an ORTS-RollingStockScanner output
+def readScannerCsv( csvPath) :
+    with open( csvPath, encoding='utf-8', errors='replace') as f :
+        heading = f.readline().rstrip( '\r\n').split( ',')
+        if 'Type' not in heading or 'Weight' not in heading :
+            warn( '{} is not an output of ORTS-RollingStockScanner'.format(csvPath))
+            return
+        nameColumn = heading.index( 'DispName') if 'DispName' in heading else None
+        for lineNum, line in enumerate( f, 2) :
+            fields = line.rstrip( '\r\n').split( ',')
+            extra = len(fields) - len(heading)
+            if extra > 0 and nameColumn is not None :
+                fields[nameColumn:nameColumn + extra + 1] = [','.join( fields[nameColumn:nameColumn + extra + 1])]
+            if len(fields) != len(heading) :
+                if line.strip() : warn( 'Unexpected number of columns in {}, line {}'.format(csvPath, lineNum))
+                continue
+            yield dict( zip( heading, fields))
+
+
+### the rows of all the paths: scanner outputs (CSV), or folders to scan
+def readRows( paths) :
+    for path in paths :
+        if path.is_dir() :
+            for row in ortsTools.scanRollingStock( path, warn=scanWarn, stats=stats, verbose=verbose) :
+                yield row.values
+        else :
+            yield from readScannerCsv( path)
+
+
+### main
+parser = argparse.ArgumentParser( description='List the engines and wagons with suspicious physics values (outliers of their '
+                                               'Type and SubType, missing Davis coefficients), in CSV format, most severe first.')
+parser.add_argument( 'paths', type=pathlib.Path, nargs='+', help='Output (CSV) of ORTS-RollingStockScanner, or folder to scan for eng '
+                     'and wag files. Several are analyzed together.')
+parser.add_argument( '-t', '--threshold', type=float, default=3.5,
+                     help='Robust z-score above which a value is an outlier. Default is 3.5.')
+parser.add_argument( '-g', '--min-group', type=int, default=5,
+                     help='Minimum number of vehicles of a Type/SubType to compare them; smaller ones are compared by Type. Default is 5.')
+parser.add_argument( '--no-missing', action='store_true', help='Do not list the vehicles without Davis coefficients or weight.')
+parser.add_argument( '-v', '--verbose', action='count', default=0)
+args = parser.parse_args()
+verbose = args.verbose
+
+for path in args.paths :
+    if not path.exists() :
+        print( "Error: {} does not exist.".format(path), file=sys.stderr)
+        sys.exit(1)
+
+stats = collections.Counter()
+rows = list( readRows( args.paths))
+numOutliers = numMissing = 0
+print( ortsTools.outlierHeading)
+for row in ortsTools.findOutliers( rows, args.threshold, args.min_group, not args.no_missing) :
+    if row.severity is None : numMissing += 1
+    else : numOutliers += 1
+    print( ortsTools.formatOutlierRow( row))
+
+print( 'Analyzed {} engines and wagons; found {} outliers, {} missing values; generated {} warnings{}.'.format(
+       len(rows), numOutliers, numMissing, numWarn, ', {} warnings in engine and wagon files{}'.format(numScanWarn,
+       '' if verbose > 0 else ' (-v to list them)') if numScanWarn else ''), file=sys.stderr)
+exit(0)
@@ -10,368 +10,253 @@
 #
 
 import argparse
+import hashlib
+import json
+import os
 import pathlib
 import re
 import sys
 
+import ortsArchive
+import ortsCatalog
+import ortsDiagnostics
+import ortsReadAhead
+import ortsTools
+import ortsWatch
+
 # global variables
-numEng = numWag = numWarn = 0
+numEng = numWag = 0
+diagnostics = None  # the warnings, counted per code and package (see ortsDiagnostics)
 heading = None
-
-
-### get the content (package) directory, the one above TRAINS
-def getContentDir( filePath) :
-    TRAINS = "TRAINS".casefold()
-    absPath = filePath.resolve()
-    for i in range(len(absPath.parents)) :
-        if absPath.parents[i].name.casefold() == TRAINS and i + 1 < len(absPath.parents) :
-            return absPath.parents[i+1].name
-    return None
-
-
-### read a file that is either utf-16 or utf8
-def readFile( filePath) :
-    enc = "utf-16"
-    bytes = filePath.read_bytes()
-    if 0 < bytes[0] < 128: enc = 'utf-8'
-    return bytes.decode(encoding = enc, errors = 'replace' )
-
-
-#### read the eng or wag file and resolve includes
-def readTrainsetFile(filePath, refDir) :
-    txt = readFile(filePath)  # .replace('\n', ' ').replace('\r', '')
-    # resolve includes
-    ml = re.finditer( 'include\\s*\\(([^)]+)\\)', txt, flags=re.IGNORECASE)
-    for m in ml :
-        incPathName = m.group(1).strip().strip('"')
-        incPath = pathlib.Path(refDir, incPathName).resolve()
-        incTxt = readFile(incPath)
-        txt = txt.replace(m.group(0), incTxt, 1)
-    return txt
-
-
-### get value for a token; exclude quotes
-### is incorrect for nested tokens; stops at the closing parenthesis of a nested token
-def getValue( token, txt) :
-    value = ''
-    start = 0 ; end = 0
-    startPat = token + '\\s*\\(\\s*.' ; endPat = '\\s*\\)'
-    m = re.search(startPat, txt, flags=re.IGNORECASE)  # find opening parenthesis
-    if m :
-        start = m.end() - 1
-        if txt[start] == '"' :
-            start += 1
-            endPat = '"\\s*\\)'
-        m = re.search(endPat, txt[start:], flags=re.IGNORECASE)  # find closing parenthesis
-        if m :
-            end = start + m.start()
-            value = txt[start:end]
-    return value
-
-
-### parse eng or wag file and collect relevant data
-def processFile(values, txt, filePath, isEngine) :
-    global numWarn
-
-    # separate the wagon and engin parts; assumes that wagon is always first
-    wagTxt = txt ; engTxt = ""
-    if isEngine :
-        m = re.search('Engine\\s*\\(\\s*', txt, flags=re.IGNORECASE)
-        if m :
-            engOffset = m.start() ; engTxt = txt[engOffset:] ; wagTxt = txt[:engOffset]
-        else :
-            numWarn += 1
-            print("Warning: Unable to find engine section in", filePath, file=sys.stderr)
-
-    fileSize = filePath.stat().st_size
-    values['FileSize'] = str(fileSize)
-
-    # get wagon name, engine name; nested token, cannot use getValue()
-    name = 'Name' ; values[name] = '_'
-    m = re.search('Wagon\\s*\\(\\s*"?(\\w+)"?', txt, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-    elif not isEngine :
-        numWarn += 1
-        print("Warning: Unable to find wagon name in", filePath, file=sys.stderr)
-    if isEngine :
-        m = re.search('Engine\\s*\\(\\s*"?(\\w+)"?', txt, flags=re.IGNORECASE)
-        if m is None or m.lastindex < 1 :
-            numWarn += 1
-            print("Warning: Unable to find engine name in", filePath, file=sys.stderr)
-        elif not values[name] :
-            values[name] = m.group(1)
-            numWarn += 1
-            print("Warning: Unable to find wagon name (using engine name) in", filePath, file=sys.stderr)
-        elif values[name] != m.group(1) :
-            numWarn += 1
-            print("Warning: Wagon name ({}) does not match engine name ({}) in {}".format(values[name], m.group(1), filePath), file=sys.stderr)
-
-    # display name, may contain spaces, may be quoted; either in wagon or engine section
-    name = 'DispName' ; values[name] = '_'
-    val = getValue('Name', txt)
-    if val : values[name] = val.strip()
-    else :
-        values[name] = values['Name'] + ' (dflt)'  # default to name in Engine or Wagon token
-        if verbose > 0 : print("Info: Unable to find wagon or engine display name in", filePath, file=sys.stderr)
-
-    # wagon type (engine, freight, passenger, etc)
-    name = 'Type' ; values[name] = '_'
-    val = getValue('Type', wagTxt)
-    m = re.search('\\s*(\\w+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-    else :
-        numWarn += 1
-        print("Warning: Unable to find wagon type in", filePath, file=sys.stderr)
-
-    # engine type (diesel, electric, steam, etc)
-    name = 'SubType' ; values[name] = '_'
-    if isEngine :
-        val = getValue('Type', engTxt)
-        m = re.search('\\s*(\\w+)\\s*', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 1 : values[name] = m.group(1)
-        else :
-            numWarn += 1
-            print("Warning: Unable to find engine type in", filePath, file=sys.stderr)
-
-    # engine max velocity
-    name = 'MaxSpeed' ; values[name] = '_'
-    if isEngine :
-        val = getValue('MaxVelocity', engTxt)
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 1 : values[name]  = m.group(1)
-        else :
-            numWarn += 1
-            print("Warning: Unable to find engine max velocity in", filePath, file=sys.stderr)
-
-    # engine max power
-    name = 'MaxPower' ; values[name] = '_'
-    if isEngine :
-        val = getValue('MaximalPower', engTxt)
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 1 : values[name] = "OR " + m.group(1)
-        else :
-            val = getValue('MaxPower', engTxt)
-            m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-            if m and m.lastindex >= 1 : values[name] = m.group(1)
-            else :
-                numWarn += 1
-                print("Warning: Unable to find engine max power in", filePath, file=sys.stderr)
-
-    # engine max force
-    name = 'MaxForce' ; values[name] = '_'
-    if isEngine :
-        val = getValue('MaxForce', engTxt)
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 1 : values[name] = m.group(1)
-        else :
-            numWarn += 1
-            print("Warning: Unable to find engine max force in", filePath, file=sys.stderr)
-
-    # max brake force
-    name = 'MaxBrakeForce' ; values[name] = '_'
-    val = getValue('MaxBrakeForce', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-    else :
-        numWarn += 1
-        print("Warning: Unable to find wagon max brake force in", filePath, file=sys.stderr)
-
-    # weight
-    name = 'Weight' ; values[name] = '_'
-    val = getValue( 'Mass', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*^()]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-    else :
-        numWarn += 1
-        print("Warning: Unable to find wagon weight in", filePath, file=sys.stderr)
-
-    # length, third value
-    name = 'Length' ; values[name] = '_'
-    val = getValue( 'Size', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 3 : values[name] = m.group(3)
-    else :
-        numWarn += 1
-        print("Warning: Unable to find wagon size in", filePath, file=sys.stderr)
-
-    # number of wheels or axles (OR), wagon and engine; has ORTS variants
-    name = 'Wheels/Axles' ; values[name] = '_'
-    val = getValue( 'ORTSNumberAxles', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 :
-        values[name] = "OR " + m.group(1)
-        if isEngine:
-            val = getValue('ORTSNumberDriveAxles', engTxt)
-            m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-            if m and m.lastindex >= 1 : values[name] += " | " + m.group(1)
-            else :
-                numWarn += 1
-                print("Warning: Unable to find engine ORTS number of wheels in", filePath, file=sys.stderr)
-    else :
-        val = getValue('NumWheels', wagTxt)
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 1 :
-            values[name] = m.group(1)
-            if isEngine:
-                val = getValue('NumWheels', engTxt)
-                m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-                if m and m.lastindex >= 1: values[name] += " | " + m.group(1)
-                else :
-                    numWarn += 1
-                    print("Warning: Unable to find engine number of wheels in", filePath, file=sys.stderr)
-        else :
-            numWarn += 1
-            print("Warning: Unable to find wagon number of wheels in", filePath, file=sys.stderr)
-
-    # coupler strength, may occur twice, use second value of each occurrence
-    name = 'CouplerStrength' ; values[name] = '_'
-    first = re.search( 'Coupling\\s*\\(', wagTxt, flags=re.IGNORECASE)
-    if not first :
-        numWarn += 1
-        print("Warning: Unable to find wagon coupler section in", filePath, file=sys.stderr)
-    else :
-        val = getValue('Break', wagTxt[first.start():])
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-        if not m or m.lastindex < 2 :
-            numWarn += 1
-            print("Warning: Unable to find wagon coupler strength in", filePath, file=sys.stderr)
-        else :
-            values[name] = m.group(2)
-            # look for optional second section
-            second = re.search( 'Coupling\\s*\\(', wagTxt[first.end():], flags=re.IGNORECASE)
-            if not second :
-                if verbose > 0 : print("Info: no second coupler section in", filePath, file=sys.stderr)
-            else :
-                val = getValue('Break', wagTxt[second.start():])  # search for second block
-                m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-                if not m or m.lastindex < 2 :
-                    numWarn += 1
-                    print("Warning: Unable to find wagon second coupler strength in", filePath, file=sys.stderr)
-                else :
-                    values[name] += " | " + m.group(2)
-
-    # friction, using the first 5 values only; has ORTS variant
-    name = 'Friction' ; values[name] = '_'
-    val = getValue( 'ORTSDavis_A', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 :
-        values[name] = "OR " + m.group(1)
-        val = getValue('ORTSDavis_B', wagTxt)
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 1:
-            values[name] += " | " + m.group(1)
-            val = getValue('ORTSDavis_C', wagTxt)
-            m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-            if m and m.lastindex >= 1:
-                values[name] += " | " + m.group(1)
-    else :
-        val = getValue('Friction', wagTxt)
-        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+', val, flags=re.IGNORECASE)
-        if m and m.lastindex >= 5 :
-            values[name] = m.group(1) + " | " + m.group(2) + " | " + m.group(3) + " | " + m.group(4) + " | " + m.group(5)
-        else :
-            numWarn += 1
-            print("Warning: Unable to find wagon friction values in", filePath, file=sys.stderr)
-
-    # adhesion, 3 values; has ORTS variant; is in wagon section, but only used for engines
-    name = 'Adhesion' ; values[name] = '_'
-    val = getValue( 'ORTSCurtius_Kniffler', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 4 :
-        values[name] = "OR " + m.group(1) + " | " + m.group(2) + " | " + m.group(3) + " | " + m.group(4)
-    else :
-        val2 = getValue('Adheasion', wagTxt)
-        m2 = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+', val2, flags=re.IGNORECASE)
-        if m2 and m2.lastindex >= 3 : values[name] = m2.group(1) + " | " + m2.group(2) + " | " + m2.group(3)
-        elif isEngine :
-            numWarn += 1
-            print("Warning: Unable to find wagon adhesion values in", filePath, file=sys.stderr)
-
-    # derail rail force
-    name = "DerailRailForce" ; values[name] = '_'
-    val = getValue('DerailRailForce', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*^()]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-    else :
-        numWarn += 1
-        print("Warning: Unable to find wagon derail rail force in", filePath, file=sys.stderr)
-
-    # derail buffer force
-    name = 'DerailBufferForce' ; values[name] = '_'
-    val = getValue('DerailBufferForce', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-    else :
-        numWarn += 1
-        print("Warning: Unable to find wagon derail buffer force in", filePath, file=sys.stderr)
-
-    # length including couplers ORTS only
-    name = 'TotalLength' ; values[name] = '_'
-    val = getValue('ORTSLengthCouplerFace', wagTxt)
-    m = re.search('\\s*([-+0-9.,a-z /*"]+)\\s*', val, flags=re.IGNORECASE)
-    if m and m.lastindex >= 1 : values[name] = m.group(1)
-
-    return
-
-
-### process a path
-def processPath( path, isEngine) :
-    global heading, numWarn
-    rowValues = {}
-    packageName = getContentDir( path)
-    if not packageName :
-        print("Warning: ignoring {}, could not find package name".format(path), file=sys.stderr)
-        numWarn += 1
-        return  # do not process files outside the TRAINS directory
-    rowValues["Package"] = packageName
-    rowValues["Directory"] = path.parent.name
-    rowValues["File"] = path.name
-    text = readTrainsetFile(path, path.parent)
-    processFile(rowValues, text, path, isEngine)
+rows = {}  # in watch mode, the rows printed, by path; to show what changed
+record = None  # in shard mode, the row and warnings of the file being processed
+
+
+### report a warning (see ortsDiagnostics); in shard mode, also keep it for the partial result
+def warn( *args) :
+    diagnostics.warn( *args)
+    if record is not None :
+        record['warnings'].append( ' '.join( str(arg) for arg in args))
+
+
+### process a path, from the catalog if there is one; the text (eng or wag file with includes) may have been read ahead
+### in watch mode, only the rows that changed are printed again
+def processPath( path, isEngine, textFuture=None) :
+    rowValues = ortsTools.getRollingStock( path, isEngine, catalog, warn, verbose, textFuture)
+    if args.watch :
+        oldValues = rows.pop( str(path), None)
+        if oldValues and rowValues :
+            diffs = ['{} {} -> {}'.format(name, oldValues.get(name), value) for name, value in rowValues.items()
+                     if oldValues.get(name) != value]
+            if not diffs : return
+            print( 'Info: changed {}: {}'.format(path, '; '.join(diffs)), file=sys.stderr)
+        if rowValues :
+            rows[str(path)] = rowValues
+    if rowValues :
+        printRow(rowValues)
+
+
+### watch the folder, and print the rows of the engines and wagons that changed, or that include a changed file
+def watchFolder() :
+    global numEng, numWag
+    watcher = ortsWatch.openWatcher( dirPath, ortsCatalog.catalogExtensions, args.interval, verbose)
+    print( 'Info: watching {} ({}) for changes, Ctrl-C to stop.'.format(dirPath, watcher.name), file=sys.stderr)
+    try :
+        for paths in watcher.changes() :
+            readKeys, removedKeys = catalog.updateFiles( paths, verbose)
+            numRows = 0
+            for key in readKeys :
+                path = catalog.getPath( key)
+                if not ortsTools.isRollingStockSelected( path, filter) : continue
+                if verbose > 1 : print( "...processing", path, file=sys.stderr)
+                isEngine = path.suffix.casefold() == '.eng'
+                if isEngine : numEng += 1
+                else : numWag += 1
+                diagnostics.setPath( path)
+                processPath( path, isEngine)
+                numRows += 1
+            for path in [path for path in rows if catalog.getKey( path) in removedKeys] :
+                print( 'Info: removed {}'.format(path), file=sys.stderr)
+                del rows[path]
+            diagnostics.flush()
+            print( 'Info: {} files changed, {} engines and wagons read again.'.format(len(paths), numRows), file=sys.stderr)
+    except KeyboardInterrupt :
+        pass
+    watcher.close()
+
+
+### print the values of a file as a CSV row, with a heading before the first row; in shard mode, keep them
+def printRow( rowValues) :
+    global heading
+    if record is not None :
+        record['row'] = rowValues
+        return
     if heading is None :
         heading = rowValues.keys()
         print(*heading, sep=',')
-    print( *rowValues.values(), sep=',')
-    return
+    print( *rowValues.values(), sep=',', flush=args.watch)
+
+
+### get the shard (1 to N) of a file: a stable hash of the path relative to the folder, the same on all machines
+def getShard( path) :
+    relPath = os.path.relpath( path, dirPath).replace( os.sep, '/').casefold()
+    return int.from_bytes( hashlib.blake2b( relPath.encode(), digest_size=8).digest(), 'big') % numShards + 1
+
+
+### parse the --shard value, i/N
+def parseShard( value) :
+    m = re.fullmatch( '\\s*(\\d+)\\s*/\\s*(\\d+)\\s*', value)
+    if not m or not 1 <= int(m.group(1)) <= int(m.group(2)) :
+        raise argparse.ArgumentTypeError( 'expecting i/N, with 1 <= i <= N, eg. 2/4')
+    return int(m.group(1)), int(m.group(2))
+
+
+### read the partial results of the shards; returns the records by relative path
+def readPartials( partialPaths) :
+    global numShards
+    records = {} ; shards = set()
+    for partialPath in partialPaths :
+        with open( partialPath, encoding='utf-8') as f :
+            partial = json.load( f)
+        if partial['filter'] != filter :
+            print( 'Error: {} was created with filter {}, not {}.'.format(partialPath, partial['filter'], filter), file=sys.stderr)
+            sys.exit(1)
+        if numShards and partial['shards'] != numShards or partial['shard'] in shards :
+            print( 'Error: {} is shard {}/{}, which does not fit the other partial results.'.format(
+                   partialPath, partial['shard'], partial['shards']), file=sys.stderr)
+            sys.exit(1)
+        numShards = partial['shards'] ; shards.add( partial['shard'])
+        if verbose > 0 :
+            print( 'Info: shard {}/{}: {} Eng and {} Wag files, {} warnings'.format(partial['shard'], partial['shards'],
+                   partial['numEng'], partial['numWag'], partial['numWarn']), file=sys.stderr)
+        for fileRecord in partial['files'] :
+            records[fileRecord['path']] = fileRecord
+    missing = sorted( set( range(1, numShards + 1)) - shards)
+    if missing :
+        print( 'Error: the partial results of shards {} are missing.'.format(', '.join( map( str, missing))), file=sys.stderr)
+        sys.exit(1)
+    return records
+
+
+### output the row and warnings of a file from the partial results; a file not in them (eg. new) is processed
+def mergeRecord( path, isEngine, textFuture) :
+    relPath = os.path.relpath( path, dirPath).replace( os.sep, '/')
+    fileRecord = records.pop( relPath, None)
+    if fileRecord is None :
+        if verbose > 0 : print( 'Info: {} is not in the partial results, processing it'.format(path), file=sys.stderr)
+        processSelected( path, isEngine, textFuture)
+        return
+    diagnostics.setPath( path)
+    for message in fileRecord['warnings'] :
+        warn( message)
+    if fileRecord['row'] :
+        printRow( fileRecord['row'])
+
+
+### process a selected file; in shard mode, keep the row and warnings for the partial result
+def processSelected( path, isEngine, textFuture) :
+    global record
+    if shard :
+        record = {'path': os.path.relpath( path, dirPath).replace( os.sep, '/'), 'row': None, 'warnings': []}
+        partialFiles.append( record)
+    diagnostics.setPath( path)
+    processPath( path, isEngine, textFuture)
+    record = None
 
 
 ### main
 parser = argparse.ArgumentParser()
-parser.add_argument('dirPath', type=pathlib.Path, help='Directory where to search for eng and wag files.')
+parser.add_argument('dirPath', type=pathlib.Path, help='Directory where to search for eng and wag files, including in the zip '
+                    'files below it. Or a zip file (content pack).')
 parser.add_argument('-f', '--filter',
                     help='Optional filter. "eng" limits to engines, "wag" limits to wagons, any other value is matched to the file name')
+parser.add_argument('-c', '--catalog', type=pathlib.Path,
+                    help='Optional catalog (see ORTS-BuildCatalog.py). It is updated, then used instead of reading the files.')
+parser.add_argument('--max-age', type=float, metavar='MINUTES',
+                    help='With --catalog, do not update the catalog (walk the folder) if it was walked less than MINUTES ago. '
+                    'The changes since are then not seen.')
+parser.add_argument('-w', '--watch', action='store_true',
+                    help='After the list, watch the folder and print the rows of the engines and wagons that change, '
+                    'or that include a file that changes. Ctrl-C to stop.')
+parser.add_argument('--interval', type=float, default=1.0,
+                    help='With --watch, the polling interval in seconds, if inotify is not available. Default is 1.')
+parser.add_argument('--shard', type=parseShard,
+                    help='Only process the files of shard i of N (i/N, eg. 2/4), and output a partial result (JSON) '
+                    'instead of the CSV. The shards can run on different machines; combine them with --merge.')
+parser.add_argument('--merge', action='append', metavar='PARTIAL',
+                    help='Combine the partial results of all the shards into the CSV, the same as a run without shards. '
+                    'Repeat for each partial result.')
+parser.add_argument('--read-ahead', type=int, default=ortsReadAhead.defaultDepth, metavar='K',
+                    help='Number of files read ahead (in the background) while a file is processed; 0 to disable. '
+                    'Default is {}.'.format(ortsReadAhead.defaultDepth))
+parser.add_argument('--read-ahead-mb', type=int, default=ortsReadAhead.defaultMaxBytes // (1024 * 1024), metavar='MB',
+                    help='Memory cap for the files read ahead, in MB. Default is {}.'.format(ortsReadAhead.defaultMaxBytes // (1024 * 1024)))
+parser.add_argument('--warnings', choices=['all', 'summary'], default='all',
+                    help='"all" prints the warnings (buffered) and a summary per code and package, "summary" only the summary. Default is all.')
+parser.add_argument('--warnings-jsonl', type=pathlib.Path, metavar='FILE',
+                    help='Also write the warnings to a file, one JSON object per warning (level, code, package, file, message).')
 parser.add_argument('-v', '--verbose', action='count', default=0)
 args = parser.parse_args()
 dirPath = args.dirPath
 filter = args.filter
 verbose = args.verbose
+catalog = None
+shard, numShards = args.shard or (None, 0)
+partialFiles = []  # in shard mode, the records of the files processed
+records = {}  # in merge mode, the records of the partial results
 
-if not dirPath.is_dir() :
-    print( "Error: {} is not a directory.".format(args.dirPath), file=sys.stderr)
-    sys.exit(1)
+if args.watch and (args.shard or args.merge) or args.shard and args.merge :
+    parser.error( 'only one of --watch, --shard and --merge can be specified')
+diagnostics = ortsDiagnostics.Diagnostics( args.warnings, args.warnings_jsonl)
 
-doEng = doWag = True
-pattern = None
-if filter == 'wag' : doEng = False
-elif filter == 'eng' : doWag = False
-elif filter : pattern = re.compile(filter, flags=re.IGNORECASE)
-
-# process engine files
-if doEng :
-    for path in dirPath.rglob( "*.eng") :
-        if pattern and not pattern.search(path.name) : continue
-        if verbose > 1 : print( "...processing engine ", path, file=sys.stderr)
-        numEng += 1
-        processPath( path, True)
-
-# process wagon files
-if doWag :
-    for path in dirPath.rglob( "*.wag") :
-        if pattern and not pattern.search(path.name) : continue
-        elif path.name == 'default.wag' : continue
-        if verbose > 1 : print( "...processing wagon ", path, file=sys.stderr)
-        numWag += 1
-        processPath( path, False)
-
-print( "Processed {} Eng and {} Wag files, total {}; generated {} warnings".format( numEng, numWag, numEng + numWag, numWarn), file=sys.stderr)
+if not dirPath.is_dir() and not ortsArchive.isArchive( dirPath) :
+    print( "Error: {} is not a directory or a zip file.".format(args.dirPath), file=sys.stderr)
+    sys.exit(1)
+if (args.catalog or args.watch) and not dirPath.is_dir() :
+    parser.error( '--catalog and --watch are not supported for a zip file')
+if args.max_age is not None and not args.catalog :
+    parser.error( '--max-age requires --catalog')
+
+if args.catalog :
+    try :
+        catalog = ortsCatalog.openFreshCatalog( args.catalog, dirPath, verbose,
+                                                None if args.max_age is None else args.max_age * 60)
+    except ortsCatalog.CatalogError as e :
+        print( 'Error: {}'.format(e), file=sys.stderr)
+        sys.exit(1)
+elif args.watch :
+    # the parsed files are kept in memory, so that only the changed files need to be read again
+    catalog = ortsCatalog.openCatalog( ':memory:', dirPath)
+    catalog.update( dirPath, verbose=verbose)
+
+if args.merge :
+    records = readPartials( args.merge)
+
+# process engine files, then wagon files; the files are read ahead, unless the catalog or the partial results have the rows
+selected = (path for path in ortsTools.listRollingStock( dirPath, filter, catalog) if not shard or getShard( path) == shard)
+depth = 0 if catalog or args.merge else args.read_ahead
+for path, textFuture in ortsReadAhead.readAhead( selected, ortsTools.expandFile, depth, maxBytes=args.read_ahead_mb * 1024 * 1024) :
+    isEngine = path.suffix.casefold() == '.eng'
+    if verbose > 1 : print( "...processing engine " if isEngine else "...processing wagon ", path, file=sys.stderr)
+    if isEngine : numEng += 1
+    else : numWag += 1
+    if args.merge : mergeRecord( path, isEngine, textFuture)
+    else : processSelected( path, isEngine, textFuture)
+
+if shard :
+    json.dump( {'shard': shard, 'shards': numShards, 'filter': filter, 'numEng': numEng, 'numWag': numWag,
+                'numWarn': diagnostics.numWarn, 'files': partialFiles}, sys.stdout)
+    print()
+elif records :
+    print( 'Info: {} files in the partial results no longer exist, eg. {}'.format(len(records), next( iter( records))),
+           file=sys.stderr)
+
+diagnostics.flush()
+if args.watch :
+    watchFolder()
+
+print( "Processed {} Eng and {} Wag files, total {}; generated {} warnings{}".format( numEng, numWag, numEng + numWag,
+       diagnostics.numWarn, ' (shard {}/{})'.format(shard, numShards) if shard else ''), file=sys.stderr)
+diagnostics.printSummary()
+diagnostics.close()
 exit(0)
@@ -5,37 +5,78 @@
 #
 
 import argparse
+import concurrent.futures
+import os
 import pathlib
-import re
 import sys
 
+from ortsTools import expandFile, includeCache  # include files are read once, shared by the batch workers
 
-### read a file that is either utf-16 or utf8
-def readFile( filePath) :
-    enc = "utf-16"
-    bytes = filePath.read_bytes()
-    if 0 < bytes[0] < 128: enc = 'utf-8'
-    return bytes.decode(encoding = enc, errors = 'replace' )
 
+### get the eng and wag files for batch mode, from a folder or a glob pattern
+### returns the base folder (to make the output paths relative to) and the list of files
+def getBatchFiles( pathArg) :
+    if pathArg.is_dir() :
+        baseDir = pathArg
+        files = list(pathArg.rglob('*'))
+    else :
+        # the base folder is the part of the pattern before the first wildcard
+        baseParts = []
+        for part in pathArg.parts :
+            if any(c in part for c in '*?[') : break
+            baseParts.append(part)
+        baseDir = pathlib.Path(*baseParts) if baseParts else pathlib.Path('.')
+        pattern = str(pathArg.relative_to(baseDir))
+        files = list(baseDir.glob(pattern))
+    return baseDir, [f for f in files if f.suffix.casefold() in ('.eng', '.wag') and f.is_file()]
 
-#### read the eng or wag file and resolve includes
-def readTrainsetFile(filePath, refDir) :
-    txt = readFile(filePath)
-    # resolve includes
-    ml = re.finditer( 'include\\s*\\(([^)]+)\\)', txt, flags=re.IGNORECASE)
-    for m in ml :
-        incPathName = m.group(1).strip().strip('"')
-        incPath = pathlib.Path(refDir, incPathName).resolve()
-        incTxt = readFile(incPath)
-        txt = txt.replace(m.group(0), incTxt, 1)
-    return txt
+
+### expand one file and write it to the output folder, in a single write
+def expandToFile( filePath, outPath, encoding) :
+    text = expandFile(filePath)
+    outPath.parent.mkdir(parents=True, exist_ok=True)
+    with open(outPath, 'w', encoding=encoding, newline='') as f :
+        f.write(text)
+    return text.count('\n')
 
 
 ### main
 parser = argparse.ArgumentParser()
-parser.add_argument('filePath', type=pathlib.Path, help='File (eng or wag) to list.')
+parser.add_argument('filePath', type=pathlib.Path, help='File (eng or wag) to list. With --output-dir, a folder or glob pattern '
+                    '(eg. "TRAINSET/*/*.eng") of files to expand.')
+parser.add_argument('-o', '--output-dir', type=pathlib.Path, help='Batch mode. Folder where to write the expanded files, '
+                    'in the same relative location as the source files.')
+parser.add_argument('-e', '--encoding', choices=['utf-8', 'utf-16'], default='utf-8',
+                    help='Encoding of the files written in batch mode. Default is utf-8 (OpenRails); MSTS uses utf-16.')
+parser.add_argument('-j', '--jobs', type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                    help='Number of files to expand in parallel in batch mode.')
 args = parser.parse_args()
 filePath = args.filePath
+outputDir = args.output_dir
+
+if outputDir :
+    baseDir, files = getBatchFiles(filePath)
+    if not files :
+        print( "Error: no eng or wag files found in {}.".format(filePath), file=sys.stderr)
+        sys.exit(1)
+    if outputDir.resolve() == baseDir.resolve() :
+        print( "Error: the output folder {} must not be the source folder.".format(outputDir), file=sys.stderr)
+        sys.exit(1)
+
+    numFiles = numLines = numErrors = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor :
+        futures = {executor.submit(expandToFile, path, outputDir / path.relative_to(baseDir), args.encoding) : path for path in files}
+        for future in concurrent.futures.as_completed(futures) :
+            try :
+                numLines += future.result()
+                numFiles += 1
+            except (OSError, UnicodeError) as e :
+                print( "Error: unable to expand {}: {}".format(futures[future], e), file=sys.stderr)
+                numErrors += 1
+
+    print( 'Expanded {} files ({} lines, {} include files) to {}; {} errors'.format(
+           numFiles, numLines, len(includeCache), outputDir, numErrors), file=sys.stderr)
+    exit(1 if numErrors > 0 else 0)
 
 if not filePath.is_file() :
     print( "Error: {} is not a file. A single .eng or .wag file is required.".format(filePath), file=sys.stderr)
@@ -45,12 +86,11 @@ if filePath.suffix != '.eng' and filePath.suffix != '.wag' :
     print("Warning: {} is not an engine or wagon file.".format(filePath), file=sys.stderr)
     if input('Do you want to continue? (y/n) ') != 'y': exit(0)
 
-text = readTrainsetFile(filePath, filePath.parent)
+text = expandFile(filePath)
 
-numLines = 0
-for line in text.splitlines() :
-    print( line)
-    numLines += 1
+lines = text.splitlines()
+sys.stdout.write('\n'.join(lines) + '\n')
+numLines = len(lines)
 
 print( numLines, 'lines in expanded file ', filePath, file=sys.stderr)
 
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# ORTS-Tools - the content tools as sub-commands of one script: scan, list-used, copy, find, expand, validate, footprint,
+# outliers and batch
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - The sub-commands are the functions of ortsTools, which can also be called from Python. The modules are only
+#   imported when a sub-command runs, so that the script starts fast (eg. "ORTS-Tools.py -h").
+# - "batch" runs the sub-commands in a file (one per line, eg. "list-used ROUTES/MyRoute -f eng"; # for comments),
+#   or from stdin, in one process. The include files read and the catalogs opened (-c) are kept between them.
+#   The output of all the sub-commands goes to stdout, one after the other.
+# - The output is the same as the one of the script of the operation (ORTS-RollingStockScanner,
+#   ORTS-ListRollingStockUsed, ORTS-CopyTrains, ORTS-FindConfigParam, ORTS-ShowRollingStockFile, ORTS-ValidateContent,
+#   ORTS-AssetFootprint, ORTS-PhysicsOutliers).
+#
+
+import argparse
+import pathlib
+import shlex
+import sys
+
+
+### print a warning and count it
+def warn( *args) :
+    global numWarn
+    numWarn += 1
+    print( "Warning:", *args, file=sys.stderr)
+
+
+### an error that ends a sub-command, with a message; the following sub-commands of a batch still run
+class CommandError( Exception) :
+    pass
+
+
+### open the catalog of an operation, if specified; it is kept for the following sub-commands
+def getCatalog( args, dirPath) :
+    if not args.catalog :
+        return None
+    import ortsCatalog
+    import ortsTools
+    try :
+        maxAge = getattr( args, 'max_age', None)  # copy has no --max-age
+        return ortsTools.getCatalog( args.catalog, dirPath, args.verbose, None if maxAge is None else maxAge * 60)
+    except ortsCatalog.CatalogError as e :
+        raise CommandError( e)
+
+
+### scan: the attributes of the engines and wagons, in CSV format
+def scan( args) :
+    import collections
+    import ortsTools
+    stats = collections.Counter() ; heading = None
+    for row in ortsTools.scanRollingStock( args.dirPath, args.filter, getCatalog( args, args.dirPath), warn, stats,
+                                           args.read_ahead, args.read_ahead_mb * 1024 * 1024, args.verbose) :
+        if heading is None :
+            heading = row.values.keys()
+            print( *heading, sep=',')
+        print( *row.values.values(), sep=',')
+    print( "Processed {} Eng and {} Wag files, total {}; generated {} warnings".format(
+           stats['Engine'], stats['Wagon'], stats['Engine'] + stats['Wagon'], numWarn), file=sys.stderr)
+    return 0
+
+
+### list-used: the consists, engines and wagons used by the services of the routes, in CSV format
+def listUsed( args) :
+    import collections
+    import ortsTools
+    catalog = getCatalog( args, ortsTools.getRootPath( args.dirPath) or args.dirPath)
+    stats = collections.Counter()
+    print( 'Type,ContentDir,DirName,FileName, Path')
+    for row in ortsTools.listRollingStockUsed( args.dirPath, args.filter, args.all, catalog, warn, stats, args.read_ahead,
+                                               args.read_ahead_mb * 1024 * 1024, args.verbose) :
+        print( ortsTools.formatUsedRow( row))
+    print( "Processed {} Eng and {} Wag files, total {}; generated {} warnings; from {} consists, {} services.".format(
+           stats['Engine'], stats['Wagon'], stats['Engine'] + stats['Wagon'], numWarn, stats['Consist'], stats['services']),
+           file=sys.stderr)
+    return 0
+
+
+### copy: copy the consists and trainset folders needed by a route; one line per consist or trainset folder
+def copy( args) :
+    import ortsTools
+    try :
+        ortsTools.getCopyFolders( args.routePath, args.contentPaths)
+    except NotADirectoryError as e :
+        print( 'Error: {}'.format(e), file=sys.stderr)
+        return 1
+    catalog = getCatalog( args, args.contentPaths[0])
+    for contentPath in args.contentPaths[1:] :
+        if catalog and catalog.contains( contentPath) : catalog.update( contentPath, verbose=args.verbose)
+    numCopied = 0
+    contentPaths = ortsTools.getContentPaths( args.contentPaths)
+    for row in ortsTools.copyTrainsRows( args.routePath, contentPaths, catalog, warn, args.verbose) :
+        if row.status == 'missing' : warn( '{} "{}" from "{}" does not exist in any content folder ({}).'.format(
+                                           row.type, row.name, row.reference, row.source))
+        if row.status == 'copied' : numCopied += 1
+        print( '{},{},"{}","{}","{}","{}"'.format(row.status, row.type, row.name, row.source, row.destination, row.contentPath or ''))
+    print( 'Sum: copied {} Consists and Trainsets folders.'.format( numCopied), file=sys.stderr)
+    return 0
+
+
+### find: the parameters near a context, or the blocks at block paths, in the config files
+def find( args) :
+    import collections
+    import ortsTools
+    if not args.query and (args.paramName is None or args.context is None) :
+        print( 'Error: paramName and context are required unless a --query is specified', file=sys.stderr)
+        return 2
+    stats = collections.Counter() ; numMatches = 0
+    for row in ortsTools.findConfigParam( args.dirPath, args.filePat, args.paramName, args.context, args.range, args.query,
+                                          args.expand_includes, getCatalog( args, args.dirPath), warn, stats, args.read_ahead,
+                                          args.read_ahead_mb * 1024 * 1024, args.verbose) :
+        numMatches += 1
+        print( ortsTools.formatFindRow( row, args.jsonl, args.expand_includes, args.line_number))
+    print( 'Processed {} config files, found {} matches.'.format(stats['files'], numMatches), file=sys.stderr)
+    return 0
+
+
+### expand: output eng and wag files with the includes resolved
+def expand( args) :
+    import ortsTools
+    status = 0
+    for filePath in args.filePaths :
+        try :
+            text = ortsTools.expandFile( filePath)
+        except (OSError, UnicodeError) as e :
+            print( "Error: unable to expand {}: {}".format(filePath, e), file=sys.stderr)
+            status = 1
+            continue
+        sys.stdout.write( '\n'.join( text.splitlines()) + '\n')
+    return status
+
+
+### validate: the broken references of a route or content folder, in CSV format
+def validate( args) :
+    import collections
+    import ortsTools
+    stats = collections.Counter() ; numBroken = 0
+    if not args.jsonl : print( 'Problem,Reference,Expected,ReferencedBy')
+    for row in ortsTools.validateReferences( args.dirPath, warn, stats, args.jobs, args.verbose) :
+        numBroken += 1
+        print( ortsTools.formatBrokenRow( row, args.jsonl))
+    print( 'Checked {} services, {} consists, {} engines and wagons, {} shapes, {} textures; found {} broken references.'.format(
+           stats['services'], stats['consists'], stats['engines and wagons'], stats['shapes'], stats['textures'], numBroken),
+           file=sys.stderr)
+    return 1 if numBroken > 0 else 0
+
+
+### footprint: the shape and texture data loaded by the engines, wagons and consists, in CSV format
+def footprint( args) :
+    import collections
+    import ortsTools
+    stats = collections.Counter()
+    sortKeys = {'memory': 'textureMemory', 'textures': 'textureBytes', 'shapes': 'shapeBytes', 'pixels': 'texturePixels'}
+    rows = sorted( ortsTools.assetFootprints( args.dirPath, warn, stats, args.jobs, args.verbose),
+                   key=lambda row : getattr( row, sortKeys[args.sort]), reverse=True)
+    print( ortsTools.footprintHeading)
+    for row in rows :
+        print( ortsTools.formatFootprintRow( row))
+    print( 'Processed {} consists, {} engines, {} wagons; read {} shapes, {} texture headers; generated {} warnings.'.format(
+           stats['Consist'], stats['Engine'], stats['Wagon'], stats['shapes'], stats['textures'], numWarn), file=sys.stderr)
+    return 0
+
+
+### outliers: the engines and wagons with suspicious physics values, in CSV format, most severe first
+def outliers( args) :
+    import collections
+    import ortsTools
+    stats = collections.Counter()
+    rows = [row.values for row in ortsTools.scanRollingStock( args.dirPath, warn=warn, stats=stats, verbose=args.verbose)]
+    numOutliers = numMissing = 0
+    print( ortsTools.outlierHeading)
+    for row in ortsTools.findOutliers( rows, args.threshold, args.min_group, not args.no_missing) :
+        if row.severity is None : numMissing += 1
+        else : numOutliers += 1
+        print( ortsTools.formatOutlierRow( row))
+    print( 'Analyzed {} engines and wagons; found {} outliers, {} missing values; generated {} warnings.'.format(
+           len(rows), numOutliers, numMissing, numWarn), file=sys.stderr)
+    return 0
+
+
+### batch: run the sub-commands in a file, or from stdin, in this process
+def batch( args) :
+    status = 0
+    lines = open( args.batchFile, encoding='utf-8') if args.batchFile else sys.stdin
+    for line in lines :
+        argv = shlex.split( line, comments=True)
+        if not argv : continue
+        if argv[0] == 'batch' :
+            print( 'Error: batch cannot be nested: {}'.format(line.strip()), file=sys.stderr)
+            status = 1
+            continue
+        if args.verbose > 0 : print( 'Info: running', line.strip(), file=sys.stderr)
+        status = max( status, run( argv))
+        sys.stdout.flush()
+    return status
+
+
+### build the parser of the sub-commands
+def getParser() :
+    parser = argparse.ArgumentParser( description='Run the content tools as sub-commands: scan, list-used, copy, find, '
+                                      'expand, validate, footprint, outliers; or a batch of them in one process.')
+    commands = parser.add_subparsers( dest='command', required=True)
+
+    def add( name, function, help) :
+        sub = commands.add_parser( name, help=help, description=help)
+        sub.set_defaults( function=function)
+        sub.add_argument( '-v', '--verbose', action='count', default=0)
+        return sub
+
+    def addCatalog( sub) :
+        sub.add_argument( '-c', '--catalog', type=pathlib.Path,
+                          help='Optional catalog (see ORTS-BuildCatalog.py). It is updated, then used instead of reading the files.')
+        sub.add_argument( '--max-age', type=float, metavar='MINUTES',
+                          help='Do not update the catalog if the folder was walked less than MINUTES ago.')
+        sub.add_argument( '--read-ahead', type=int, default=8, metavar='K',
+                          help='Number of files read ahead (in the background) while a file is processed; 0 to disable. Default is 8.')
+        sub.add_argument( '--read-ahead-mb', type=int, default=64, metavar='MB',
+                          help='Memory cap for the files read ahead, in MB. Default is 64.')
+
+    sub = add( 'scan', scan, 'List the key properties of the eng and wag files, in CSV format (see ORTS-RollingStockScanner.py).')
+    sub.add_argument( 'dirPath', type=pathlib.Path, help='Directory where to search for eng and wag files.')
+    sub.add_argument( '-f', '--filter', help='"eng" limits to engines, "wag" limits to wagons, any other value is matched to the file name.')
+    addCatalog( sub)
+
+    sub = add( 'list-used', listUsed, 'List the consists, engines and wagons used by the services (see ORTS-ListRollingStockUsed.py).')
+    sub.add_argument( 'dirPath', type=pathlib.Path, help='Folder where to search for services. Should be a specific route or the ROUTES folder.')
+    sub.add_argument( '-f', '--filter', help='"eng" limits to engines, "wag" limits to wagons.')
+    sub.add_argument( '-a', '--all', action='store_true', help='Also include Engines and Wagons not used by activites (services).')
+    addCatalog( sub)
+
+    sub = add( 'copy', copy, 'Copy the consists and rolling stock needed by a route from other content folders (see ORTS-CopyTrains.py).')
+    sub.add_argument( 'routePath', type=pathlib.Path, help='Route folder, to copy the trains to.')
+    sub.add_argument( 'contentPaths', type=pathlib.Path, nargs='+', metavar='contentPath',
+                      help='Content folder, to copy the trains from. Several are searched in the order specified.')
+    sub.add_argument( '-c', '--catalog', type=pathlib.Path, help='Optional catalog of the content folders to copy from.')
+
+    sub = add( 'find', find, 'Find config files with a parameter near a context, or blocks at block paths (see ORTS-FindConfigParam.py).')
+    sub.add_argument( 'dirPath', type=pathlib.Path, help='Directory where to search for config files.')
+    sub.add_argument( 'filePat', help='Pattern for the config file name, eg: "*.cvf".')
+    sub.add_argument( 'paramName', nargs='?', help='Name of parameter to search for. Not used with --query.')
+    sub.add_argument( 'context', nargs='?', help='A string (regex) that needs to be near the parameter. Not used with --query.')
+    sub.add_argument( '-r', '--range', type=int, default=200, help='The max distance to look for context. Default is 200 characters.')
+    sub.add_argument( '-q', '--query', action='append', help='Block path to search for, eg: "Engine/Effects/**/Exhaust1". May be repeated.')
+    sub.add_argument( '-j', '--jsonl', action='store_true', help='Output one JSON object per match.')
+    sub.add_argument( '-n', '--line-number', action='store_true', help='Output the line of each match after the file.')
+    sub.add_argument( '-x', '--expand-includes', action='store_true', help='Search the files with includes expanded.')
+    addCatalog( sub)
+
+    sub = add( 'expand', expand, 'Output eng and wag files in UTF-8, resolving includes (see ORTS-ShowRollingStockFile.py).')
+    sub.add_argument( 'filePaths', type=pathlib.Path, nargs='+', help='Files (eng or wag) to output.')
+
+    sub = add( 'validate', validate, 'List the broken references of a route or content folder (see ORTS-ValidateContent.py).')
+    sub.add_argument( 'dirPath', type=pathlib.Path, help='Route folder (or ROUTES folder), or content folder.')
+    sub.add_argument( '-j', '--jsonl', action='store_true', help='Output one JSON object per broken reference, instead of CSV.')
+    sub.add_argument( '--jobs', type=int, default=8, help='Number of files read in parallel. Default is 8.')
+
+    sub = add( 'footprint', footprint, 'List the shape and texture data loaded by the engines, wagons and consists (see ORTS-AssetFootprint.py).')
+    sub.add_argument( 'dirPath', type=pathlib.Path, help='Route folder (or ROUTES folder), or content folder.')
+    sub.add_argument( '-s', '--sort', choices=['memory', 'textures', 'shapes', 'pixels'], default='memory',
+                      help='Sort by texture memory, texture size, shape size or texture pixels, largest first. Default is memory.')
+    sub.add_argument( '--jobs', type=int, default=8, help='Number of files read in parallel. Default is 8.')
+
+    sub = add( 'outliers', outliers, 'List the engines and wagons with suspicious physics values (see ORTS-PhysicsOutliers.py).')
+    sub.add_argument( 'dirPath', type=pathlib.Path, help='Directory where to search for eng and wag files.')
+    sub.add_argument( '-t', '--threshold', type=float, default=3.5, help='Robust z-score above which a value is an outlier. Default is 3.5.')
+    sub.add_argument( '-g', '--min-group', type=int, default=5,
+                      help='Minimum number of vehicles of a Type/SubType to compare them; smaller ones are compared by Type. Default is 5.')
+    sub.add_argument( '--no-missing', action='store_true', help='Do not list the vehicles without Davis coefficients or weight.')
+
+    sub = add( 'batch', batch, 'Run the sub-commands in a file (one per line), or from stdin, in one process.')
+    sub.add_argument( 'batchFile', type=pathlib.Path, nargs='?', help='File with the sub-commands. Default is stdin.')
+    return parser
+
+
+### run a sub-command; returns the exit status
+def run( argv) :
+    global numWarn
+    numWarn = 0
+    try :
+        args = getParser().parse_args( argv)
+    except SystemExit as e :
+        return e.code if isinstance( e.code, int) else 2  # error in a batch line, or --help
+    try :
+        return args.function( args)
+    except CommandError as e :
+        print( 'Error: {}'.format(e), file=sys.stderr)
+        return 1
+
+
+### main
+numWarn = 0
+if __name__ == '__main__' :
+    sys.exit( run( sys.argv[1:]))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# ORTS-ValidateContent - list the broken references (missing files) of a route or content folder, in CSV format
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - Follows the references from the services to the consists, engines and wagons, their includes, shapes, freight
+#   animations, sounds and cab views, and the textures of the shapes. See ortsTools.validateReferences().
+# - The content folder is listed once; each reference is looked up in that listing, case insensitive as on Windows.
+#   The engine, wagon and shape files are read in parallel.
+# - Binary shape files are not supported; their textures are not checked (they are counted in the summary).
+#
+
+import argparse
+import collections
+import os
+import pathlib
+import sys
+
+import ortsTools
+
+numWarn = 0
+
+
+### print a warning and count it
+def warn( *args) :
+    global numWarn
+    numWarn += 1
+    print( "Warning:", *args, file=sys.stderr)
+
+
+### main
+parser = argparse.ArgumentParser( description='List the broken references (missing consists, engines, wagons, shapes, sounds, '
+                                               'cab views, textures, etc.) of a route or content folder.')
+parser.add_argument( 'dirPath', type=pathlib.Path, help='Route folder (or ROUTES folder), to check the references of its services. '
+                     'Or content folder (or folder with several content folders), to check all its services, consists, engines and wagons.')
+parser.add_argument( '-j', '--jsonl', action='store_true', help='Output one JSON object per broken reference, instead of CSV.')
+parser.add_argument( '--jobs', type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                     help='Number of files read in parallel.')
+parser.add_argument( '-v', '--verbose', action='count', default=0)
+args = parser.parse_args()
+dirPath = args.dirPath
+verbose = args.verbose
+
+if not dirPath.is_dir() :
+    print( "Error: {} is not a directory.".format(args.dirPath), file=sys.stderr)
+    sys.exit(1)
+
+stats = collections.Counter()
+numBroken = 0
+if not args.jsonl : print( 'Problem,Reference,Expected,ReferencedBy')
+for row in ortsTools.validateReferences( dirPath, warn, stats, args.jobs, verbose) :
+    numBroken += 1
+    print( ortsTools.formatBrokenRow( row, args.jsonl))
+
+print( 'Checked {} services, {} consists, {} engines and wagons, {} shapes, {} textures; found {} broken references, '
+       'generated {} warnings.'.format(stats['services'], stats['consists'], stats['engines and wagons'], stats['shapes'],
+       stats['textures'], numBroken, numWarn), file=sys.stderr)
+for name, count in sorted( stats.items()) :
+    if name.startswith( 'missing-') or name.startswith( 'binary') or name in ('no-consist-name', 'unparsed-entry') :
+        print( '  {}: {}'.format(name, count), file=sys.stderr)
+exit(1 if numBroken > 0 else 0)
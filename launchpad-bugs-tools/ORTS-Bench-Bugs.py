@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# ORTS-Bench-Bugs - run the bug tools against the offline launchpad stand-in, and report requests and wall time
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - The scripts run unmodified, as sub-processes, with the standin folder first on PYTHONPATH; they import the
+#   stand-in (standin/launchpadlib/launchpad.py) instead of launchpadlib. No network access and no login needed.
+# - The stand-in serves a synthetic "or" project (--bugs), or the data recorded in a bug snapshot (--data).
+# - With --latency each request takes that long, which shows the effect of concurrency and of fewer requests.
+# - The results can be saved (--save) and compared with saved results (--baseline). The exit code is 1 when a
+#   script makes more requests than in the baseline, so that the script can be used to catch regressions.
+#   The logins are not compared: each worker thread logs in when it starts, and how many threads start depends
+#   on the scheduling.
+#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+tools_dir = os.path.dirname(os.path.abspath(__file__))
+standin_dir = os.path.join(tools_dir, 'standin')
+
+# name -> script and arguments; {tmp} is replaced by a temporary folder
+benchmarks = {
+    'stats':    ['ORTS-Create-Bug-Stats.py', '--no-cache'],
+    'export':   ['ORTS-Export-Bugs.py', '--no-cache'],
+    'sync':     ['ORTS-Sync-Bugs.py', '--no-cache', '{tmp}/or-bugs.sqlite'],
+    'resync':   ['ORTS-Sync-Bugs.py', '--no-cache', '{tmp}/or-bugs.sqlite'],
+    'update':   ['ORTS-Update-Bugs.py', '--no-cache', '--rate', '0', '{tmp}/bug-ids.txt'],
+}
+
+
+### Run one benchmark
+
+def run_benchmark(name, tmp_dir, env) :
+    stats_path = os.path.join(tmp_dir, name + '-stats.json')
+    cmd = [sys.executable, benchmarks[name][0]] + [arg.format(tmp=tmp_dir) for arg in benchmarks[name][1:]]
+    if args.workers and name != 'resync' :
+        cmd += ['--workers', str(args.workers)]
+    env = dict(env, LP_STANDIN_STATS=stats_path)
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=tools_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    wall_time = time.perf_counter() - start
+    if proc.returncode != 0 or not os.path.isfile(stats_path) :
+        print(f'Error: {name} failed (exit code {proc.returncode}):\n{proc.stderr}', file=sys.stderr)
+        return None
+    with open(stats_path) as f :
+        stats = json.load(f)
+    if args.verbose :
+        print(proc.stderr, file=sys.stderr)
+    return {'requests': stats['requests'], 'by_kind': stats['by_kind'], 'wall_time': round(wall_time, 3)}
+# end run_benchmark()
+
+def write_bug_ids(tmp_dir, num_ids) :
+    # the first bugs of the synthetic data set; for recorded data, the first bugs of the snapshot
+    if args.data :
+        import sqlite3
+        conn = sqlite3.connect(args.data)
+        ids = [row[0] for row in conn.execute('SELECT id FROM bugs ORDER BY id LIMIT ?', (num_ids,))]
+        conn.close()
+    else :
+        ids = [1000000 + i * 37 for i in range(num_ids)]
+    with open(os.path.join(tmp_dir, 'bug-ids.txt'), 'w') as f :
+        f.write('\n'.join(str(bug_id) for bug_id in ids) + '\n')
+# end write_bug_ids()
+
+
+### main
+
+parser = argparse.ArgumentParser(description='Run the bug tools against the offline launchpad stand-in, '
+                                 'and report the number of requests and the wall time.')
+parser.add_argument('benchmarks', nargs='*', default=list(benchmarks),
+                    help='Benchmarks to run: ' + ', '.join(benchmarks) + '. Default is all.')
+parser.add_argument('-b', '--bugs', type=int, default=2000, help='Number of synthetic bugs. Default is 2000.')
+parser.add_argument('-d', '--data', help='Bug snapshot (SQLite) to serve instead of synthetic data.')
+parser.add_argument('-l', '--latency', type=float, default=0.0, help='Latency of each request, in ms. Default is 0.')
+parser.add_argument('-w', '--workers', type=int, help='Number of workers passed to the scripts. Default is their default.')
+parser.add_argument('-u', '--updates', type=int, default=50, help='Number of bugs updated by "update". Default is 50.')
+parser.add_argument('--save', help='Save the results to this file (JSON).')
+parser.add_argument('--baseline', help='Compare with the results saved in this file; exit code 1 when a benchmark '
+                    'makes more requests.')
+parser.add_argument('-v', '--verbose', action='store_true', help='Show the output (stderr) of the scripts.')
+args = parser.parse_args()
+
+for name in args.benchmarks :
+    if name not in benchmarks :
+        parser.error(f'unknown benchmark {name}, expecting one of: ' + ', '.join(benchmarks))
+if 'resync' in args.benchmarks and 'sync' not in args.benchmarks :
+    parser.error('resync needs sync, to create the snapshot')
+
+env = dict(os.environ)
+env['PYTHONPATH'] = standin_dir + (os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else '')
+env['LP_STANDIN_DATA'] = os.path.abspath(args.data) if args.data else f'synthetic:{args.bugs}'
+env['LP_STANDIN_LATENCY'] = str(args.latency / 1000.0)
+
+results = {}
+with tempfile.TemporaryDirectory(prefix='bench-bugs-') as tmp_dir :
+    write_bug_ids(tmp_dir, args.updates)
+    for name in benchmarks :  # in the order of the table, so that sync runs before resync
+        if name in args.benchmarks :
+            print(f'Running {name} ...', file=sys.stderr, flush=True)
+            results[name] = run_benchmark(name, tmp_dir, env)
+
+baseline = {}
+if args.baseline :
+    with open(args.baseline) as f :
+        baseline = json.load(f)
+
+print(f'{"Benchmark":10} {"Requests":>9} {"Baseline":>9} {"Wall time":>10}  Requests by kind (logins not included in the count)')
+regressions = []
+for name, result in results.items() :
+    if result is None :
+        print(f'{name:10} {"failed":>9}')
+        regressions.append(name)
+        continue
+    base = baseline.get(name)
+    base = base['requests'] - base['by_kind'].get('login', 0) if base else None
+    num_requests = result['requests'] - result['by_kind'].get('login', 0)
+    kinds = ', '.join(f'{kind} {cnt}' for kind, cnt in sorted(result['by_kind'].items()))
+    print(f'{name:10} {num_requests:9} {base if base is not None else "-":>9} {result["wall_time"]:9.2f}s  {kinds}')
+    if base is not None and num_requests > base :
+        regressions.append(name)
+
+if args.save :
+    with open(args.save, 'w') as f :
+        json.dump({name: result for name, result in results.items() if result}, f, indent=2)
+
+if regressions :
+    print('Regressions (more requests than the baseline, or failed): ' + ', '.join(regressions), file=sys.stderr)
+    exit(1)
+
+exit(0)
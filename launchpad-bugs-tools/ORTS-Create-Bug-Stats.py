@@ -13,12 +13,14 @@
 # - https://api.launchpad.net/devel.html
 #
 
+import argparse
 import sys
-import tempfile
 from datetime import date, datetime, timedelta, timezone
-from launchpadlib.launchpad import Launchpad
 
-verbose = 0
+import bug_prefetch
+import bug_snapshot
+import bug_timeseries
+import lp_cache
 
 open_states = ['New', 'Incomplete', 'Triaged', 'Deferred', 'Confirmed', 'In Progress', 'Fix Committed']
 closed_states = ['Fix Released', 'Invalid', "Won't Fix", 'Does Not Exist', 'Expired', 'Opinion']
@@ -30,22 +32,93 @@ age_range = ['0..7 days', '8..30 days', '31..90 days', '91..180 days', '181..365
 age_range_days = [7, 30, 90, 180 , 365, 730, None]
 
 
+### Fetch all Bug Tasks once, into a columnar table (one list per attribute)
+
+task_columns = ['status', 'importance', 'date_created', 'date_closed', 'milestone_link']
+
+def fetch_task_table() :
+    print('Fetching bug tasks ...', file=sys.stderr, flush=True)
+    table = {col: [] for col in task_columns}
+    table['task'] = []
+    if snapshot :
+        tasks = bug_snapshot.search_tasks(snapshot, status=all_states)
+        table['milestones'] = bug_snapshot.load_milestones(snapshot)
+    else :
+        tasks = project.searchTasks(status=all_states)  # search without status filter returns only open bug tasks
+        table['milestones'] = project.all_milestones
+    for task in tasks :
+        table['task'].append(task)
+        for col in task_columns :
+            table[col].append(getattr(task, col))
+    print(f'{len(table["task"])} bug tasks fetched', file=sys.stderr, flush=True)
+    return table
+# end fetch_task_table()
+
+
+### Compute all counts from the table, in one pass
+
+def aggregate_tasks(table) :
+    status_counts = dict.fromkeys(all_states, 0)
+    importance_counts = dict.fromkeys(importance_list, 0)
+    age_status = [[0 for x in range(len(open_states))] for y in range(len(age_range))]
+    age_importance = [[0 for x in range(len(importance_list))] for y in range(len(age_range))]
+    milestone_counts = {'None': 0}
+    milestone_names = {}  # key is milestone link, value is milestone name
+    for milestone in table['milestones'] :
+        milestone_names[milestone.self_link] = milestone.name
+        milestone_counts[milestone.name] = 0
+    open_cnt = closed_cnt = 0
+    open_tasks = [] ; closed_tasks = []
+
+    # the age buckets are based on the same point in time for all tasks
+    now = datetime.now(tz=lptz)
+    age_cutoffs = [now - timedelta(days) for days in age_range_days if days is not None]
+
+    for task, status, importance, created, closed, milestone_link in zip(
+            table['task'], table['status'], table['importance'], table['date_created'], table['date_closed'],
+            table['milestone_link']) :
+        status_counts[status] = status_counts.get(status, 0) + 1
+        if closed : closed_cnt += 1
+        else : open_cnt += 1
+        if status in open_states :
+            open_tasks.append(task)
+            importance_counts[importance] = importance_counts.get(importance, 0) + 1
+            ai = len(age_cutoffs)
+            for i in range(len(age_cutoffs)) :
+                if created > age_cutoffs[i] :
+                    ai = i
+                    break
+            age_status[ai][open_states.index(status)] += 1
+            if importance in importance_list :
+                age_importance[ai][importance_list.index(importance)] += 1
+        else :
+            closed_tasks.append(task)
+            if status == 'Fix Released' :
+                name = milestone_names.get(milestone_link, 'None') if milestone_link else 'None'
+                milestone_counts[name] = milestone_counts.get(name, 0) + 1
+
+    return {'status': status_counts, 'importance': importance_counts, 'age_status': age_status,
+            'age_importance': age_importance, 'milestone': milestone_counts, 'open_cnt': open_cnt,
+            'closed_cnt': closed_cnt, 'open_tasks': open_tasks, 'closed_tasks': closed_tasks}
+# end aggregate_tasks()
+
+
 ### All Bugs by Status
 
-def all_bugs_by_status() :
+def all_bugs_by_status(stats) :
     print('All bugs by status:')
     total_cnt = 0
-    for importance in open_states:
-        tasks = project.searchTasks(status=importance)
-        total_cnt += len(tasks)
-        print(f'{len(tasks):5d}  {importance}')
+    for status in open_states:
+        cnt = stats['status'][status]
+        total_cnt += cnt
+        print(f'{cnt:5d}  {status}')
     print(f'{total_cnt:5d}  \x1B[3mopen\x1B[0m')
     print('       -----')
     total_cnt = 0
-    for importance in closed_states:
-        tasks = project.searchTasks(status=importance)
-        total_cnt += len(tasks)
-        print(f'{len(tasks):5d}  {importance}')
+    for status in closed_states:
+        cnt = stats['status'][status]
+        total_cnt += cnt
+        print(f'{cnt:5d}  {status}')
     print(f'{total_cnt:5d}  \x1B[3mclosed\x1B[0m')
     print('------------------------')
 # end all_bugs_by_status()
@@ -53,61 +126,32 @@ def all_bugs_by_status() :
 
 ### Open Bugs by Importance
 
-def open_bugs_by_importance() :
+def open_bugs_by_importance(stats) :
     print('Open bugs by importance:')
     for importance in importance_list:
-        tasks = project.searchTasks(importance=importance)
-        print(f'{len(tasks):5d}  {importance}')
+        print(f'{stats["importance"][importance]:5d}  {importance}')
     print('------------------------')
 # end open_bugs_by_importance()
 
 
 ### Count Open and Closed Bugs based on Date Completed (to verify above counts)
 
-def count_based_on_date_closed() :
-    # takes a very long time
+def count_based_on_date_closed(stats) :
     print('Open/Closed based on date closed:')
-    tasks = project.searchTasks(status=all_states)  # search without filter returns only open bug tasks
-    open_cnt = 0 ; closed_cnt = 0
-    for task in tasks :
-        if task.date_closed : closed_cnt += 1
-        else : open_cnt += 1
+    open_cnt = stats['open_cnt'] ; closed_cnt = stats['closed_cnt']
     print(f'{open_cnt:5d}  Open')
     print(f'{closed_cnt:5d}  Closed')
-    print(f'{len(tasks):5d}  Total')
+    print(f'{open_cnt + closed_cnt:5d}  Total')
     print('------------------------')
 # end count_based_on_date_closed()
 
 
 ### Open Bugs by Age and Status/Importance
 
-def open_bugs_by_age_and_status_and_importance() :
+def open_bugs_by_age_and_status_and_importance(stats) :
     print('Open bugs by age and status:')
-    bug_status = [[0 for x in range(len(open_states))] for y in range(len(age_range))]
-    bug_importance = [[0 for x in range(len(open_states))] for y in range(len(age_range))]
-    tasks = project.searchTasks()  # search without filter returns only open bug tasks
-    for task in tasks:
-        if task.date_created > (datetime.now(tz=lptz) - timedelta(age_range_days[0])):
-            bug_status[0][open_states.index(task.status)] += 1
-            bug_importance[0][importance_list.index(task.importance)] += 1
-        elif task.date_created > datetime.now(tz=lptz) - timedelta(age_range_days[1]):
-            bug_status[1][open_states.index(task.status)] += 1
-            bug_importance[1][importance_list.index(task.importance)] += 1
-        elif task.date_created > datetime.now(tz=lptz) - timedelta(age_range_days[2]):
-            bug_status[2][open_states.index(task.status)] += 1
-            bug_importance[2][importance_list.index(task.importance)] += 1
-        elif task.date_created > datetime.now(tz=lptz) - timedelta(age_range_days[3]):
-            bug_status[3][open_states.index(task.status)] += 1
-            bug_importance[3][importance_list.index(task.importance)] += 1
-        elif task.date_created > datetime.now(tz=lptz) - timedelta(age_range_days[4]):
-            bug_status[4][open_states.index(task.status)] += 1
-            bug_importance[4][importance_list.index(task.importance)] += 1
-        elif task.date_created > datetime.now(tz=lptz) - timedelta(age_range_days[5]):
-            bug_status[5][open_states.index(task.status)] += 1
-            bug_importance[5][importance_list.index(task.importance)] += 1
-        else:
-            bug_status[6][open_states.index(task.status)] += 1
-            bug_importance[6][importance_list.index(task.importance)] += 1
+    bug_status = stats['age_status']
+    bug_importance = stats['age_importance']
     print( 'Age'.rjust(15), open_states[0].rjust(14), open_states[1].rjust(14), open_states[2].rjust(14),
            open_states[3].rjust(14), open_states[4].rjust(14), open_states[5].rjust(14), open_states[6].rjust(14))
     for ai in range(len(age_range)) :
@@ -130,11 +174,21 @@ def open_bugs_by_age_and_status_and_importance() :
 
 ### Bugs per Tag
 
+def get_bugs(tasks, progress=None) :
+    # key is bug link, value is bug; the bugs are fetched concurrently, unless they are in the snapshot
+    if snapshot :
+        return {task.bug_link: task.bug for task in tasks}
+    return bug_prefetch.prefetch_bugs(connect, tasks, workers=num_workers, people=people, progress=progress)
+# end get_bugs()
+
 def count_and_print_tags(tasks) :
-    cnt = 0 ; ival = len(tasks) // 10
+    ival = max(1, len(tasks) // 10)
+    def progress(cnt) :
+        if cnt % ival == 0 : print('.', end='', flush=True)
+    bugs = get_bugs(tasks, progress)
     tag_counts = {'None':0}  # key is tag, value is count
     for bug_task in tasks :
-        bug = bug_task.bug
+        bug = bugs[bug_task.bug_link]
         tags = bug.tags
         if tags is None or len(tags) == 0 :
             tag_counts['None'] = tag_counts['None'] + 1
@@ -142,70 +196,143 @@ def count_and_print_tags(tasks) :
             for tag in tags :
                 if tag_counts.get(tag) : tag_counts[tag] = tag_counts[tag] + 1
                 else : tag_counts[tag] = 1
-        cnt += 1
-        if cnt % ival == 0 : print('.', end='', flush=True)
     print('):', flush=True)
     for t, c in sorted(tag_counts.items(), key=lambda item: item[1], reverse=True) :
         print(f'{c:5d}  {t}', flush=True)
     print('------------------------')
 # end count_and_print_tags()
 
-def tags_used_by_open_bugs() :
+def tags_used_by_open_bugs(stats) :
     print('Tags used by open bugs (', end='', flush=True)
-    tasks = project.searchTasks()  # no filter matches only open bugs
-    count_and_print_tags(tasks)
+    count_and_print_tags(stats['open_tasks'])
 # end tags_used_by_open_bugs()
 
-def tags_used_by_closed_bugs():
+def tags_used_by_closed_bugs(stats):
     print('Tags used by closed bugs (', end='', flush=True)
-    tasks = project.searchTasks(status=closed_states)
-    count_and_print_tags(tasks)
+    count_and_print_tags(stats['closed_tasks'])
 # end tags_used_by_open_bugs()
 
 
 ### Count Fixed Bugs by Release
 
-def release_used_by_fixed_bugs() :
+def release_used_by_fixed_bugs(stats) :
     print('Fixed bugs by milestone:', flush=True)
-    milestone_counts = {}
-    all_milestones = project.all_milestones
-    tasks = project.searchTasks(status='Fix Released', milestone=None)
-    milestone_counts['None'] = len(tasks)  # not sure why tasks.total_size does not work
-    for milestone in all_milestones :
-        milestone_name = milestone.name
-        tasks = project.searchTasks(status='Fix Released', milestone=milestone.self_link)
-        milestone_counts[milestone_name] = len(tasks)
-    for m, c in sorted(milestone_counts.items(), key=lambda item: item[0]):
+    for m, c in sorted(stats['milestone'].items(), key=lambda item: item[0]):
         print(f'{c:5d}  {m}', flush=True)
     print('------------------------')
 # end release_used_by_fixed_bugs()
 
 
-### main
-
-cm = tempfile.TemporaryDirectory( prefix='launchpad-')
-cache_dir = cm.name
-
-print( 'Connecting to Launchpad ...', file=sys.stderr)
-
-launchpad = Launchpad.login_anonymously( 'or-maintenance', 'production', cache_dir, version='devel')
-project = launchpad.projects['or']
-lptz = project.date_created.tzinfo
+### Time Series of Opened, Closed and Open Bugs per Week or Month
+
+def update_timeseries(period) :
+    state_path = bug_timeseries.default_state_path(period, args.snapshot)
+    series = bug_timeseries.TimeSeries(period) if args.rebuild else bug_timeseries.load_timeseries(state_path, period)
+    # the next update applies the tasks modified since this one: since this run, or since the sync of the snapshot
+    if snapshot :
+        next_update = bug_snapshot.get_meta(snapshot, 'last_sync')
+    else :
+        next_update = (datetime.now(tz=timezone.utc) - bug_snapshot.sync_margin).isoformat()
+    filters = {'modified_since': series.last_update} if series.last_update else {}
+    if series.last_update :
+        print(f'Fetching bug tasks modified since {series.last_update} ...', file=sys.stderr, flush=True)
+    else :
+        print('Fetching all bug tasks ...', file=sys.stderr, flush=True)
+    if snapshot :
+        tasks = bug_snapshot.search_tasks(snapshot, status=all_states, **filters)
+    else :
+        tasks = project.searchTasks(status=all_states, **filters)
+    num_fetched = num_changed = 0
+    for task in tasks :
+        num_fetched += 1
+        if series.update(task) : num_changed += 1
+    print(f'{num_fetched} bug tasks fetched, {num_changed} changed, {len(series.tasks)} in time series', file=sys.stderr)
+    series.last_update = next_update
+    series.save(state_path)
+    return series
+# end update_timeseries()
+
+def print_timeseries(series, field, since=None) :
+    values = importance_list if field == 'importance' else closed_states
+    title = 'open by importance' if field == 'importance' else 'closed by status'
+    print(f'Bugs opened, closed and open per {series.period} ({title}):')
+    print('Period'.rjust(10), 'Opened'.rjust(8), 'Closed'.rjust(8), 'Open'.rjust(8), end='')
+    for value in values :
+        print(value.rjust(15), end='')
+    print()
+    for start, opened, closed, backlog, by_value in series.rows(field, values) :
+        if since and start < bug_timeseries.period_start(since, series.period) :
+            continue
+        print(bug_timeseries.period_label(start, series.period).rjust(10), f'{opened:8d} {closed:8d} {backlog:8d}', end='')
+        for value in values :
+            print(f'{by_value[value]:15d}', end='')
+        print()
+    print('------------------------')
+# end print_timeseries()
 
-# working on ...
 
-all_bugs_by_status()
+### main
 
-open_bugs_by_importance()
+parser = argparse.ArgumentParser(description='Create statistics about the Open Rails bugs in launchpad.')
+parser.add_argument('-s', '--snapshot', nargs='?', const=bug_snapshot.default_snapshot_path(),
+                    help='Run offline against the local bug snapshot (see ORTS-Sync-Bugs.py). '
+                         'Default file is ' + bug_snapshot.default_snapshot_path())
+parser.add_argument('-w', '--workers', type=int, default=bug_prefetch.default_workers,
+                    help=f'Number of bugs to fetch concurrently. Default is {bug_prefetch.default_workers}.')
+parser.add_argument('-t', '--timeseries', choices=bug_timeseries.periods,
+                    help='Report the bugs opened, closed and open per week or month, instead of the current state.')
+parser.add_argument('--by', choices=['importance', 'status'], default='importance',
+                    help='Time series: break down the open bugs by importance (default), or the closed bugs by status.')
+parser.add_argument('--since', type=date.fromisoformat, help='Time series: first period to report (YYYY-MM-DD).')
+parser.add_argument('--rebuild', action='store_true',
+                    help='Time series: recompute from all bug tasks, instead of updating with the modified ones.')
+parser.add_argument('-v', '--verbose', action='count', default=0)
+lp_cache.add_cache_arguments(parser)
+args = parser.parse_args()
+verbose = args.verbose
+num_workers = args.workers
+people = {}  # key is person link, value is display name; shared by all the reports
+
+if args.snapshot :
+    print( f'Reading bug snapshot {args.snapshot} ...', file=sys.stderr)
+    snapshot = bug_snapshot.open_snapshot(args.snapshot)
+    lptz = timezone.utc
+else :
+    from launchpadlib.launchpad import Launchpad
+
+    snapshot = None
+    cache_dir = lp_cache.open_cache(args)
+
+    print( 'Connecting to Launchpad ...', file=sys.stderr)
+
+    def connect() :
+        return Launchpad.login_anonymously( 'or-maintenance', 'production', cache_dir, version='devel')
+
+    launchpad = connect()
+    project = launchpad.projects['or']
+    lptz = project.date_created.tzinfo
+
+if args.timeseries :
+    print_timeseries(update_timeseries(args.timeseries), args.by, args.since)
+    exit(0)
+
+# fetch all bug tasks once, all reports are computed from the local table
+
+task_table = fetch_task_table()
+stats = aggregate_tasks(task_table)
+
+all_bugs_by_status(stats)
+
+open_bugs_by_importance(stats)
 
 # intended to verify the open and closed states
-if verbose > 1 : count_based_on_date_closed()  # slow
+if verbose > 1 : count_based_on_date_closed(stats)
 
-open_bugs_by_age_and_status_and_importance()
+open_bugs_by_age_and_status_and_importance(stats)
 
-tags_used_by_open_bugs()  # slow
-if verbose > 0 : tags_used_by_closed_bugs()  # very slow
+tags_used_by_open_bugs(stats)  # fetches each bug for its tags (concurrently)
+if verbose > 0 : tags_used_by_closed_bugs(stats)  # slow, many closed bugs
 
-release_used_by_fixed_bugs()
+release_used_by_fixed_bugs(stats)
 
 exit(0)
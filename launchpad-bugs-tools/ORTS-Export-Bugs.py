@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-# ORTS-Export-Bugs - export filtered launchpad bugs to stdout in CSV format
+# ORTS-Export-Bugs - export filtered launchpad bugs to stdout in CSV or JSONL format
 #
 # Copyright (c) 2025 Roger Fischer. MIT License.
 #
@@ -9,6 +9,8 @@
 # Notes:
 # - This script is meant to be edited to achieve the desired objective. That is easier than trying to anticipate
 #   all future needs.
+# - The bugs are exported as a stream: the tasks are read page by page, the bugs of a page are fetched
+#   (concurrently) and written, then the next page. The filters are applied before the bugs are fetched.
 #
 # References:
 # - https://documentation.ubuntu.com/launchpad/user/explanation/launchpad-api/launchpadlib/
@@ -16,12 +18,16 @@
 # - https://api.launchpad.net/devel.html
 #
 
+import argparse
+import csv
+import itertools
+import json
 import sys
-import tempfile
 from datetime import date, datetime, timedelta
-from launchpadlib.launchpad import Launchpad
 
-print_only_id = False  # use argument --ids-only
+import bug_prefetch
+import bug_snapshot
+import lp_cache
 
 # search filters
 status_filter = ['In Progress']
@@ -39,54 +45,122 @@ order_by_fields = ['datecreated']
 #py_date_filter = date.fromisoformat( date_filter) + timedelta( days=7)
 py_date_filter = (datetime.now() - timedelta( 30)).date()
 
-if len( sys.argv) > 1 and sys.argv[1] == '--ids-only' :
-    print_only_id = True
+page_size = 75  # bug tasks per search page; the bugs of a page are fetched (concurrently) before it is written
 
-cm = tempfile.TemporaryDirectory( prefix='launchpad-')
-cache_dir = cm.name
+columns = ['Id', 'Status', 'Importance', 'LastUpdated', 'Created', 'DaysActive', 'Tags', 'Reporter', 'Title', 'Link']
 
-print( 'Connecting to Launchpad ...', file=sys.stderr)
 
-launchpad = Launchpad.login_anonymously( 'or-maintenance', 'production', cache_dir, version='devel')
-project = launchpad.projects['or']
+### Read the Tasks page by page, as the pages arrive
 
-if person_filter_part :
-    person_filter = project.self_link.removesuffix('or') + person_filter_part
+def get_pages(tasks) :
+    tasks = iter(tasks)
+    while True :
+        page = list(itertools.islice(tasks, page_size))
+        if not page :
+            break
+        yield page
+# end get_pages()
 
-print( 'Fetching bugs from Launchpad ...', file=sys.stderr)
+def get_bug_id(task) :
+    # the bug id is the last part of the bug link, no need to fetch the bug
+    return int(task.bug_link.rstrip('/').rsplit('/', 1)[-1])
+# end get_bug_id()
 
-# filters: status=list, importance=list, modified_since=str, created_before=str, created_since=str,
-#          tags=list,bug_reporter=link, assignee=link, milestone=???
+
+### Write the Rows
+
+def write_row(writer, task, bug) :
+    created = bug.date_created.date()
+    updated = bug.date_last_updated.date()
+    values = [bug.id, task.status, task.importance, updated.isoformat(), created.isoformat(), (updated - created).days,
+              ','.join(bug.tags), bug.owner.display_name, bug.title, task.web_link]
+    if args.format == 'jsonl' :
+        row = dict(zip(columns, values))
+        row['Tags'] = list(bug.tags)
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + '\n')
+    else :
+        writer.writerow(values)
+# end write_row()
+
+
+### main
+
+parser = argparse.ArgumentParser(description='Export filtered Open Rails bugs from launchpad to stdout in CSV format.')
+parser.add_argument('--ids-only', action='store_true', help='Only output the bug ids. Does not fetch the bugs.')
+parser.add_argument('-f', '--format', choices=['csv', 'jsonl'], default='csv', help='Output format. Default is csv.')
+parser.add_argument('-s', '--snapshot', nargs='?', const=bug_snapshot.default_snapshot_path(),
+                    help='Run offline against the local bug snapshot (see ORTS-Sync-Bugs.py). '
+                         'Default file is ' + bug_snapshot.default_snapshot_path())
+parser.add_argument('-w', '--workers', type=int, default=bug_prefetch.default_workers,
+                    help=f'Number of bugs to fetch concurrently. Default is {bug_prefetch.default_workers}.')
+lp_cache.add_cache_arguments(parser)
+args = parser.parse_args()
+print_only_id = args.ids_only
+
+# search filters: status=list, importance=list, modified_since=str, created_before=str, created_since=str,
+#                 tags=list,bug_reporter=link, assignee=link, milestone=???
 # order: order_by=list
-tasks = project.searchTasks(status=status_filter, created_before=date_filter,
-                            order_by=order_by_fields)
+search_filters = {'status': status_filter, 'created_before': date_filter}
 
-print( '{} tasks found in launchpad'.format( len(tasks)), file=sys.stderr)
+if args.snapshot :
+    print( f'Reading bugs from snapshot {args.snapshot} ...', file=sys.stderr)
+    snapshot = bug_snapshot.open_snapshot(args.snapshot)
+    def search_tasks(**filters) :
+        return bug_snapshot.search_tasks(snapshot, **filters)
+else :
+    from launchpadlib.launchpad import Launchpad
 
-if not print_only_id :
-    print( 'Id,Status,Importance,LastUpdated,Created,DaysActive,Tags,Reporter,Title,Link')
-    out_fmt = '{},{},{},"{}","{}",{},"{}","{}","{}",{}'
+    cache_dir = lp_cache.open_cache(args)
 
-num_bugs = 0
-for task in tasks :
+    print( 'Connecting to Launchpad ...', file=sys.stderr)
 
-    bug = task.bug
-    owner = bug.owner
-    created = bug.date_created.date()
-    updated = bug.date_last_updated.date()
-    tags = ','.join(bug.tags)
-    user_name = owner.display_name  # .encode('utf-8', 'replace')
-    bug_title = bug.title  # .encode('utf-8', 'replace')
-
-    # search does not have an updated_before filter
-    if updated < py_date_filter :
-        if print_only_id :
-            print( bug.id)
-        else :
-            print(out_fmt.format(bug.id, task.status, task.importance, updated, created, (updated - created).days,
-                                 tags, user_name, bug_title, task.web_link), flush=True)
-        num_bugs += 1
-
-print( '{} bugs exported'.format(num_bugs), file=sys.stderr)
+    def connect() :
+        return Launchpad.login_anonymously( 'or-maintenance', 'production', cache_dir, version='devel')
+
+    launchpad = connect()
+    project = launchpad.projects['or']
+
+    if person_filter_part :
+        person_filter = project.self_link.removesuffix('or') + person_filter_part
+
+    def search_tasks(**filters) :
+        return project.searchTasks(**filters)
+
+    print( 'Fetching bugs from Launchpad ...', file=sys.stderr)
+
+# search does not have an updated_before filter; instead of fetching each bug to check date_last_updated,
+# the (few) bugs updated since py_date_filter are searched for, and excluded before fetching any bug
+excluded_links = {task.bug_link for task in search_tasks(modified_since=py_date_filter.isoformat(), **search_filters)}
+tasks = search_tasks(order_by=order_by_fields, **search_filters)
+
+writer = None
+if not print_only_id :
+    if args.format == 'csv' :
+        writer = csv.writer(sys.stdout, lineterminator='\n')
+        writer.writerow(columns)
+
+fetcher = None if args.snapshot or print_only_id else bug_prefetch.BugFetcher(connect, workers=args.workers)
+
+num_tasks = num_bugs = 0
+for page in get_pages(tasks) :
+    num_tasks += len(page)
+    page = [task for task in page if task.bug_link not in excluded_links]
+    if print_only_id :
+        for task in page :
+            print( get_bug_id(task))
+        num_bugs += len(page)
+    else :
+        bugs = fetcher.fetch(page) if fetcher else {task.bug_link: task.bug for task in page}
+        for task in page :
+            bug = bugs[task.bug_link]
+            if bug.date_last_updated.date() < py_date_filter :  # in case it was updated after the exclusion search
+                write_row(writer, task, bug)
+                num_bugs += 1
+    sys.stdout.flush()
+
+if fetcher :
+    fetcher.close()
+
+print( f'{num_tasks} tasks found, {len( excluded_links)} excluded as recently updated, {num_bugs} bugs exported', file=sys.stderr)
 
 exit(0)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# ORTS-Sync-Bugs - create or update a local snapshot of the Open Rails bugs in launchpad
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Requires:
+# - pip install launchpadlib
+#
+# Notes:
+# - The snapshot is a SQLite database, see bug_snapshot.py. The first run fetches all bug tasks,
+#   later runs only fetch the bugs modified since the previous run.
+# - ORTS-Create-Bug-Stats.py and ORTS-Export-Bugs.py run offline against the snapshot with --snapshot.
+#
+# References:
+# - https://documentation.ubuntu.com/launchpad/user/explanation/launchpad-api/launchpadlib/
+# - https://api.launchpad.net/devel.html
+#
+
+import argparse
+import sys
+from launchpadlib.launchpad import Launchpad
+
+import bug_prefetch
+import bug_snapshot
+import lp_cache
+
+parser = argparse.ArgumentParser(description='Create or update a local snapshot of the Open Rails bugs in launchpad.')
+parser.add_argument('snapshot', nargs='?', default=bug_snapshot.default_snapshot_path(),
+                    help='Snapshot file (SQLite). Default is ' + bug_snapshot.default_snapshot_path())
+parser.add_argument('--full', action='store_true', help='Fetch all bug tasks, instead of only the modified ones.')
+parser.add_argument('-w', '--workers', type=int, default=bug_prefetch.default_workers,
+                    help=f'Number of bugs to fetch concurrently. Default is {bug_prefetch.default_workers}.')
+lp_cache.add_cache_arguments(parser)
+args = parser.parse_args()
+
+conn = bug_snapshot.open_snapshot(args.snapshot, create=True)
+
+cache_dir = lp_cache.open_cache(args)
+
+print( 'Connecting to Launchpad ...', file=sys.stderr)
+
+def connect() :
+    return Launchpad.login_anonymously( 'or-maintenance', 'production', cache_dir, version='devel')
+
+launchpad = connect()
+project = launchpad.projects['or']
+
+num_tasks = bug_snapshot.sync_snapshot(conn, project, connect, full=args.full, workers=args.workers)
+num_total = conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+conn.close()
+
+print( f'{num_tasks} bug tasks updated, {num_total} in snapshot {args.snapshot}', file=sys.stderr)
+
+exit(0)
@@ -10,6 +10,10 @@
 # Notes:
 # - This script is meant to be edited to achieve the desired objective. That is easier than trying to anticipate
 #   all future needs.
+# - The bugs are updated by a pool of worker threads, each with its own launchpad connection (a connection is not
+#   thread safe). The updates are rate limited, and retried with exponential backoff on errors.
+# - The ids of the bugs that are done (updated, or skipped because not targeted to OpenRails) are appended to a
+#   journal file. A rerun with the same journal skips them, eg. after some updates failed.
 #
 # References:
 # - https://documentation.ubuntu.com/launchpad/user/explanation/launchpad-api/launchpadlib/
@@ -17,12 +21,18 @@
 # - https://api.launchpad.net/devel.html
 #
 
+import argparse
 import sys
 import re
 import os.path
-import tempfile
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from launchpadlib.launchpad import Launchpad
 
+import lp_cache
+
 testing = False
 verbose = True
 
@@ -31,62 +41,49 @@ new_tags = ['stale']
 new_importance = None
 clear_assignee = False
 
-arg_len = len( sys.argv)
-if arg_len > 2 :
-    print( 'Invalid arguments, expecting one file-path or no argument: ', sys.argv)
-    exit(1)
-elif arg_len == 2 and os.path.isfile( sys.argv[1]) :
-    in_file = open( sys.argv[1], 'r')
-else :
-    in_file = sys.stdin
 
-bug_id_str = in_file.read()
-bug_id_list = re.split(r'\W+', bug_id_str)
+### Rate Limiter, shared by the worker threads
 
-# above split may not eliminate consecutive separators
-print( f'Approx. {len( bug_id_list)} bug ids read', file=sys.stderr)
+class RateLimiter :
+    def __init__(self, rate) :
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
 
-if in_file != sys.stdin :
-    in_file.close()
+    def wait(self) :
+        with self.lock :
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0 :
+            time.sleep(delay)
+# end RateLimiter
 
-# bug_list = [1444131, 1409387] # 1335370, 1444131, 1409387
 
-cm = tempfile.TemporaryDirectory( prefix='launchpad-')
-cache_dir = cm.name
+### Update one Bug, with retries
 
-print( 'Connecting to Launchpad ...', file=sys.stderr)
+def get_launchpad() :
+    if not hasattr(thread_local, 'launchpad') :
+        thread_local.launchpad = connect()
+    return thread_local.launchpad
+# end get_launchpad()
 
-# this may bring up a web page to log into UbuntuOne and authorize the host machine
-launchpad = Launchpad.login_with( 'or-maintenance', 'production', cache_dir, version='devel')
-project = launchpad.projects['or']
-
-print( 'Processing bug ids  ...', file=sys.stderr)
-
-num_bugs_read = num_bugs_modified = 0
-for bug_id in bug_id_list :
-
-    if not bug_id.isdigit() :
-        continue
-
-    bug = launchpad.bugs[bug_id]
+def apply_update(bug_id) :
+    bug = get_launchpad().bugs[bug_id]
     if not bug :
-        print( f'Error: unable to retrieve bug {bug_id}', file=sys.stderr)
-        continue
+        raise LookupError(f'unable to retrieve bug {bug_id}')
 
     task = bug.bug_tasks[0]
     if not task :
-        print( f'Error: unable to retrieve task for bug {bug_id}', file=sys.stderr)
-        continue
-
-    num_bugs_read += 1
+        raise LookupError(f'unable to retrieve task for bug {bug_id}')
 
     if not task.bug_target_name == 'or' :
         print(f'Bug {bug_id} "{bug.title}" is not targeted to OpenRails - skipping it.', file=sys.stderr)
-        continue
+        return 'skipped'
 
     if new_tags :
         new_tag_list = bug.tags
-        new_tag_list.extend( new_tags)
+        new_tag_list.extend( [tag for tag in new_tags if tag not in new_tag_list])  # a retry may see the tags saved
         bug.tags = new_tag_list
 
     if new_status :
@@ -100,21 +97,117 @@ for bug_id in bug_id_list :
 
     if verbose or testing :
         print(f'... updating bug {bug.id}, status {task.status}, tags {bug.tags} ...', flush=True)
-    elif num_bugs_modified % 10 == 0 :
-        print(f'... {num_bugs_modified} updated', file=sys.stderr)
 
     if not testing :
+        if bug._dirty_attributes :
+            bug.lp_save()
+        if task._dirty_attributes :
+            task.lp_save()
+    return 'modified'
+# end apply_update()
+
+def update_bug(bug_id) :
+    for attempt in range(args.retries + 1) :
+        rate_limiter.wait()
         try :
-            if bug._dirty_attributes :
-                bug.lp_save()
-            if task._dirty_attributes :
-                task.lp_save()
-            num_bugs_modified += 1
+            return apply_update(bug_id)
+        except LookupError as e :  # not worth a retry
+            print(f'Error: {e}', file=sys.stderr)
+            return 'failed'
         except Exception as e :
-            print(f'Failed to update bug {bug_id}, error: {e}', file=sys.stderr)
+            if attempt >= args.retries :
+                print(f'Failed to update bug {bug_id}, error: {e}', file=sys.stderr)
+                return 'failed'
+            delay = args.backoff * (2 ** attempt) * random.uniform(1.0, 1.5)
+            print(f'Error updating bug {bug_id} (attempt {attempt + 1}), retrying in {delay:.1f}s: {e}', file=sys.stderr)
+            time.sleep(delay)
+# end update_bug()
+
+def process_bug(bug_id) :
+    global num_bugs_read, num_bugs_modified
+    result = update_bug(bug_id)
+    with journal_lock :
+        if result != 'failed' :
+            num_bugs_read += 1
+            if journal_file and not testing :
+                journal_file.write(bug_id + '\n')
+                journal_file.flush()
+        if result == 'modified' :
+            num_bugs_modified += 1
+            if not verbose and num_bugs_modified % 10 == 0 :
+                print(f'... {num_bugs_modified} updated', file=sys.stderr)
+    return result
+# end process_bug()
+
+
+### main
+
+parser = argparse.ArgumentParser(description='Update the bugs specified by id in a file or on stdin.')
+parser.add_argument('file', nargs='?', help='File with the bug ids. Default is stdin.')
+parser.add_argument('-w', '--workers', type=int, default=4, help='Number of bugs to update concurrently. Default is 4.')
+parser.add_argument('-r', '--rate', type=float, default=2.0, help='Max number of bugs to update per second. Default is 2.')
+parser.add_argument('--retries', type=int, default=4, help='Number of retries of a failed update. Default is 4.')
+parser.add_argument('--backoff', type=float, default=2.0, help='Delay before the first retry, in seconds; doubles with '
+                    'each retry. Default is 2.')
+parser.add_argument('-j', '--journal', help='File where the ids of the completed bugs are recorded, and that are skipped '
+                    'when rerun. Default is the input file name with ".done" appended; none for stdin.')
+lp_cache.add_cache_arguments(parser)
+args = parser.parse_args()
+
+if args.file and os.path.isfile( args.file) :
+    in_file = open( args.file, 'r')
+elif args.file :
+    print( 'Invalid arguments, expecting one file-path or no argument: ', sys.argv)
+    exit(1)
+else :
+    in_file = sys.stdin
+
+bug_id_str = in_file.read()
+
+if in_file != sys.stdin :
+    in_file.close()
+
+# the split may create empty tokens for consecutive separators; the ids may be repeated
+bug_id_list = list(dict.fromkeys( token for token in re.split(r'\W+', bug_id_str) if token.isdigit()))
+print( f'{len( bug_id_list)} bug ids read', file=sys.stderr)
+
+journal_path = args.journal or (args.file + '.done' if args.file else None)
+journal_file = None
+if journal_path :
+    if os.path.isfile( journal_path) :
+        with open( journal_path, 'r') as f :
+            done_ids = set( f.read().split())
+        bug_id_list = [bug_id for bug_id in bug_id_list if bug_id not in done_ids]
+        print( f'{len( done_ids)} bug ids already done (journal {journal_path}), {len( bug_id_list)} remaining', file=sys.stderr)
+    journal_file = open( journal_path, 'a')
+journal_lock = threading.Lock()
+
+# bug_list = [1444131, 1409387] # 1335370, 1444131, 1409387
+
+cache_dir = lp_cache.open_cache(args)
+
+print( 'Connecting to Launchpad ...', file=sys.stderr)
+
+# this may bring up a web page to log into UbuntuOne and authorize the host machine
+def connect() :
+    return Launchpad.login_with( 'or-maintenance', 'production', cache_dir, version='devel')
+
+thread_local = threading.local()
+get_launchpad()  # authorize once, before the worker threads log in
+rate_limiter = RateLimiter(args.rate)
+
+print( 'Processing bug ids  ...', file=sys.stderr)
+
+num_bugs_read = num_bugs_modified = 0
+with ThreadPoolExecutor(max_workers=args.workers) as executor :
+    results = list(executor.map(process_bug, bug_id_list))
 
-# end for each bug
+if journal_file :
+    journal_file.close()
 
-print( f'{num_bugs_modified} bugs modified (of {num_bugs_read})', file=sys.stderr)
+num_failed = results.count('failed')
+print( f'{num_bugs_modified} bugs modified (of {num_bugs_read}); {num_failed} failed', file=sys.stderr)
+if num_failed and journal_path :
+    print( f'Rerun with the same journal ({journal_path}) to retry the failed bugs.', file=sys.stderr)
 
 exit(0)
@@ -0,0 +1,82 @@
+# bug_prefetch - fetch the bugs (and their owners) of a list of bug tasks concurrently
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used by ORTS-Create-Bug-Stats.py, ORTS-Export-Bugs.py and ORTS-Sync-Bugs.py.
+#
+# Notes:
+# - Accessing task.bug or bug.owner on a launchpadlib object is a separate HTTP request, done in sequence.
+#   Here the bugs are loaded by their link (task.bug_link) by a pool of worker threads, then the owners of
+#   the bugs are loaded the same way. Each distinct owner is loaded only once.
+# - A launchpadlib connection is not thread safe, so each worker thread has its own connection.
+#   The connect function passed in creates a connection, eg. Launchpad.login_anonymously(...).
+# - A BugFetcher keeps its threads and connections, for fetching the bugs in several batches (eg. per page).
+# - The returned bugs have the same attribute names as the launchpadlib objects (a subset of them).
+#
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+default_workers = 8
+
+
+### Fetch the Bugs of the Tasks
+
+class BugFetcher :
+    # keeps the worker threads and their connections between calls, eg. to fetch the bugs page by page
+    # people: optional cache of owners, key is person link, value is display name; is updated
+    def __init__(self, connect, workers=default_workers, people=None) :
+        self.connect = connect
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.people = {} if people is None else people
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def get_launchpad(self) :
+        if not hasattr(self.local, 'launchpad') :
+            self.local.launchpad = self.connect()
+        return self.local.launchpad
+
+    def fetch(self, tasks, progress=None) :
+        # progress: optional function, called with the number of bugs fetched so far
+        num_done = [0]
+
+        def fetch_bug(bug_link) :
+            bug = self.get_launchpad().load(bug_link)
+            info = SimpleNamespace(id=bug.id, title=bug.title, tags=list(bug.tags), date_created=bug.date_created,
+                                   date_last_updated=bug.date_last_updated, self_link=bug.self_link,
+                                   owner_link=bug.owner_link, owner=None)
+            if progress :
+                with self.lock :
+                    num_done[0] += 1
+                    progress(num_done[0])
+            return info
+
+        def fetch_person(person_link) :
+            return self.get_launchpad().load(person_link).display_name
+
+        people = self.people
+        bug_links = list(dict.fromkeys(task.bug_link for task in tasks))  # unique, in order
+        bugs = dict(zip(bug_links, self.executor.map(fetch_bug, bug_links)))
+        person_links = list({bug.owner_link for bug in bugs.values() if bug.owner_link and bug.owner_link not in people})
+        people.update(zip(person_links, self.executor.map(fetch_person, person_links)))
+
+        for bug in bugs.values() :
+            bug.owner = SimpleNamespace(self_link=bug.owner_link, display_name=people.get(bug.owner_link))
+        return bugs
+
+    def close(self) :
+        self.executor.shutdown()
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, *exc_info) :
+        self.close()
+# end BugFetcher
+
+def prefetch_bugs(connect, tasks, workers=default_workers, people=None, progress=None) :
+    with BugFetcher(connect, workers, people) as fetcher :
+        return fetcher.fetch(tasks, progress)
+# end prefetch_bugs()
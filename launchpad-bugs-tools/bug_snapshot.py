@@ -0,0 +1,199 @@
+# bug_snapshot - local SQLite snapshot of the Open Rails bugs in launchpad, updated incrementally
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used by:
+# - ORTS-Sync-Bugs.py, to create and update the snapshot
+# - ORTS-Create-Bug-Stats.py and ORTS-Export-Bugs.py, to run offline against the snapshot (--snapshot)
+#
+# Notes:
+# - The first sync fetches all bug tasks. Later syncs only fetch the tasks of bugs modified since the previous sync.
+# - Bug tasks that are moved to another project stay in the snapshot; use a full sync to remove them.
+# - A sync writes the bugs in batches. If it fails (eg. a network error), the batches written are kept, and the
+#   next sync starts again from the previous one.
+# - The tasks and bugs loaded from the snapshot have the same attribute names as the launchpadlib objects,
+#   so the reports do not need to know where the data comes from.
+#
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import bug_prefetch
+import lp_cache
+
+open_states = ['New', 'Incomplete', 'Triaged', 'Deferred', 'Confirmed', 'In Progress', 'Fix Committed']
+closed_states = ['Fix Released', 'Invalid', "Won't Fix", 'Does Not Exist', 'Expired', 'Opinion']
+all_states = open_states + closed_states
+
+# overlap of incremental syncs, to allow for clock differences; re-fetched tasks are simply replaced
+sync_margin = timedelta(minutes=10)
+
+# number of bugs fetched and written (committed) at a time by a sync
+sync_batch_size = 200
+
+# order_by fields of searchTasks, and the matching snapshot columns
+order_by_columns = {'datecreated': 'b.date_created', 'date_last_updated': 'b.date_last_updated',
+                    'importance': 't.importance', 'status': 't.status', 'id': 'b.id'}
+
+schema = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS bugs (id INTEGER PRIMARY KEY, title TEXT, tags TEXT, owner_link TEXT,
+    date_created TEXT, date_last_updated TEXT, self_link TEXT);
+CREATE TABLE IF NOT EXISTS tasks (self_link TEXT PRIMARY KEY, bug_id INTEGER, status TEXT, importance TEXT,
+    date_created TEXT, date_closed TEXT, milestone_link TEXT, web_link TEXT, bug_target_name TEXT);
+CREATE TABLE IF NOT EXISTS people (self_link TEXT PRIMARY KEY, display_name TEXT);
+CREATE TABLE IF NOT EXISTS milestones (self_link TEXT PRIMARY KEY, name TEXT);
+CREATE INDEX IF NOT EXISTS tasks_bug_id ON tasks (bug_id);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+'''
+
+
+### Default location of the snapshot
+
+def default_snapshot_path() :
+    return os.path.join(lp_cache.default_data_dir(), 'or-bugs.sqlite')
+# end default_snapshot_path()
+
+
+### Open (create) the snapshot
+
+def open_snapshot(path, create=False) :
+    if not create and not os.path.isfile(path) :
+        print(f'Error: bug snapshot {path} does not exist, create it with ORTS-Sync-Bugs.py', file=sys.stderr)
+        sys.exit(1)
+    if os.path.dirname(path) :
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    return conn
+# end open_snapshot()
+
+def get_meta(conn, key) :
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+# end get_meta()
+
+def set_meta(conn, key, value) :
+    conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+# end set_meta()
+
+
+### Update the snapshot from launchpad
+
+def to_text(dt) :
+    return dt.isoformat() if dt else None
+# end to_text()
+
+def sync_snapshot(conn, project, connect, full=False, workers=bug_prefetch.default_workers) :
+    # connect: function that creates a launchpad connection, for fetching the bugs concurrently
+    # the bugs are fetched, written and committed in batches; if a fetch fails, the batches before it are kept,
+    # and last_sync is not moved, so the next sync fetches the rest
+    last_sync = None if full else get_meta(conn, 'last_sync')
+    sync_start = datetime.now(tz=timezone.utc)
+
+    conn.execute('DELETE FROM milestones')
+    for milestone in project.all_milestones :
+        conn.execute('INSERT INTO milestones (self_link, name) VALUES (?, ?)', (milestone.self_link, milestone.name))
+
+    if last_sync :
+        print(f'Fetching bug tasks modified since {last_sync} ...', file=sys.stderr, flush=True)
+        tasks = project.searchTasks(status=all_states, modified_since=last_sync)
+    else :
+        print('Fetching all bug tasks ...', file=sys.stderr, flush=True)
+        tasks = project.searchTasks(status=all_states)
+    tasks_by_bug = {}  # key is bug link, value is its tasks; a bug is fetched in one batch with all its tasks
+    for task in tasks :
+        tasks_by_bug.setdefault(task.bug_link, []).append(task)
+    bug_links = list(tasks_by_bug)
+
+    print(f'Fetching {len(bug_links)} bugs ...', file=sys.stderr, flush=True)
+    people = dict(conn.execute('SELECT self_link, display_name FROM people'))
+    num_tasks = 0
+    with bug_prefetch.BugFetcher(connect, workers, people) as fetcher :
+        for start in range(0, len(bug_links), sync_batch_size) :
+            batch = [task for link in bug_links[start:start + sync_batch_size] for task in tasks_by_bug[link]]
+            known_people = set(people)
+            bugs = fetcher.fetch(batch)
+            conn.executemany('INSERT OR REPLACE INTO people (self_link, display_name) VALUES (?, ?)',
+                             [(link, name) for link, name in people.items() if link not in known_people])
+            conn.executemany('INSERT OR REPLACE INTO bugs (id, title, tags, owner_link, date_created, date_last_updated, '
+                             'self_link) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             [(bug.id, bug.title, ' '.join(bug.tags), bug.owner_link, to_text(bug.date_created),
+                               to_text(bug.date_last_updated), bug.self_link) for bug in bugs.values()])
+            conn.executemany('INSERT OR REPLACE INTO tasks (self_link, bug_id, status, importance, date_created, date_closed, '
+                             'milestone_link, web_link, bug_target_name) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             [(task.self_link, bugs[task.bug_link].id, task.status, task.importance,
+                               to_text(task.date_created), to_text(task.date_closed), task.milestone_link, task.web_link,
+                               task.bug_target_name) for task in batch])
+            conn.commit()
+            num_tasks += len(batch)
+            print(f'... {min(start + sync_batch_size, len(bug_links))} bugs', file=sys.stderr, flush=True)
+
+    if full :
+        # remove the tasks that were not fetched (eg. moved to another project), and the bugs without tasks
+        synced = {task.self_link for bug_tasks in tasks_by_bug.values() for task in bug_tasks}
+        conn.executemany('DELETE FROM tasks WHERE self_link = ?',
+                         [(link,) for (link,) in conn.execute('SELECT self_link FROM tasks') if link not in synced])
+        conn.execute('DELETE FROM bugs WHERE id NOT IN (SELECT bug_id FROM tasks)')
+    set_meta(conn, 'last_sync', to_text(sync_start - sync_margin))
+    conn.commit()
+    return num_tasks
+# end sync_snapshot()
+
+
+### Load from the snapshot, as objects with the same attributes as the launchpadlib objects
+
+def to_datetime(txt) :
+    return datetime.fromisoformat(txt) if txt else None
+# end to_datetime()
+
+def load_milestones(conn) :
+    return [SimpleNamespace(self_link=link, name=name)
+            for link, name in conn.execute('SELECT self_link, name FROM milestones')]
+# end load_milestones()
+
+def search_tasks(conn, status=None, importance=None, created_before=None, created_since=None, tags=None, order_by=None,
+                 modified_since=None) :
+    # same defaults as searchTasks: without a status filter only open bug tasks are returned
+    if status is None : status = open_states
+    elif isinstance(status, str) : status = [status]
+    sql = ('SELECT t.status, t.importance, t.date_created, t.date_closed, t.milestone_link, t.web_link, t.self_link, '
+           't.bug_target_name, b.id, b.title, b.tags, b.date_created, b.date_last_updated, b.self_link, '
+           'b.owner_link, p.display_name '
+           'FROM tasks t JOIN bugs b ON b.id = t.bug_id LEFT JOIN people p ON p.self_link = b.owner_link '
+           'WHERE t.status IN ({})'.format(','.join('?' * len(status))))
+    params = list(status)
+    if importance :
+        if isinstance(importance, str) : importance = [importance]
+        sql += ' AND t.importance IN ({})'.format(','.join('?' * len(importance)))
+        params.extend(importance)
+    if created_before :
+        sql += ' AND t.date_created < ?' ; params.append(str(created_before))
+    if created_since :
+        sql += ' AND t.date_created >= ?' ; params.append(str(created_since))
+    if modified_since :
+        sql += ' AND b.date_last_updated >= ?' ; params.append(str(modified_since))
+    if order_by :
+        terms = []
+        for field in order_by :
+            desc = field.startswith('-')
+            terms.append(order_by_columns[field.lstrip('-')] + (' DESC' if desc else ''))
+        sql += ' ORDER BY ' + ', '.join(terms)
+
+    tasks = []
+    for row in conn.execute(sql, params) :
+        (status, importance, created, closed, milestone_link, web_link, self_link, target,
+         bug_id, title, bug_tags, bug_created, bug_updated, bug_link, owner_link, owner_name) = row
+        bug_tag_list = bug_tags.split() if bug_tags else []
+        if tags and not any(tag in bug_tag_list for tag in tags) : continue
+        bug = SimpleNamespace(id=bug_id, title=title, tags=bug_tag_list, date_created=to_datetime(bug_created),
+                              date_last_updated=to_datetime(bug_updated), self_link=bug_link, owner_link=owner_link,
+                              owner=SimpleNamespace(self_link=owner_link, display_name=owner_name))
+        tasks.append(SimpleNamespace(status=status, importance=importance, date_created=to_datetime(created),
+                                     date_closed=to_datetime(closed), milestone_link=milestone_link, web_link=web_link,
+                                     self_link=self_link, bug_target_name=target, bug=bug, bug_link=bug_link))
+    return tasks
+# end search_tasks()
@@ -0,0 +1,137 @@
+# bug_timeseries - bug tasks opened, closed and open (backlog) per week or month, updated incrementally
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used by ORTS-Create-Bug-Stats.py (--timeseries).
+#
+# Notes:
+# - Each task adds one to the "opened" counters of the period it was created in, and one to the "closed"
+#   counters of the period it was closed in. The backlog at the end of a period is the running sum of
+#   opened - closed, computed by one sweep over the periods in date order; no per-period filtering of the tasks.
+# - The counters and the contribution of each task are kept in a state file. A later run only applies the
+#   tasks modified since the previous run: the old contribution of a task is subtracted, the new one added.
+#   From launchpad, "since the previous run" is the time of the run; from a bug snapshot, it is the time of the
+#   last sync of the snapshot (the bugs written by a later sync may have been modified before the run).
+# - Status and importance are the current ones; launchpad does not provide their history. So the backlog is
+#   broken down by (current) importance, and the closed tasks by their resolution status.
+#
+
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import lp_cache
+
+periods = ['week', 'month']
+
+
+### Periods, identified by their first day
+
+def period_start(day, period) :
+    if period == 'week' :
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+# end period_start()
+
+def next_period(start, period) :
+    if period == 'week' :
+        return start + timedelta(days=7)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+# end next_period()
+
+def period_label(start, period) :
+    if period == 'week' :
+        year, week, weekday = start.isocalendar()
+        return f'{year}-W{week:02d}'
+    return f'{start.year}-{start.month:02d}'
+# end period_label()
+
+def period_key(dt, period) :
+    return period_start(dt.astimezone(timezone.utc).date(), period).isoformat()
+# end period_key()
+
+
+### Time Series
+
+def default_state_path(period, snapshot_path=None) :
+    # the state of a time series updated from a bug snapshot is next to the snapshot, the one from launchpad is
+    # in the data folder; each is updated up to the time of its own source
+    if snapshot_path :
+        return f'{snapshot_path}.timeseries-{period}.json'
+    return os.path.join(lp_cache.default_data_dir(), f'or-bugs-timeseries-{period}.json')
+# end default_state_path()
+
+class TimeSeries :
+    def __init__(self, period) :
+        self.period = period
+        self.last_update = None  # ISO date-time, tasks modified since then are applied by the next update
+        self.tasks = {}   # key is task link, value is [date created, date closed, status, importance]
+        self.counts = {}  # key is period start, value is {'opened:importance:High': count, ...}
+
+    def apply(self, record, sign) :
+        created, closed, status, importance = record
+        for event, dt in (('opened', created), ('closed', closed)) :
+            if dt is None :
+                continue
+            counts = self.counts.setdefault(period_key(datetime.fromisoformat(dt), self.period), {})
+            for key in (f'{event}:importance:{importance}', f'{event}:status:{status}') :
+                counts[key] = counts.get(key, 0) + sign
+
+    def update(self, task) :
+        # returns True if the task is new or its contribution changed
+        record = [task.date_created.isoformat(), task.date_closed.isoformat() if task.date_closed else None,
+                  task.status, task.importance]
+        old = self.tasks.get(task.self_link)
+        if old == record :
+            return False
+        if old :
+            self.apply(old, -1)
+        self.apply(record, 1)
+        self.tasks[task.self_link] = record
+        return True
+
+    def rows(self, field, values, until=None) :
+        # yields (period start, opened, closed, backlog, {value: count}) for each period, without gaps;
+        # the counts by value are the backlog by importance, or the tasks closed by status
+        if not self.counts :
+            return
+        start = date.fromisoformat(min(self.counts))
+        until = period_start(until or datetime.now(tz=timezone.utc).date(), self.period)
+        backlog = 0
+        backlog_by_value = dict.fromkeys(values, 0)
+        while start <= until :
+            counts = self.counts.get(start.isoformat(), {})
+            opened = sum(n for key, n in counts.items() if key.startswith('opened:importance:'))
+            closed = sum(n for key, n in counts.items() if key.startswith('closed:importance:'))
+            backlog += opened - closed
+            if field == 'importance' :
+                for value in values :
+                    backlog_by_value[value] += counts.get(f'opened:importance:{value}', 0) - \
+                                               counts.get(f'closed:importance:{value}', 0)
+                yield start, opened, closed, backlog, dict(backlog_by_value)
+            else :
+                yield start, opened, closed, backlog, {value: counts.get(f'closed:status:{value}', 0) for value in values}
+            start = next_period(start, self.period)
+
+    def save(self, path) :
+        if os.path.dirname(path) :
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f :
+            json.dump({'period': self.period, 'last_update': self.last_update, 'tasks': self.tasks,
+                       'counts': self.counts}, f)
+        os.replace(tmp_path, path)
+# end TimeSeries
+
+def load_timeseries(path, period) :
+    # returns an empty time series if there is no state file, or it is for another period
+    series = TimeSeries(period)
+    if os.path.isfile(path) :
+        with open(path) as f :
+            state = json.load(f)
+        if state.get('period') == period :
+            series.last_update = state['last_update']
+            series.tasks = state['tasks']
+            series.counts = state['counts']
+    return series
+# end load_timeseries()
@@ -0,0 +1,86 @@
+# lp_cache - persistent launchpadlib directory (HTTP cache), shared by the launchpad-bugs-tools scripts
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Notes:
+# - launchpadlib keeps its HTTP cache (WADL and resources) in <launchpadlib_dir>/<host>/cache. With a persistent
+#   directory, cached responses are revalidated with a conditional request (ETag / If-None-Match) instead of
+#   being downloaded again; this is done by httplib2, inside launchpadlib.
+# - The size of the cache is bounded: at startup, the least recently used cache files are removed until the
+#   cache is below the limit. Only files in the cache sub-folders are removed (not the credentials).
+# - --no-cache uses a temporary directory that is removed at the end of the run (the previous behavior).
+#
+
+import os
+import tempfile
+
+default_cache_size = 200  # MB
+
+temp_dir = None  # keeps the temporary directory of --no-cache until the end of the run
+
+
+### Default location of the data files (snapshot, cache)
+
+def default_data_dir() :
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA') :
+        base = os.environ['LOCALAPPDATA']
+    else :
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'openrails-tools')
+# end default_data_dir()
+
+def default_cache_dir() :
+    return os.path.join(default_data_dir(), 'launchpadlib')
+# end default_cache_dir()
+
+
+### Command line arguments
+
+def add_cache_arguments(parser) :
+    parser.add_argument('--cache-dir', default=default_cache_dir(),
+                        help='launchpadlib directory, with the HTTP cache. Default is ' + default_cache_dir())
+    parser.add_argument('--cache-size', type=int, default=default_cache_size,
+                        help=f'Max size of the HTTP cache, in MB. Default is {default_cache_size}.')
+    parser.add_argument('--no-cache', action='store_true', help='Use a temporary cache, removed at the end of the run.')
+# end add_cache_arguments()
+
+
+### Get the launchpadlib directory to pass to Launchpad.login_...()
+
+def open_cache(args) :
+    global temp_dir
+    if args.no_cache :
+        temp_dir = tempfile.TemporaryDirectory( prefix='launchpad-')
+        return temp_dir.name
+    os.makedirs(args.cache_dir, exist_ok=True)
+    prune_cache(args.cache_dir, args.cache_size * 1024 * 1024)
+    return args.cache_dir
+# end open_cache()
+
+
+### Remove the least recently used cache files, until the cache is below max_bytes
+
+def prune_cache(lp_dir, max_bytes) :
+    files = [] ; total = 0
+    for host in os.scandir(lp_dir) :
+        cache_path = os.path.join(host.path, 'cache')
+        if not host.is_dir() or not os.path.isdir(cache_path) :
+            continue
+        for entry in os.scandir(cache_path) :
+            if entry.is_file() :
+                st = entry.stat()
+                files.append((max(st.st_atime, st.st_mtime), st.st_size, entry.path))
+                total += st.st_size
+    if total <= max_bytes :
+        return 0
+    num_removed = 0
+    for used, size, path in sorted(files) :
+        try :
+            os.remove(path)
+        except OSError :
+            continue
+        total -= size ; num_removed += 1
+        if total <= max_bytes :
+            break
+    return num_removed
+# end prune_cache()
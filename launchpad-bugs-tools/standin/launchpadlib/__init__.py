@@ -0,0 +1 @@
+# launchpadlib stand-in, see launchpad.py
@@ -0,0 +1,288 @@
+# launchpadlib stand-in - offline replacement of launchpadlib.launchpad, for testing and benchmarking
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Serves the "or" project from local data, through the part of the launchpadlib API that the
+# launchpad-bugs-tools scripts use: Launchpad.login_anonymously/login_with, launchpad.projects['or'],
+# project.searchTasks(), project.all_milestones, launchpad.bugs[id], launchpad.load(link), entry.lp_save(),
+# and the lazy links task.bug, bug.owner and bug.bug_tasks.
+#
+# Usage: put the standin folder first on PYTHONPATH, so that "from launchpadlib.launchpad import Launchpad"
+# imports this module instead of launchpadlib. ORTS-Bench-Bugs.py does that.
+#
+# Environment variables:
+# - LP_STANDIN_DATA     "synthetic:<number of bugs>" (default "synthetic:2000"), or the path of a bug snapshot
+#                       (SQLite, created by ORTS-Sync-Bugs.py), to serve recorded data
+# - LP_STANDIN_SEED     seed of the synthetic data, default 1
+# - LP_STANDIN_LATENCY  simulated latency of each request, in seconds, default 0
+# - LP_STANDIN_STATS    file where the request counts are written (JSON) at exit; default none
+#
+# Each simulated HTTP request is counted: searching (one request per page of 75 entries), following a link
+# (task.bug, bug.owner, bug.bug_tasks), loading an entry (bugs[id], load(link)), and saving (lp_save).
+#
+
+import atexit
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+api_root = 'https://api.launchpad.net/devel/'
+web_root = 'https://bugs.launchpad.net/'
+page_size = 75
+
+open_states = ['New', 'Incomplete', 'Triaged', 'Deferred', 'Confirmed', 'In Progress', 'Fix Committed']
+closed_states = ['Fix Released', 'Invalid', "Won't Fix", 'Does Not Exist', 'Expired', 'Opinion']
+importance_list = ['Critical', 'High', 'Medium', 'Low', 'Wishlist', 'Undecided']
+tag_list = ['content', 'physics', 'sound', 'ui', 'timetable', 'multiplayer', 'activity', 'signals', 'cab', 'steam',
+            'diesel', 'electric', 'brakes', 'track', 'terrain', 'weather', 'graphics', 'performance', 'crash', 'menu',
+            'documentation', 'build', 'ai-trains', 'dispatcher', 'tools', 'shapes', 'sky', 'camera', 'input', 'stale']
+milestone_names = ['1.0', '1.1', '1.2', '1.3', '1.3.1', '1.4', '1.5', '1.5.1', '1.6']
+
+
+### Request Counting
+
+stats = {'requests': 0, 'by_kind': {}}
+stats_lock = threading.Lock()
+latency = float(os.environ.get('LP_STANDIN_LATENCY', '0'))
+
+def request(kind) :
+    with stats_lock :
+        stats['requests'] += 1
+        stats['by_kind'][kind] = stats['by_kind'].get(kind, 0) + 1
+    if latency > 0 :
+        time.sleep(latency)
+# end request()
+
+def write_stats() :
+    path = os.environ.get('LP_STANDIN_STATS')
+    if path :
+        with open(path, 'w') as f :
+            json.dump(stats, f, indent=2)
+# end write_stats()
+
+atexit.register(write_stats)
+
+
+### Entries (bug, task, person, milestone, project)
+
+class Entry :
+    # attributes set after creation are dirty until saved, like launchpadlib entries
+    def __init__(self, **attrs) :
+        self.__dict__.update(attrs)
+        self.__dict__['_dirty_attributes'] = {}
+
+    def __setattr__(self, name, value) :
+        self.__dict__[name] = value
+        self._dirty_attributes[name] = value
+
+    def lp_save(self) :
+        request('save')
+        if 'status' in self._dirty_attributes and hasattr(self, 'bug_link') :
+            self.__dict__['date_closed'] = None if self.status in open_states else datetime.now(tz=timezone.utc)
+        self._dirty_attributes.clear()
+# end Entry
+
+class Task(Entry) :
+    @property
+    def bug(self) :
+        request('link')
+        return dataset.bugs[self.bug_link]
+# end Task
+
+class Bug(Entry) :
+    @property
+    def owner(self) :
+        request('link')
+        return dataset.people[self.owner_link]
+
+    @property
+    def bug_tasks(self) :
+        request('link')
+        return [task for task in dataset.tasks if task.bug_link == self.self_link]
+# end Bug
+
+
+### Collection, fetched by pages
+
+class Collection :
+    def __init__(self, entries) :
+        self.entries = entries
+
+    def __len__(self) :
+        request('search')  # total_size comes with the first page
+        return len(self.entries)
+
+    def __iter__(self) :
+        for start in range(0, len(self.entries), page_size) :
+            request('search')
+            yield from self.entries[start:start + page_size]
+
+    def __getitem__(self, index) :
+        if isinstance(index, slice) :
+            return Collection(self.entries[index])
+        request('search')
+        return self.entries[index]
+# end Collection
+
+
+### Project
+
+class Project(Entry) :
+    @property
+    def all_milestones(self) :
+        request('search')
+        return list(dataset.milestones.values())
+
+    def searchTasks(self, status=None, importance=None, milestone='', modified_since=None, created_before=None,
+                    created_since=None, tags=None, order_by=None, **kwargs) :
+        if status is None : status = open_states
+        elif isinstance(status, str) : status = [status]
+        if isinstance(importance, str) : importance = [importance]
+        if isinstance(tags, str) : tags = [tags]
+        modified_since = to_datetime(modified_since) ; created_before = to_datetime(created_before)
+        created_since = to_datetime(created_since)
+        result = []
+        for task in dataset.tasks :
+            bug = dataset.bugs[task.bug_link]
+            if task.status not in status : continue
+            if importance and task.importance not in importance : continue
+            if milestone and task.milestone_link != milestone : continue
+            if modified_since and bug.date_last_updated < modified_since : continue
+            if created_before and task.date_created >= created_before : continue
+            if created_since and task.date_created < created_since : continue
+            if tags and not any(tag in bug.tags for tag in tags) : continue
+            result.append(task)
+        for field in reversed(order_by or []) :
+            desc = field.startswith('-') ; field = field.lstrip('-')
+            if field == 'datecreated' : key = lambda t: t.date_created
+            elif field == 'id' : key = lambda t: dataset.bugs[t.bug_link].id
+            elif field == 'date_last_updated' : key = lambda t: dataset.bugs[t.bug_link].date_last_updated
+            elif field == 'importance' : key = lambda t: importance_list.index(t.importance)
+            else : key = lambda t: getattr(t, field)
+            result.sort(key=key, reverse=desc)
+        return Collection(result)
+# end Project
+
+def to_datetime(value) :
+    if value is None or isinstance(value, datetime) : return value
+    dt = datetime.fromisoformat(str(value))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+# end to_datetime()
+
+
+### Data Set, synthetic or recorded
+
+class Dataset :
+    def __init__(self) :
+        self.bugs = {} ; self.tasks = [] ; self.people = {} ; self.milestones = {}
+        self.project = Project(name='or', self_link=api_root + 'or', web_link=web_root + 'or',
+                               date_created=datetime(2009, 2, 11, tzinfo=timezone.utc))
+
+    def add_person(self, link, display_name) :
+        self.people[link] = Entry(self_link=link, name=link.rsplit('~', 1)[-1], display_name=display_name)
+
+    def add_milestone(self, link, name) :
+        self.milestones[link] = Entry(self_link=link, name=name)
+
+    def add_bug(self, bug_id, title, tags, owner_link, date_created, date_last_updated) :
+        self.bugs[api_root + f'bugs/{bug_id}'] = Bug(id=bug_id, title=title, tags=tags, owner_link=owner_link,
+            date_created=date_created, date_last_updated=date_last_updated, self_link=api_root + f'bugs/{bug_id}',
+            web_link=web_root + f'or/+bug/{bug_id}')
+
+    def add_task(self, bug_id, status, importance, date_created, date_closed, milestone_link) :
+        self.tasks.append(Task(bug_link=api_root + f'bugs/{bug_id}', self_link=api_root + f'or/+bug/{bug_id}',
+            web_link=web_root + f'or/+bug/{bug_id}', bug_target_name='or', status=status, importance=importance,
+            date_created=date_created, date_closed=date_closed, milestone_link=milestone_link, assignee_link=None))
+# end Dataset
+
+def synthetic_dataset(num_bugs, seed) :
+    rnd = random.Random(seed)
+    data = Dataset()
+    for i in range(max(10, num_bugs // 10)) :
+        data.add_person(api_root + f'~person{i}', f'Person {i}')
+    for i, name in enumerate(milestone_names) :
+        data.add_milestone(api_root + f'or/+milestone/{name}', name)
+    people = list(data.people) ; milestones = list(data.milestones)
+    now = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    start = datetime(2009, 2, 11, tzinfo=timezone.utc)
+    span = (now - start).days
+    for i in range(num_bugs) :
+        bug_id = 1000000 + i * 37
+        created = start + timedelta(days=span * i / num_bugs, seconds=rnd.randint(0, 86399))
+        status = rnd.choice(closed_states * 3 + open_states) if created < now - timedelta(days=365) else \
+                 rnd.choice(closed_states + open_states * 2)
+        closed = created + timedelta(days=rnd.randint(0, 900)) if status in closed_states else None
+        if closed and closed > now : closed = now
+        updated = max(closed or created, created + timedelta(days=rnd.randint(0, 1200)))
+        if updated > now : updated = now
+        milestone = rnd.choice(milestones) if status == 'Fix Released' and rnd.random() < 0.7 else None
+        tags = rnd.sample(tag_list, rnd.choice([0, 0, 1, 1, 1, 2, 3]))
+        data.add_bug(bug_id, f'Synthetic bug {i}, "quoted", with comma', tags, rnd.choice(people), created, updated)
+        data.add_task(bug_id, status, rnd.choice(importance_list), created, closed, milestone)
+    return data
+# end synthetic_dataset()
+
+def recorded_dataset(path) :
+    conn = sqlite3.connect(path)
+    data = Dataset()
+    for link, name in conn.execute('SELECT self_link, display_name FROM people') :
+        data.add_person(link, name)
+    for link, name in conn.execute('SELECT self_link, name FROM milestones') :
+        data.add_milestone(link, name)
+    for bug_id, title, tags, owner_link, created, updated in conn.execute(
+            'SELECT id, title, tags, owner_link, date_created, date_last_updated FROM bugs') :
+        data.add_bug(bug_id, title, tags.split() if tags else [], owner_link, to_datetime(created), to_datetime(updated))
+    for bug_id, status, importance, created, closed, milestone in conn.execute(
+            'SELECT bug_id, status, importance, date_created, date_closed, milestone_link FROM tasks') :
+        data.add_task(bug_id, status, importance, to_datetime(created), to_datetime(closed), milestone)
+    conn.close()
+    return data
+# end recorded_dataset()
+
+def load_dataset() :
+    spec = os.environ.get('LP_STANDIN_DATA', 'synthetic:2000')
+    if spec.startswith('synthetic') :
+        num_bugs = int(spec.partition(':')[2] or 2000)
+        return synthetic_dataset(num_bugs, int(os.environ.get('LP_STANDIN_SEED', '1')))
+    return recorded_dataset(spec)
+# end load_dataset()
+
+dataset = load_dataset()
+
+
+### Launchpad
+
+class Bugs :
+    def __getitem__(self, bug_id) :
+        request('load')
+        bug = dataset.bugs.get(api_root + f'bugs/{bug_id}')
+        if bug is None :
+            raise KeyError(bug_id)
+        return bug
+# end Bugs
+
+class Launchpad :
+    def __init__(self) :
+        request('login')  # service root and WADL
+        self.projects = {'or': dataset.project}
+        self.bugs = Bugs()
+
+    @classmethod
+    def login_anonymously(cls, consumer_name, service_root='production', launchpadlib_dir=None, **kwargs) :
+        return cls()
+
+    @classmethod
+    def login_with(cls, application_name=None, service_root='production', launchpadlib_dir=None, **kwargs) :
+        return cls()
+
+    def load(self, link) :
+        request('load')
+        for entries in (dataset.bugs, dataset.people, dataset.milestones) :
+            if link in entries :
+                return entries[link]
+        raise KeyError(link)
+# end Launchpad
@@ -0,0 +1,125 @@
+# ortsArchive - read the content files in zip archives (content packs) without extracting them
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used by ortsContent (readFile), ortsReadAhead, ortsTools and ORTS-RollingStockScanner; so ORTS-RollingStockScanner and
+# ORTS-FindConfigParam (and the other tools that list files without a catalog) accept zip files, and folders of them.
+#
+# Notes:
+# - A file in an archive has the path of the archive followed by the path in the archive, eg.
+#   "c:\Packs\BNSF.zip\Trains\Trainset\GP38\gp38.eng". So the parent folder, the include paths (resolved relative to
+#   the file) and the package (getContentDir) work the same as for a file in a folder. When the Trains folder is at
+#   the top of the archive, the archive is the package (its name without .zip).
+# - The files in an archive are looked up case insensitive, with "\" or "/", as OpenRails does on Windows.
+# - An archive is opened, and its list of files read, once per process. The files are read (decompressed) in memory.
+# - The catalog (ORTS-BuildCatalog) only has the files in folders; the archives are not listed with --catalog.
+#
+
+import fnmatch
+import pathlib
+import posixpath
+import threading
+import zipfile
+
+archives = {}  # key is the archive path, value is the Archive
+archivesLock = threading.Lock()
+
+
+### is the path a zip archive (a file with the .zip extension)
+def isArchive( path) :
+    return path.suffix.casefold() == '.zip' and path.is_file()
+
+
+### get the key of a file in an archive: "/" separators, no "." or "..", casefolded
+def getMemberKey( name) :
+    return posixpath.normpath( '/' + name.replace( '\\', '/')).lstrip( '/').casefold()
+
+
+### an open zip archive, with its files by key
+class Archive :
+    def __init__( self, path) :
+        self.path = path
+        self.zip = zipfile.ZipFile( path)
+        self.members = {getMemberKey( info.filename) : info for info in self.zip.infolist() if not info.is_dir()}
+
+    ### get the info of a file, None if not in the archive
+    def get( self, name) :
+        return self.members.get( getMemberKey( name))
+
+    ### read a file; raises FileNotFoundError if it is not in the archive
+    def read( self, name) :
+        info = self.get( name)
+        if info is None :
+            raise FileNotFoundError( 'No file "{}" in archive {}'.format(name, self.path))
+        return self.zip.read( info)
+
+    ### the paths of the files (in or below a folder of the archive) whose name matches the pattern
+    def glob( self, name, pattern) :
+        prefix = getMemberKey( name)
+        prefix = prefix + '/' if prefix not in ('', '.') else ''
+        pattern = pattern.casefold()
+        for key, info in self.members.items() :
+            if key.startswith( prefix) and fnmatch.fnmatchcase( posixpath.basename( key), pattern) :
+                yield self.path.joinpath( *info.filename.split( '/'))
+
+
+### get an archive, opened the first time
+def getArchive( path) :
+    with archivesLock :
+        archive = archives.get( path)
+        if archive is None :
+            archive = archives[path] = Archive( path)
+        return archive
+
+
+### split a path into the archive and the path in the archive; None if the path is not in an archive
+def splitPath( path) :
+    if '.zip' not in str(path).casefold() :
+        return None
+    parts = path.parts
+    for i in range( 1, len(parts)) :
+        if parts[i-1].casefold().endswith( '.zip') :
+            archivePath = pathlib.Path( *parts[:i])
+            if archivePath in archives or archivePath.is_file() :
+                return archivePath, '/'.join( parts[i:])
+    return None
+
+
+### read a file, in a folder or in an archive
+def readBytes( path) :
+    split = splitPath( path)
+    if split :
+        return getArchive( split[0]).read( split[1])
+    return path.read_bytes()
+
+
+### get the size of a file, in a folder or in an archive (uncompressed); raises OSError if it does not exist
+def getSize( path) :
+    split = splitPath( path)
+    if split :
+        info = getArchive( split[0]).get( split[1])
+        if info is None :
+            raise FileNotFoundError( 'No file "{}" in archive {}'.format(split[1], split[0]))
+        return info.file_size
+    return path.stat().st_size
+
+
+### is the path a file, in a folder or in an archive
+def isFile( path) :
+    split = splitPath( path)
+    if split :
+        return getArchive( split[0]).get( split[1]) is not None
+    return path.is_file()
+
+
+### the files whose name matches the pattern (eg. "*.eng") in (or below) a folder, and in the archives below it;
+### or in an archive, or a folder in an archive
+def rglob( dirPath, pattern) :
+    split = splitPath( dirPath) or ((dirPath, '') if isArchive( dirPath) else None)
+    if split :
+        yield from getArchive( split[0]).glob( split[1], pattern)
+        return
+    yield from dirPath.rglob( pattern)
+    for archivePath in dirPath.rglob( '*.[zZ][iI][pP]') :
+        if archivePath.is_file() :
+            yield from getArchive( archivePath).glob( '', pattern)
@@ -0,0 +1,348 @@
+# ortsCatalog - catalog (SQLite) of the content files below a content root, updated incrementally
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Created and updated by ORTS-BuildCatalog. Used (with --catalog) by ORTS-RollingStockScanner,
+# ORTS-ListRollingStockUsed, ORTS-CopyTrains and ORTS-FindConfigParam, instead of crawling and parsing the files.
+#
+# Notes:
+# - The catalog has, for each config file (eng, wag, inc, con, srv, ...): size, modification time and hash,
+#   the package (the folder above TRAINS or ROUTES), the names of the blocks in the file, and the included files.
+#   Plus the attributes of the engines and wagons (the columns of ORTS-RollingStockScanner, and its warnings),
+#   the engines and wagons of the consists (ortsContent.parseConsist), and the consist of the services.
+# - An update walks the folder tree and only reads the files that are new or changed (size or modification time),
+#   and the files that include them. Unchanged files are not read. The tools update the catalog before using it,
+#   so the answers are always as fresh as a crawl.
+# - The walk itself is not incremental: each update lists all the folders below the folder of the tool, and gets the
+#   size and modification time of each file (from the folder listing on Windows, with a stat elsewhere). The
+#   modification time of a folder does not change when a file in it is edited, so it cannot be used to skip the
+#   folders. For a large content root, point the tool at the folder it needs, or use --watch (ortsWatch).
+# - The time of the last walk of each folder is kept (meta "walked:<folder key>"). With a maximum age (eg.
+#   ORTS-RollingStockScanner --max-age), the walk is skipped when the folder (or a folder above it) was walked more
+#   recently; the answers then miss the changes made since, eg. on a slow network share that is rarely changed.
+# - updateFiles() does the same for a set of files reported as changed, eg. by ortsWatch in --watch mode.
+# - Paths are stored relative to the content root, with "/" separators. Lookups are case insensitive (the key
+#   is the casefolded path), as on Windows.
+#
+
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+
+import ortsContent
+
+schemaVersion = '2'  # a catalog with another version is created again
+catalogExtensions = ['.eng', '.wag', '.inc', '.con', '.srv', '.cvf', '.sms', '.sd', '.act', '.pat']
+
+schema = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (key TEXT PRIMARY KEY, path TEXT, ext TEXT, size INTEGER, mtime INTEGER, hash TEXT,
+    package TEXT);
+CREATE TABLE IF NOT EXISTS names (key TEXT, name TEXT);
+CREATE TABLE IF NOT EXISTS includes (key TEXT, include TEXT);
+CREATE TABLE IF NOT EXISTS rollingstock (key TEXT PRIMARY KEY, isEngine INTEGER, columns TEXT, warnings TEXT);
+CREATE TABLE IF NOT EXISTS consists (key TEXT, position INTEGER, kind TEXT, uid INTEGER, flip INTEGER, fileName TEXT,
+    dirName TEXT);
+CREATE TABLE IF NOT EXISTS services (key TEXT PRIMARY KEY, consistName TEXT);
+CREATE INDEX IF NOT EXISTS names_name ON names (name);
+CREATE INDEX IF NOT EXISTS names_key ON names (key);
+CREATE INDEX IF NOT EXISTS includes_key ON includes (key);
+CREATE INDEX IF NOT EXISTS includes_include ON includes (include);
+CREATE INDEX IF NOT EXISTS consists_key ON consists (key);
+'''
+
+### a catalog that cannot be opened, or used for a folder; the tools print the message and exit
+class CatalogError( ValueError) :
+    pass
+
+
+allTables = ['meta', 'files', 'names', 'includes', 'rollingstock', 'consists', 'services']
+detailTables = ['names', 'includes', 'rollingstock', 'consists', 'services']
+
+### get the package name (the folder above TRAINS or ROUTES) from a path relative to the content root
+def getPackage( relPath) :
+    parts = relPath.split('/')
+    for i in range(1, len(parts)) :
+        if parts[i].casefold() in ('trains', 'routes') :
+            return parts[i-1]
+    return None
+
+
+### the catalog of a content root
+class Catalog :
+    def __init__( self, catalogPath, conn, root) :
+        self.catalogPath = catalogPath ; self.conn = conn
+        self.root = pathlib.Path(root)
+        self.rootKey = normalizePath( root).casefold()
+
+    ### get the key (casefolded path relative to the root) of a path; None if the path is not below the root
+    def getKey( self, path) :
+        p = normalizePath( path).casefold()
+        if p == self.rootKey : return ''
+        if p.startswith( self.rootKey.rstrip('/') + '/') : return p[len(self.rootKey.rstrip('/')) + 1:]
+        return None
+
+    def contains( self, path) :
+        return self.getKey( path) is not None
+
+    ### update the catalog for the files in (or below) the folder; returns the number of files read and removed
+    ### with maxAge (seconds), the folder is not walked if it was walked less than maxAge ago
+    def update( self, dirPath=None, full=False, verbose=0, maxAge=None) :
+        dirPath = pathlib.Path(dirPath) if dirPath else self.root
+        prefix = self.getKey( dirPath)
+        if prefix is None :
+            raise CatalogError( '{} is not in the catalog root {}'.format(dirPath, self.root))
+        walkTime = self.getWalkTime( dirPath)
+        if maxAge is not None and not full and walkTime is not None and time.time() - walkTime < maxAge :
+            if verbose > 0 :
+                print( 'Info: catalog walked {:.0f} seconds ago, not updated'.format(time.time() - walkTime), file=sys.stderr)
+            return 0, 0
+        startTime = time.time()
+        known = {key: (size, mtime) for key, size, mtime in self.conn.execute(
+                 'SELECT key, size, mtime FROM files WHERE key = ? OR (key >= ? AND key < ?)',
+                 (prefix, prefix + '/', prefix + '0') if prefix else ('', '', '\U0010ffff'))}
+        seen = {} ; changed = []
+        for entry in scanFiles( str(dirPath)) :
+            if os.path.splitext( entry.name)[1].casefold() not in catalogExtensions : continue
+            key = self.getKey( entry.path)
+            st = entry.stat()
+            seen[key] = entry.path
+            if full or known.get( key) != (st.st_size, st.st_mtime_ns) :
+                changed.append( key)
+        removed = [key for key in known if key not in seen]
+        self.conn.execute( 'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('walked:' + prefix, repr(startTime)))
+        readKeys, removed = self.refresh( changed, removed, seen, full, verbose)
+        return len(readKeys), len(removed)
+
+    ### get the time (time.time()) of the last walk of the folder, or of a folder above it; None if never walked
+    def getWalkTime( self, dirPath) :
+        key = self.getKey( dirPath)
+        if key is None : return None
+        parts = key.split('/') if key else []
+        keys = ['walked:' + '/'.join( parts[:i]) for i in range( len(parts) + 1)]
+        row = self.conn.execute( 'SELECT MAX(CAST(value AS REAL)) FROM meta WHERE key IN ({})'.format(
+                                 ','.join( '?' * len(keys))), keys).fetchone()
+        return row[0]
+
+    ### update the catalog for the files that changed (eg. reported by ortsWatch); returns the keys of the files
+    ### read, including the files that include them, and the keys of the files removed
+    def updateFiles( self, paths, verbose=0) :
+        changed = [] ; removed = [] ; seen = {}
+        for path in paths :
+            key = self.getKey( path)
+            if key is None or os.path.splitext( path)[1].casefold() not in catalogExtensions : continue
+            if os.path.isfile( path) :
+                changed.append( key) ; seen[key] = path
+            elif self.getPath( key) :
+                removed.append( key)
+        return self.refresh( changed, removed, seen, False, verbose)
+
+    ### read the changed files, and the files that include them (at any level, eg. the wag files that include an
+    ### inc file); remove the removed files. seen has the paths of the changed files, by key.
+    def refresh( self, changed, removed, seen, full, verbose) :
+        changedSet = set(changed)
+        dependencies = changed + removed
+        for key in dependencies :
+            for (includer,) in self.conn.execute( 'SELECT key FROM includes WHERE include = ?', (key,)) :
+                if includer in changedSet or includer in removed : continue
+                if includer not in seen :
+                    path = self.getPath( includer)
+                    if not path or not path.is_file() : continue
+                    seen[includer] = path
+                changed.append( includer) ; changedSet.add( includer) ; dependencies.append( includer)
+        for key in dependencies :  # the include files read before (eg. in watch mode) are read again
+            path = seen.get( key) or self.getPath( key)
+            if path : ortsContent.includeCache.pop( pathlib.Path(path).resolve(), None)
+
+        readKeys = []
+        for key in changed :
+            if verbose > 1 : print( 'Info: indexing', seen[key], file=sys.stderr)
+            if self.indexFile( key, pathlib.Path(seen[key]), full) : readKeys.append( key)
+        for key in removed :
+            if verbose > 0 : print( 'Info: removing from catalog', key, file=sys.stderr)
+            self.removeFile( key)
+        self.conn.commit()
+        return readKeys, removed
+
+    def removeFile( self, key) :
+        self.conn.execute( 'DELETE FROM files WHERE key = ?', (key,))
+        for table in detailTables :
+            self.conn.execute( 'DELETE FROM {} WHERE key = ?'.format(table), (key,))
+
+    ### read and parse one file; returns False if the file did not change (same hash)
+    def indexFile( self, key, path, force) :
+        st = path.stat()
+        bytes = path.read_bytes()
+        fileHash = hashlib.blake2b( bytes, digest_size=16).hexdigest()
+        relPath = os.path.relpath( path, self.root).replace( os.sep, '/')
+        ext = path.suffix.casefold()
+        row = self.conn.execute( 'SELECT hash FROM files WHERE key = ?', (key,)).fetchone()
+        self.conn.execute( 'INSERT OR REPLACE INTO files (key, path, ext, size, mtime, hash, package) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (key, relPath, ext, st.st_size, st.st_mtime_ns, fileHash, getPackage( relPath)))
+        if row and row[0] == fileHash and not force and not self.hasIncludes( key) :
+            return False  # touched, but not modified
+        for table in detailTables :
+            self.conn.execute( 'DELETE FROM {} WHERE key = ?'.format(table), (key,))
+        txt = ortsContent.decodeFile( bytes)
+
+        self.conn.executemany( 'INSERT INTO names (key, name) VALUES (?, ?)',
+                               [(key, name) for name in ortsContent.getBlockNames( txt)])
+        includes = [self.getKey( incPath) or normalizePath( incPath).casefold()
+                    for incPath in ortsContent.getIncludePaths( txt, path.parent)]
+        self.conn.executemany( 'INSERT INTO includes (key, include) VALUES (?, ?)', [(key, inc) for inc in includes])
+
+        if ext in ('.eng', '.wag') :
+            self.indexRollingStock( key, path, ext == '.eng')
+        elif ext == '.con' :
+            name, entries = ortsContent.parseConsist( txt)
+            self.conn.executemany( 'INSERT INTO consists (key, position, kind, uid, flip, fileName, dirName) '
+                                   'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   [(key, position) + tuple(entry) for position, entry in enumerate( entries)])
+        elif ext == '.srv' :
+            self.conn.execute( 'INSERT INTO services (key, consistName) VALUES (?, ?)',
+                               (key, ortsContent.getServiceConsistName( txt)))
+        return True
+
+    def hasIncludes( self, key) :
+        return self.conn.execute( 'SELECT 1 FROM includes WHERE key = ? LIMIT 1', (key,)).fetchone() is not None
+
+    ### the columns of ORTS-RollingStockScanner, and the warnings (messages) generated
+    def indexRollingStock( self, key, path, isEngine) :
+        warnings = []
+        def warn( *args) :
+            warnings.append( ' '.join( str(arg) for arg in args))
+        columns = ortsContent.getRollingStockValues( path, isEngine, warn)
+        self.conn.execute( 'INSERT INTO rollingstock (key, isEngine, columns, warnings) VALUES (?, ?, ?, ?)',
+                           (key, int(isEngine), json.dumps( columns) if columns else None, json.dumps( warnings)))
+
+    ### queries; paths are absolute (pathlib) paths, as found in the folder tree
+
+    def getPath( self, key) :
+        row = self.conn.execute( 'SELECT path FROM files WHERE key = ?', (key,)).fetchone()
+        return self.root / row[0] if row else None
+
+    ### get the actual path of a file (case insensitive lookup); None if it does not exist
+    def getFile( self, path) :
+        key = self.getKey( path)
+        return None if key is None else self.getPath( key)
+
+    ### get the actual path of a folder with at least one catalog file in (or below) it; None if there is none
+    def getFolder( self, path) :
+        key = self.getKey( path)
+        if key is None : return None
+        low, high = (key + '/', key + '0') if key else ('', '\U0010ffff')
+        row = self.conn.execute( 'SELECT path FROM files WHERE key > ? AND key < ? LIMIT 1', (low, high)).fetchone()
+        if not row : return None
+        return self.root.joinpath( *row[0].split('/')[:key.count('/') + 1 if key else 0])
+
+    ### list the files in (or below) the folder with the extension; optionally only directly in the folder
+    def listFiles( self, dirPath, ext, recursive=True) :
+        prefix = self.getKey( dirPath)
+        low, high = (prefix + '/', prefix + '0') if prefix else ('', '\U0010ffff')
+        for key, relPath in self.conn.execute( 'SELECT key, path FROM files WHERE key > ? AND key < ? AND ext = ? '
+                                               'ORDER BY key', (low, high, ext.casefold())) :
+            if recursive or '/' not in key[len(low):] :
+                yield self.root / relPath
+
+    ### get the scanner columns (dict, None if the file could not be processed) and the warnings of an eng or wag file
+    def getRollingStock( self, path) :
+        row = self.conn.execute( 'SELECT columns, warnings FROM rollingstock WHERE key = ?',
+                                 (self.getKey( path),)).fetchone()
+        if not row :
+            return None, []
+        return json.loads( row[0]) if row[0] else None, json.loads( row[1])
+
+    ### get the engines and wagons of a consist (ortsContent.ConsistEntry), in train order
+    def getConsist( self, path) :
+        return [ortsContent.ConsistEntry( kind, uid, bool(flip), fileName, dirName)
+                for kind, uid, flip, fileName, dirName in self.conn.execute(
+                'SELECT kind, uid, flip, fileName, dirName FROM consists WHERE key = ? ORDER BY position', (self.getKey( path),))]
+
+    ### get the name of the consist of a service, None if not found
+    def getServiceConsistName( self, path) :
+        row = self.conn.execute( 'SELECT consistName FROM services WHERE key = ?', (self.getKey( path),)).fetchone()
+        return row[0] if row else None
+
+    ### get the files that contain a block with the name, and with includes also the files that include them
+    def getFilesWithName( self, name, withIncluders=False) :
+        keys = {key for (key,) in self.conn.execute( 'SELECT key FROM names WHERE name = ?', (name.casefold(),))}
+        if withIncluders :
+            for key in list(keys) :
+                keys.update( includer for (includer,) in self.conn.execute(
+                             'SELECT key FROM includes WHERE include = ?', (key,)))
+        return keys
+
+    def close( self) :
+        self.conn.close()
+
+
+### the files (os.DirEntry) in and below a folder; on Windows, their size and modification time come with the listing
+def scanFiles( dirPath) :
+    dirs = [dirPath]
+    while dirs :
+        try :
+            entries = list( os.scandir( dirs.pop()))
+        except OSError :
+            continue  # like os.walk, a folder that cannot be listed is skipped
+        for entry in entries :
+            if entry.is_dir( follow_symlinks=False) : dirs.append( entry.path)
+            elif entry.is_file() : yield entry
+
+
+### normalize a path (absolute, "/" separators); also accepts paths built with "\" on other platforms
+def normalizePath( path) :
+    p = os.path.normpath( os.path.abspath( str(path).replace( '\\', '/')))
+    return p.replace( '\\', '/')
+
+
+### open (or create) a catalog; the root is required to create it. Raises CatalogError.
+def openCatalog( catalogPath, root=None) :
+    catalogPath = pathlib.Path(catalogPath)
+    if root is None and not catalogPath.is_file() :
+        raise CatalogError( 'catalog {} does not exist, create it with ORTS-BuildCatalog.py'.format(catalogPath))
+    conn = sqlite3.connect( catalogPath)
+    conn.executescript( schema)
+    row = conn.execute( "SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if row is None or row[0] != schemaVersion :
+        if conn.execute( 'SELECT 1 FROM files LIMIT 1').fetchone() :
+            print( 'Info: catalog {} is from another version, creating it again'.format(catalogPath), file=sys.stderr)
+        rootRow = conn.execute( "SELECT value FROM meta WHERE key = 'root'").fetchone()
+        for table in allTables :
+            conn.execute( 'DROP TABLE IF EXISTS {}'.format(table))
+        conn.executescript( schema)
+        conn.execute( "INSERT INTO meta (key, value) VALUES ('version', ?)", (schemaVersion,))
+        if rootRow :
+            conn.execute( "INSERT INTO meta (key, value) VALUES ('root', ?)", rootRow)
+        conn.commit()
+    row = conn.execute( "SELECT value FROM meta WHERE key = 'root'").fetchone()
+    if root is not None :
+        root = str(pathlib.Path(root).resolve())
+        if row and row[0] != root :
+            conn.close()
+            raise CatalogError( 'catalog {} is for content root {}, not {}'.format(catalogPath, row[0], root))
+        conn.execute( "INSERT OR REPLACE INTO meta (key, value) VALUES ('root', ?)", (root,))
+        conn.commit()
+    elif row :
+        root = row[0]
+    else :
+        conn.close()
+        raise CatalogError( 'catalog {} has no content root, recreate it with ORTS-BuildCatalog.py'.format(catalogPath))
+    return Catalog( catalogPath, conn, root)
+
+
+### open the catalog for a tool, and update it for the folder the tool works on (see Catalog.update for maxAge).
+### Raises CatalogError.
+def openFreshCatalog( catalogPath, dirPath, verbose=0, maxAge=None) :
+    catalog = openCatalog( catalogPath)
+    if not catalog.contains( dirPath) :
+        catalog.close()
+        raise CatalogError( '{} is not in the content root {} of catalog {}'.format(dirPath, catalog.root, catalogPath))
+    numRead, numRemoved = catalog.update( dirPath, verbose=verbose, maxAge=maxAge)
+    if verbose > 0 or numRead or numRemoved :
+        print( 'Info: catalog updated, {} files read, {} removed'.format(numRead, numRemoved), file=sys.stderr)
+    return catalog
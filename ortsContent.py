@@ -0,0 +1,481 @@
+# ortsContent - reading and parsing of content files, shared by the ORTS tools
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used by ORTS-RollingStockScanner (engine and wagon attributes), ORTS-ListRollingStockUsed
+# (service and consist references), ORTS-ConsistReport, ORTS-DiffRollingStock (the block tree), ortsCatalog (the content
+# catalog) and ortsTools.
+#
+
+import bisect
+import collections
+import pathlib
+import re
+import sys
+
+import ortsArchive
+
+includeCache = {}  # key is resolved include path, value is (text, line starts); include files are read once per process
+
+
+### get the content (package) directory, the one above TRAINS; an archive (see ortsArchive) without .zip
+def getContentDir( filePath) :
+    TRAINS = "TRAINS".casefold()
+    absPath = filePath.resolve()
+    for i in range(len(absPath.parents)) :
+        if absPath.parents[i].name.casefold() == TRAINS and i + 1 < len(absPath.parents) :
+            name = absPath.parents[i+1].name
+            return name[:-4] if name.casefold().endswith( '.zip') else name
+    return None
+
+
+### read a file that is either utf-16 or utf8; in a folder or in a zip archive (see ortsArchive)
+def readFile( filePath) :
+    return decodeFile( ortsArchive.readBytes( filePath))
+
+
+### decode the content of a file that is either utf-16 or utf8; an empty file is an empty text
+def decodeFile( bytes) :
+    enc = "utf-16"
+    if not bytes or 0 < bytes[0] < 128: enc = 'utf-8'
+    return bytes.decode(encoding = enc, errors = 'replace' )
+
+
+### get the paths of the files included by a file
+def getIncludePaths( txt, refDir) :
+    return [pathlib.Path(refDir, m.group(1).strip().strip('"')).resolve()
+            for m in re.finditer( 'include\\s*\\(([^)]+)\\)', txt, flags=re.IGNORECASE)]
+
+
+### get the offsets at which the lines of a text start
+def getLineStarts( txt) :
+    return [0] + [m.end() for m in re.finditer( '\n', txt)]
+
+
+### read an include file, only once per process
+def readIncludeFile( incPath) :
+    entry = includeCache.get( incPath)
+    if entry is None :
+        incTxt = readFile( incPath)
+        entry = includeCache[incPath] = (incTxt, getLineStarts( incTxt))
+    return entry
+
+
+### read a config file, optionally resolving includes (relative to refDir); see expandText()
+def readSourceFile( filePath, refDir, expand, warn=None) :
+    txt = readFile( filePath)
+    if not expand :
+        return txt, ([0], [(filePath, 0, getLineStarts( txt))])
+    return expandText( txt, filePath, refDir, warn)
+
+
+### resolve the includes (relative to refDir) of the text of a config file; the include resolver of all the tools
+### returns the text and a source map: the offsets in the text where a segment starts,
+### and for each segment (source path, offset in source, line starts of source)
+### an include file that cannot be read is passed to warn, or raises OSError if warn is None
+def expandText( txt, filePath, refDir, warn=None) :
+    lineStarts = getLineStarts( txt)
+    parts = [] ; segStarts = [0] ; segInfos = [(filePath, 0, lineStarts)]
+    pos = outLen = 0
+    for m in re.finditer( 'include\\s*\\(([^)]+)\\)', txt, flags=re.IGNORECASE) :
+        incPath = pathlib.Path(refDir, m.group(1).strip().strip('"')).resolve()
+        try :
+            incTxt, incLineStarts = readIncludeFile( incPath)
+        except OSError :
+            if warn is None : raise
+            warn( 'Unable to read include file "{}" in {}'.format(incPath, filePath))
+            continue
+        parts.append( txt[pos:m.start()]) ; outLen += m.start() - pos
+        segStarts.append( outLen) ; segInfos.append( (incPath, 0, incLineStarts))
+        parts.append( incTxt) ; outLen += len(incTxt)
+        segStarts.append( outLen) ; segInfos.append( (filePath, m.end(), lineStarts))
+        pos = m.end()
+    parts.append( txt[pos:])
+    return ''.join(parts), (segStarts, segInfos)
+
+
+### map an offset in the (expanded) text to the source file and line number
+def getSourceLine( sourceMap, offset) :
+    segStarts, segInfos = sourceMap
+    i = bisect.bisect_right( segStarts, offset) - 1
+    srcPath, srcOffset, lineStarts = segInfos[i]
+    return srcPath, bisect.bisect_right( lineStarts, srcOffset + offset - segStarts[i])
+
+
+#### read the eng or wag file and resolve includes; raises OSError if a file cannot be read
+def readTrainsetFile(filePath, refDir) :
+    return readSourceFile( filePath, refDir, True)[0]
+
+
+### get value for a token; exclude quotes
+### is incorrect for nested tokens; stops at the closing parenthesis of a nested token
+def getValue( token, txt) :
+    value = ''
+    start = 0 ; end = 0
+    startPat = token + '\\s*\\(\\s*.' ; endPat = '\\s*\\)'
+    m = re.search(startPat, txt, flags=re.IGNORECASE)  # find opening parenthesis
+    if m :
+        start = m.end() - 1
+        if txt[start] == '"' :
+            start += 1
+            endPat = '"\\s*\\)'
+        m = re.search(endPat, txt[start:], flags=re.IGNORECASE)  # find closing parenthesis
+        if m :
+            end = start + m.start()
+            value = txt[start:end]
+    return value
+
+
+### get the columns of ORTS-RollingStockScanner of an engine or wagon file, read with its includes (or read ahead, see
+### ortsReadAhead); None if the file is not below a TRAINS folder, or cannot be read (both are passed to warn)
+def getRollingStockValues( path, isEngine, warn, verbose=0, textFuture=None) :
+    packageName = getContentDir( path)
+    if not packageName :
+        warn( "ignoring {}, could not find package name".format(path))
+        return None  # do not process files outside the TRAINS directory
+    values = {'Package': packageName, 'Directory': path.parent.name, 'File': path.name}
+    try :
+        text = textFuture.result() if textFuture else readTrainsetFile( path, path.parent)
+    except OSError as e :
+        warn( "Unable to read {} or its includes: {}".format(path, e))
+        return None
+    processFile( values, text, path, isEngine, warn, verbose)
+    return values
+
+
+### parse eng or wag file and collect relevant data
+### warn is called with the warning message parts (like print), verbose enables the info messages
+def processFile(values, txt, filePath, isEngine, warn, verbose=0) :
+
+    # separate the wagon and engin parts; assumes that wagon is always first
+    wagTxt = txt ; engTxt = ""
+    if isEngine :
+        m = re.search('Engine\\s*\\(\\s*', txt, flags=re.IGNORECASE)
+        if m :
+            engOffset = m.start() ; engTxt = txt[engOffset:] ; wagTxt = txt[:engOffset]
+        else :
+            warn("Unable to find engine section in", filePath)
+
+    fileSize = ortsArchive.getSize( filePath)
+    values['FileSize'] = str(fileSize)
+
+    # get wagon name, engine name; nested token, cannot use getValue()
+    name = 'Name' ; values[name] = '_'
+    m = re.search('Wagon\\s*\\(\\s*"?(\\w+)"?', txt, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+    elif not isEngine :
+        warn("Unable to find wagon name in", filePath)
+    if isEngine :
+        m = re.search('Engine\\s*\\(\\s*"?(\\w+)"?', txt, flags=re.IGNORECASE)
+        if m is None or m.lastindex < 1 :
+            warn("Unable to find engine name in", filePath)
+        elif not values[name] :
+            values[name] = m.group(1)
+            warn("Unable to find wagon name (using engine name) in", filePath)
+        elif values[name] != m.group(1) :
+            warn("Wagon name ({}) does not match engine name ({}) in {}".format(values[name], m.group(1), filePath))
+
+    # display name, may contain spaces, may be quoted; either in wagon or engine section
+    name = 'DispName' ; values[name] = '_'
+    val = getValue('Name', txt)
+    if val : values[name] = val.strip()
+    else :
+        values[name] = values['Name'] + ' (dflt)'  # default to name in Engine or Wagon token
+        if verbose > 0 : print("Info: Unable to find wagon or engine display name in", filePath, file=sys.stderr)
+
+    # wagon type (engine, freight, passenger, etc)
+    name = 'Type' ; values[name] = '_'
+    val = getValue('Type', wagTxt)
+    m = re.search('\\s*(\\w+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+    else :
+        warn("Unable to find wagon type in", filePath)
+
+    # engine type (diesel, electric, steam, etc)
+    name = 'SubType' ; values[name] = '_'
+    if isEngine :
+        val = getValue('Type', engTxt)
+        m = re.search('\\s*(\\w+)\\s*', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 1 : values[name] = m.group(1)
+        else :
+            warn("Unable to find engine type in", filePath)
+
+    # engine max velocity
+    name = 'MaxSpeed' ; values[name] = '_'
+    if isEngine :
+        val = getValue('MaxVelocity', engTxt)
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 1 : values[name]  = m.group(1)
+        else :
+            warn("Unable to find engine max velocity in", filePath)
+
+    # engine max power
+    name = 'MaxPower' ; values[name] = '_'
+    if isEngine :
+        val = getValue('MaximalPower', engTxt)
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 1 : values[name] = "OR " + m.group(1)
+        else :
+            val = getValue('MaxPower', engTxt)
+            m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+            if m and m.lastindex >= 1 : values[name] = m.group(1)
+            else :
+                warn("Unable to find engine max power in", filePath)
+
+    # engine max force
+    name = 'MaxForce' ; values[name] = '_'
+    if isEngine :
+        val = getValue('MaxForce', engTxt)
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 1 : values[name] = m.group(1)
+        else :
+            warn("Unable to find engine max force in", filePath)
+
+    # max brake force
+    name = 'MaxBrakeForce' ; values[name] = '_'
+    val = getValue('MaxBrakeForce', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+    else :
+        warn("Unable to find wagon max brake force in", filePath)
+
+    # weight
+    name = 'Weight' ; values[name] = '_'
+    val = getValue( 'Mass', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*^()]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+    else :
+        warn("Unable to find wagon weight in", filePath)
+
+    # length, third value
+    name = 'Length' ; values[name] = '_'
+    val = getValue( 'Size', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 3 : values[name] = m.group(3)
+    else :
+        warn("Unable to find wagon size in", filePath)
+
+    # number of wheels or axles (OR), wagon and engine; has ORTS variants
+    name = 'Wheels/Axles' ; values[name] = '_'
+    val = getValue( 'ORTSNumberAxles', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 :
+        values[name] = "OR " + m.group(1)
+        if isEngine:
+            val = getValue('ORTSNumberDriveAxles', engTxt)
+            m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+            if m and m.lastindex >= 1 : values[name] += " | " + m.group(1)
+            else :
+                warn("Unable to find engine ORTS number of wheels in", filePath)
+    else :
+        val = getValue('NumWheels', wagTxt)
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 1 :
+            values[name] = m.group(1)
+            if isEngine:
+                val = getValue('NumWheels', engTxt)
+                m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+                if m and m.lastindex >= 1: values[name] += " | " + m.group(1)
+                else :
+                    warn("Unable to find engine number of wheels in", filePath)
+        else :
+            warn("Unable to find wagon number of wheels in", filePath)
+
+    # coupler strength, may occur twice, use second value of each occurrence
+    name = 'CouplerStrength' ; values[name] = '_'
+    first = re.search( 'Coupling\\s*\\(', wagTxt, flags=re.IGNORECASE)
+    if not first :
+        warn("Unable to find wagon coupler section in", filePath)
+    else :
+        val = getValue('Break', wagTxt[first.start():])
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+        if not m or m.lastindex < 2 :
+            warn("Unable to find wagon coupler strength in", filePath)
+        else :
+            values[name] = m.group(2)
+            # look for optional second section
+            second = re.search( 'Coupling\\s*\\(', wagTxt[first.end():], flags=re.IGNORECASE)
+            if not second :
+                if verbose > 0 : print("Info: no second coupler section in", filePath, file=sys.stderr)
+            else :
+                val = getValue('Break', wagTxt[second.start():])  # search for second block
+                m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+                if not m or m.lastindex < 2 :
+                    warn("Unable to find wagon second coupler strength in", filePath)
+                else :
+                    values[name] += " | " + m.group(2)
+
+    # friction, using the first 5 values only; has ORTS variant
+    name = 'Friction' ; values[name] = '_'
+    val = getValue( 'ORTSDavis_A', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 :
+        values[name] = "OR " + m.group(1)
+        val = getValue('ORTSDavis_B', wagTxt)
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 1:
+            values[name] += " | " + m.group(1)
+            val = getValue('ORTSDavis_C', wagTxt)
+            m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+            if m and m.lastindex >= 1:
+                values[name] += " | " + m.group(1)
+    else :
+        val = getValue('Friction', wagTxt)
+        m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+', val, flags=re.IGNORECASE)
+        if m and m.lastindex >= 5 :
+            values[name] = m.group(1) + " | " + m.group(2) + " | " + m.group(3) + " | " + m.group(4) + " | " + m.group(5)
+        else :
+            warn("Unable to find wagon friction values in", filePath)
+
+    # adhesion, 3 values; has ORTS variant; is in wagon section, but only used for engines
+    name = 'Adhesion' ; values[name] = '_'
+    val = getValue( 'ORTSCurtius_Kniffler', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 4 :
+        values[name] = "OR " + m.group(1) + " | " + m.group(2) + " | " + m.group(3) + " | " + m.group(4)
+    else :
+        val2 = getValue('Adheasion', wagTxt)
+        m2 = re.search('\\s*([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+([-+0-9.,a-z/*"]+)\\s+', val2, flags=re.IGNORECASE)
+        if m2 and m2.lastindex >= 3 : values[name] = m2.group(1) + " | " + m2.group(2) + " | " + m2.group(3)
+        elif isEngine :
+            warn("Unable to find wagon adhesion values in", filePath)
+
+    # derail rail force
+    name = "DerailRailForce" ; values[name] = '_'
+    val = getValue('DerailRailForce', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*^()]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+    else :
+        warn("Unable to find wagon derail rail force in", filePath)
+
+    # derail buffer force
+    name = 'DerailBufferForce' ; values[name] = '_'
+    val = getValue('DerailBufferForce', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z/*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+    else :
+        warn("Unable to find wagon derail buffer force in", filePath)
+
+    # length including couplers ORTS only
+    name = 'TotalLength' ; values[name] = '_'
+    val = getValue('ORTSLengthCouplerFace', wagTxt)
+    m = re.search('\\s*([-+0-9.,a-z /*"]+)\\s*', val, flags=re.IGNORECASE)
+    if m and m.lastindex >= 1 : values[name] = m.group(1)
+
+    return
+
+
+### units of the quantities in eng and wag files, as factors to t, m, kW and kN; a number without unit is in SI units
+massUnits = {'': 0.001, 'kg': 0.001, 't': 1.0, 't-uk': 1.016047, 't-us': 0.907185, 'lb': 0.000453592, 'lbs': 0.000453592}
+lengthUnits = {'': 1.0, 'm': 1.0, 'cm': 0.01, 'mm': 0.001, 'km': 1000.0, 'ft': 0.3048, 'in': 0.0254}
+powerUnits = {'': 0.001, 'w': 0.001, 'kw': 1.0, 'mw': 1000.0, 'hp': 0.7457}
+forceUnits = {'': 0.001, 'n': 0.001, 'kn': 1.0, 'lbf': 0.004448222, 'klbf': 4.448222}
+
+quantityRe = re.compile( '\\s*(?:OR\\s+)?([-+]?[0-9]*\\.?[0-9]+(?:e[-+]?[0-9]+)?)\\s*([a-z-]*)\\s*', flags=re.IGNORECASE)
+
+
+### get the value of a quantity (eg. the Weight column "187t") in the unit of the table; None if it is not a
+### number with a known unit. With several values (eg. "OR 5e7N | 6e7N"), the smallest.
+def getQuantity( value, units) :
+    quantities = []
+    for part in value.split('|') :
+        m = quantityRe.fullmatch( part)
+        if not m or m.group(2).casefold() not in units :
+            return None
+        quantities.append( float(m.group(1)) * units[m.group(2).casefold()])
+    return min( quantities)
+
+
+### tokens of the text format of consist, service and other files: quoted strings, parentheses, words
+### a backslash is not an escape character (eg. "Dir\" is the folder Dir\)
+tokenRe = re.compile( '"([^"]*)"|([()])|([^\\s()"]+)')
+
+
+### a block of the text format: name ( values and blocks ); pos is the offset of its name (or parenthesis) in the text
+class Block :
+    __slots__ = ('name', 'items', 'pos')
+
+    def __init__( self, name, pos=0) :
+        self.name = name ; self.items = [] ; self.pos = pos
+
+    def values( self) :
+        return [item for item in self.items if isinstance( item, str)]
+
+    def blocks( self) :
+        return [item for item in self.items if isinstance( item, Block)]
+
+    ### the first sub-block with the name (case insensitive), None if there is none
+    def block( self, name) :
+        return next( (item for item in self.items if isinstance( item, Block) and item.name.casefold() == name), None)
+
+
+### parse the text of a config file (eng, wag, con, srv, etc.) into blocks, in one pass
+### comment blocks (comment, skip, _xxx) are dropped; quoted strings joined with + are concatenated
+def parseText( text) :
+    root = Block( '') ; stack = [root] ; starts = [0] ; concat = False  # starts: offset of the last value of each block
+    for m in tokenRe.finditer( text) :
+        string, paren, word = m.groups()
+        top = stack[-1]
+        if paren == '(' :
+            if top.items and isinstance( top.items[-1], str) : block = Block( top.items.pop(), starts[-1])
+            else : block = Block( '', m.start())
+            top.items.append( block) ; stack.append( block) ; starts.append( m.start())
+        elif paren == ')' :
+            if len(stack) > 1 :
+                block = stack.pop() ; starts.pop()
+                if block.name.casefold() in ('comment', 'skip') or block.name.startswith( '_') :
+                    stack[-1].items.pop()
+        elif string is not None :
+            if concat and top.items and isinstance( top.items[-1], str) : top.items[-1] += string
+            else : top.items.append( string) ; starts[-1] = m.start()
+            concat = False
+        elif word == '+' :
+            concat = True
+        else :
+            top.items.append( word) ; starts[-1] = m.start()
+    return root
+
+
+### get the casefolded names of the blocks in the text of a config file
+def getBlockNames( text) :
+    names = set() ; stack = [parseText( text)]
+    while stack :
+        for block in stack.pop().blocks() :
+            names.add( block.name.casefold()) ; stack.append( block)
+    names.discard( '')
+    return names
+
+
+### an engine or wagon of a consist; kind is Engine or Wagon, uid is None if not specified
+ConsistEntry = collections.namedtuple( 'ConsistEntry', 'kind uid flip fileName dirName')
+
+
+### parse a consist file; returns the name (TrainCfg) and the engines and wagons (ConsistEntry), in train order
+### names may be quoted (with spaces or parentheses), and the entries may span several lines
+def parseConsist( consistText) :
+    root = parseText( consistText)
+    train = root.block( 'train') or root
+    trainCfg = train.block( 'traincfg')
+    if not trainCfg :
+        return None, []
+    values = trainCfg.values()
+    entries = []
+    for block in trainCfg.items :
+        if not isinstance( block, Block) or block.name.casefold() not in ('engine', 'wagon') : continue
+        kind = 'Engine' if block.name.casefold() == 'engine' else 'Wagon'
+        data = block.block( kind.casefold() + 'data')
+        names = data.values() if data else []
+        uidBlock = block.block( 'uid')
+        uid = uidBlock.values()[0] if uidBlock and uidBlock.values() else None
+        entries.append( ConsistEntry( kind, int(uid) if uid and uid.isdigit() else None, block.block( 'flip') is not None,
+                                      names[0] if len(names) > 0 else None, names[1] if len(names) > 1 else None))
+    return values[0] if values else None, entries
+
+
+### get the name of the consist (without .con) that a service uses; None if not found
+def getServiceConsistName( serviceText) :
+    root = parseText( serviceText)
+    service = root.block( 'service_definition') or root
+    trainConfig = service.block( 'train_config')
+    values = trainConfig.values() if trainConfig else []
+    return values[0].strip() if values and values[0].strip() else None
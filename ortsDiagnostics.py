@@ -0,0 +1,152 @@
+# ortsDiagnostics - buffered warnings with stable codes, counted per code and per package
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used (--warnings, --warnings-jsonl) by ORTS-RollingStockScanner, ORTS-ListRollingStockUsed and ORTS-CopyTrains.
+#
+# Notes:
+# - The tools (and ortsContent, ortsCatalog, ortsTools) report warnings as text, with a warn(*args) callback.
+#   The code of a warning (eg. missing-coupler) is found from its text with the patterns of warningCodes; so the
+#   warnings kept in the catalog, or in the partial results of --shard, get the same codes. Other texts are "other".
+# - The package of a warning is the content folder of the file it is about: the first path in the arguments, else the
+#   path set with setPath() (eg. the file being processed).
+# - The warnings are written to stderr in blocks of lines (mode "all"), or not at all (mode "summary"). The summary
+#   (printSummary) has the number of warnings per code and per package. With a JSONL file, each warning is also
+#   written as one JSON object: level, code, package, file, message.
+#
+
+import collections
+import json
+import pathlib
+import re
+import sys
+
+from ortsContent import getContentDir
+
+# the codes of the warnings, and the pattern of their text; the first match wins
+warningCodes = [
+    ('missing-engine-section', 'Unable to find engine section'),
+    ('wagon-name-from-engine', 'Unable to find wagon name \\(using engine name\\)'),
+    ('missing-wagon-name', 'Unable to find wagon name'),
+    ('missing-engine-name', 'Unable to find engine name'),
+    ('name-mismatch', 'Wagon name .* does not match engine name'),
+    ('missing-wagon-type', 'Unable to find wagon type'),
+    ('missing-engine-type', 'Unable to find engine type'),
+    ('missing-max-speed', 'Unable to find engine max velocity'),
+    ('missing-max-power', 'Unable to find engine max power'),
+    ('missing-max-force', 'Unable to find engine max force'),
+    ('missing-brake-force', 'Unable to find wagon max brake force'),
+    ('missing-weight', 'Unable to find wagon weight'),
+    ('missing-size', 'Unable to find wagon size'),
+    ('missing-orts-wheels', 'Unable to find engine ORTS number of wheels'),
+    ('missing-engine-wheels', 'Unable to find engine number of wheels'),
+    ('missing-wheels', 'Unable to find wagon number of wheels'),
+    ('missing-coupler', 'Unable to find wagon coupler section'),
+    ('missing-second-coupler-strength', 'Unable to find wagon second coupler strength'),
+    ('missing-coupler-strength', 'Unable to find wagon coupler strength'),
+    ('missing-friction', 'Unable to find wagon friction'),
+    ('missing-adhesion', 'Unable to find wagon adhesion'),
+    ('missing-derail-rail-force', 'Unable to find wagon derail rail force'),
+    ('missing-derail-buffer-force', 'Unable to find wagon derail buffer force'),
+    ('no-package', 'could not find package name'),
+    ('unreadable-include', 'Unable to read include file'),
+    ('unreadable-file', 'Unable to read'),
+    ('no-consist-name', 'Unable to find consist name|No train config found'),
+    ('empty-consist', 'No engines or wagons found in consist'),
+    ('unparsed-entry', '(Failed|Unable) to parse \\w*Data'),
+    ('missing-folder', 'folder does not exist|Unable to find root path'),
+    ('missing-consist', '^Consist( file)? .*does not exist'),
+    ('missing-engine', '^Engine file does not exist'),
+    ('missing-wagon', '^Wagon file does not exist'),
+    ('missing-trainset', '^Trainset .* does not exist'),
+]
+warningCodeRes = [(code, re.compile( pattern, flags=re.IGNORECASE)) for code, pattern in warningCodes]
+
+
+### get the code of a warning from its text
+def getCode( message) :
+    return next( (code for code, codeRe in warningCodeRes if codeRe.search( message)), 'other')
+
+
+### get the package of a path: the content folder above TRAINS, or above ROUTES; None if neither
+def getPackage( path) :
+    if path is None :
+        return None
+    package = getContentDir( path)
+    if package is None :
+        absPath = pathlib.Path( path).resolve()
+        package = next( (p.parent.name for p in [absPath] + list( absPath.parents) if p.name.casefold() == 'routes'), None)
+    return package
+
+
+### the warnings of a run: counted per code and per package, written in blocks (or only counted), optionally to JSONL
+class Diagnostics :
+    def __init__( self, mode='all', jsonlPath=None, out=sys.stderr, blockLines=1000) :
+        self.mode = mode ; self.out = out ; self.blockLines = blockLines
+        self.jsonl = open( jsonlPath, 'w', encoding='utf-8') if jsonlPath else None
+        self.numWarn = 0
+        self.codeCounts = collections.Counter()  # code -> number of warnings
+        self.packageCounts = collections.Counter()  # (package, code) -> number of warnings
+        self.lines = []  # not written yet
+        self.path = None
+        self.packages = {}  # key is the folder of a file, value is the package
+
+    ### set the path that the following warnings are about, if they have no path (eg. the file being processed)
+    def setPath( self, path) :
+        self.path = path
+
+    ### a warning, as passed to a warn(*args) callback
+    def warn( self, *args) :
+        message = ' '.join( str(arg) for arg in args)
+        path = next( (arg for arg in args if isinstance( arg, pathlib.PurePath)), None) or self.path
+        self.add( getCode( message), message, path)
+
+    ### a warning (or error) with a code
+    def add( self, code, message, path=None, level='Warning') :
+        path = path or self.path
+        folder = str(path.parent) if path else None
+        if folder not in self.packages :
+            self.packages[folder] = getPackage( path)
+        package = self.packages[folder]
+        self.numWarn += 1
+        self.codeCounts[code] += 1
+        self.packageCounts[(package, code)] += 1
+        if self.mode == 'all' :
+            self.lines.append( '{}: {}\n'.format(level, message))
+            if len(self.lines) >= self.blockLines :
+                self.flush()
+        if self.jsonl :
+            self.jsonl.write( json.dumps( {'level': level, 'code': code, 'package': package,
+                                           'file': str(path) if path else None, 'message': message}, ensure_ascii=False) + '\n')
+
+    ### write the warnings not written yet
+    def flush( self) :
+        if self.lines :
+            self.out.write( ''.join( self.lines))
+            self.lines.clear()
+            self.out.flush()
+
+    ### print the number of warnings per code, and per package (with its most frequent codes)
+    def printSummary( self) :
+        self.flush()
+        if not self.numWarn :
+            return
+        packages = collections.Counter() ; packageCodes = collections.defaultdict( collections.Counter)
+        for (package, code), count in self.packageCounts.items() :
+            packages[package] += count ; packageCodes[package][code] += count
+        print( 'Warnings per code:', file=self.out)
+        for code, count in self.codeCounts.most_common() :
+            numPackages = sum( 1 for package, c in self.packageCounts if c == code)
+            print( '  {:32} {:8} in {} packages'.format(code, count, numPackages), file=self.out)
+        print( 'Warnings per package:', file=self.out)
+        for package, count in packages.most_common() :
+            print( '  {:32} {:8}  {}'.format(package or '_', count, ', '.join( '{} {}'.format(code, n)
+                   for code, n in packageCodes[package].most_common( 3))), file=self.out)
+        self.out.flush()
+
+    ### write the warnings not written yet, and close the JSONL file
+    def close( self) :
+        self.flush()
+        if self.jsonl :
+            self.jsonl.close()
+            self.jsonl = None
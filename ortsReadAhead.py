@@ -0,0 +1,87 @@
+# ortsReadAhead - read the next files in the background while the current one is processed
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used (--read-ahead) by ORTS-RollingStockScanner, and by ortsTools (ORTS-ListRollingStockUsed, ORTS-FindConfigParam, ORTS-Tools).
+#
+# Notes:
+# - On a network share (SMB, NFS), reading a file is mostly waiting. A small pool of threads reads the next
+#   files (up to depth files ahead) while the script parses the current one. The files are still processed one at
+#   a time, in the same order; only the reading overlaps.
+# - The read function runs in the worker threads, eg. reading a file with its includes. Its exceptions are
+#   raised by future.result() in the script, when it gets to that file; so the behavior is the same as without
+#   read-ahead.
+# - Memory is capped: a file is only read when the size (st_size, or the uncompressed size in a zip archive) of the
+#   files read ahead, but not processed yet, stays below maxBytes. The next file to be processed is always read, even when it is larger than the cap.
+#
+
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ortsArchive
+
+defaultDepth = 8
+defaultWorkers = 4
+defaultMaxBytes = 64 * 1024 * 1024
+
+
+### read ahead the files (paths) with the read function; yields (path, future) in the same order as the paths,
+### future.result() is the result of read(path). With depth 0 the files are read when they are processed.
+def readAhead( paths, read, depth=defaultDepth, workers=defaultWorkers, maxBytes=defaultMaxBytes) :
+    if depth <= 0 :
+        for path in paths :
+            yield path, ReadNow( read, path)
+        return
+
+    cond = threading.Condition()
+    state = {'used': 0, 'next': 0, 'closed': False}
+    sizes = {}  # index -> size of the file, while it is read ahead
+
+    def readFile( index, path) :
+        try :
+            size = ortsArchive.getSize( path)
+        except OSError :
+            size = 0  # the read function reports the error
+        with cond :
+            cond.wait_for( lambda : state['used'] + size <= maxBytes or index <= state['next'] or state['closed'])
+            if state['closed'] : return None
+            state['used'] += size ; sizes[index] = size
+        return read( path)
+
+    # the size is released when the file is read and processed; the file may not be read yet, eg. when the script
+    # skips it without future.result()
+    def release( index) :
+        with cond :
+            state['used'] -= sizes.pop( index, 0) ; cond.notify_all()
+
+    executor = ThreadPoolExecutor( max_workers=min( workers, depth))
+    pending = collections.deque()
+    paths = iter( paths)
+    index = 0
+    try :
+        while True :
+            while len(pending) < depth :
+                path = next( paths, None)
+                if path is None : break
+                pending.append( (index, path, executor.submit( readFile, index, path)))
+                index += 1
+            if not pending : break
+            i, path, future = pending.popleft()
+            with cond :
+                state['next'] = i ; cond.notify_all()
+            yield path, future
+            future.add_done_callback( lambda f, i=i : release( i))
+    finally :
+        with cond :
+            state['closed'] = True ; cond.notify_all()
+        executor.shutdown( wait=False, cancel_futures=True)
+
+
+### the result of reading a file without read-ahead, with the same interface as a future
+class ReadNow :
+    def __init__( self, read, path) :
+        self.read = read ; self.path = path
+
+    def result( self) :
+        return self.read( self.path)
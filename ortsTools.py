@@ -0,0 +1,978 @@
+# ortsTools - the operations of the content tools as functions: scan, list-used, copy, find, expand, validate,
+# footprint and outliers
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used by ORTS-Tools (all the operations as sub-commands of one script), ORTS-RollingStockScanner,
+# ORTS-ListRollingStockUsed, ORTS-CopyTrains, ORTS-FindConfigParam, ORTS-ShowRollingStockFile, ORTS-DiffRollingStock,
+# ORTS-ValidateContent, ORTS-AssetFootprint and ORTS-PhysicsOutliers.
+#
+# Notes:
+# - The operations return iterators of rows (named tuples) instead of printing them, so that they can be called
+#   from Python, eg. by a batch job. Warnings are passed to the warn function (like ortsContent.processFile),
+#   by default printed to stderr. The counts (files read, rows by type) are added to the stats (a Counter), if given.
+# - The caches last as long as the process: the include files read (ortsContent.includeCache), and the catalogs
+#   opened and updated (getCatalog). Several operations in one process read a shared include file once, and open a
+#   catalog once.
+# - With a catalog (see ortsCatalog), the operations use it instead of reading the files.
+#
+
+import bisect
+import collections
+import fnmatch
+import json
+import math
+import mmap
+import operator
+import os
+import pathlib
+import re
+import shutil
+import statistics
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import ortsArchive
+import ortsReadAhead
+from ortsContent import (Block, getContentDir, getIncludePaths, readFile, readTrainsetFile, readSourceFile, expandText,
+                         getSourceLine, includeCache, getRollingStockValues, getServiceConsistName, parseConsist, parseText,
+                         getQuantity, massUnits, lengthUnits, powerUnits, forceUnits)
+
+catalogs = {}  # key is the catalog path, value is the catalog
+
+ScanRow = collections.namedtuple( 'ScanRow', 'path isEngine values')
+UsedRow = collections.namedtuple( 'UsedRow', 'type contentDir dirName fileName path')
+CopyRow = collections.namedtuple( 'CopyRow', 'type name source destination status reference contentPath')
+FindRow = collections.namedtuple( 'FindRow', 'path source line value query blockPath')
+
+
+### print a warning
+def printWarning( *args) :
+    print( "Warning:", *args, file=sys.stderr)
+
+
+### open a catalog (see ortsCatalog) once per process; it is updated for the folder each time it is used, unless
+### it was walked less than maxAge seconds ago
+### raises ortsCatalog.CatalogError if it cannot be opened, or the folder is not below its content root
+def getCatalog( catalogPath, dirPath, verbose=0, maxAge=None) :
+    catalog = catalogs.get( str(catalogPath))
+    if catalog is None :
+        import ortsCatalog
+        catalog = catalogs[str(catalogPath)] = ortsCatalog.openFreshCatalog( catalogPath, dirPath, verbose, maxAge)
+    else :
+        catalog.update( dirPath, verbose=verbose, maxAge=maxAge)
+    return catalog
+
+
+### list the files with the extension in (or below) a folder, from the catalog or the folder tree (and its zip archives)
+def listFiles( folderPath, ext, catalog=None) :
+    if catalog :
+        return catalog.listFiles( folderPath, ext)
+    return ortsArchive.rglob( folderPath, '*' + ext)
+
+
+### get the actual path of a file, None if it does not exist; from the catalog or the folder tree (or a zip archive)
+def getFile( filePath, catalog=None) :
+    if catalog :
+        return catalog.getFile( filePath)
+    return filePath if ortsArchive.isFile( filePath) else None
+
+
+### expand: the text of an eng or wag file with the includes resolved; raises OSError if a file cannot be read
+def expandFile( filePath) :
+    return readTrainsetFile( filePath, filePath.parent)
+
+
+### is an engine or wagon file selected by the filter: "eng", "wag", or a regex for the file name; default.wag is not
+def isRollingStockSelected( path, filter=None) :
+    ext = path.suffix.casefold()
+    if ext not in ('.eng', '.wag') or filter == 'eng' and ext != '.eng' or filter == 'wag' and ext != '.wag' :
+        return False
+    if filter not in (None, 'eng', 'wag') and not re.search( filter, path.name, flags=re.IGNORECASE) :
+        return False
+    return path.name != 'default.wag'
+
+
+### the engine and wagon files in (or below) a folder selected by the filter, engines first; from the catalog, or the
+### folder tree and its zip archives
+def listRollingStock( dirPath, filter=None, catalog=None) :
+    for ext in ['.eng', '.wag'] :
+        if filter in ('eng', 'wag') and ext != '.' + filter : continue
+        paths = listFiles( dirPath, ext, catalog)
+        if not catalog : paths = sorted( paths, key=getPathKey)
+        yield from (path for path in paths if isRollingStockSelected( path, filter))
+
+
+### the sort key of a path: casefolded, with "/" separators; the order of the files in the catalog
+def getPathKey( path) :
+    return str(path).replace( '\\', '/').casefold()
+
+
+### get the values of an engine or wagon file (see ortsContent.getRollingStockValues); from the catalog if given
+def getRollingStock( path, isEngine, catalog=None, warn=printWarning, verbose=0, textFuture=None) :
+    if catalog :
+        values, warnings = catalog.getRollingStock( path)
+        for message in warnings :
+            warn( message)
+        return values
+    return getRollingStockValues( path, isEngine, warn, verbose, textFuture)
+
+
+### scan: the attributes of the engines and wagons in (or below) a folder, engines first; yields ScanRow
+### the values are the columns of ORTS-RollingStockScanner. The filter is "eng", "wag", or a regex for the file name.
+def scanRollingStock( dirPath, filter=None, catalog=None, warn=printWarning, stats=None,
+                      readAhead=ortsReadAhead.defaultDepth, readAheadBytes=ortsReadAhead.defaultMaxBytes, verbose=0) :
+    stats = collections.Counter() if stats is None else stats
+    for path, textFuture in ortsReadAhead.readAhead( listRollingStock( dirPath, filter, catalog), expandFile,
+                                                     0 if catalog else readAhead, maxBytes=readAheadBytes) :
+        isEngine = path.suffix.casefold() == '.eng'
+        if verbose > 1 : print( "...processing engine " if isEngine else "...processing wagon ", path, file=sys.stderr)
+        stats['Engine' if isEngine else 'Wagon'] += 1
+        values = getRollingStock( path, isEngine, catalog, warn, verbose, textFuture)
+        if values : yield ScanRow( path, isEngine, values)
+
+
+### get the root path (where ROUTES and TRAINS resides)
+def getRootPath( filePath) :
+    absPath = filePath.resolve()
+    if (absPath / 'ROUTES').is_dir() :
+        return absPath
+    elif absPath.name.casefold() == 'ROUTES'.casefold() :
+        return absPath.parent
+    else :
+        for i in range(len(absPath.parents)) :
+            if absPath.parents[i].name.casefold() == 'ROUTES'.casefold() :
+                return absPath.parents[i+1]
+    return None
+
+
+### get the root path, content dir, and route dir
+def getContextDirs( filePath) :
+    absPath = filePath.resolve()
+    for i in range(len(absPath.parents)) :
+        if absPath.parents[i].name.casefold() == 'ROUTES'.casefold() and i + 1 < len(absPath.parents) :
+            return absPath.parents[i+1], absPath.parents[i+1].name, absPath.parents[i-1].name
+    return None
+
+
+### get the root path of a service (where ROUTES and TRAINS reside), None if the service is not in a route
+def getServiceRootPath( servicePath) :
+    contextDirs = getContextDirs( servicePath)
+    return contextDirs[0] if contextDirs else None
+
+
+### list-used: the consists, engines and wagons used by the services in (or below) a folder, optionally also the ones
+### not used (types unused-Consist, unused-Engine, unused-Wagon); yields UsedRow. The filter is "eng" or "wag".
+### the stats count the rows by type, and the services
+def listRollingStockUsed( dirPath, filter=None, includeNotUsed=False, catalog=None, warn=printWarning, stats=None,
+                          readAhead=ortsReadAhead.defaultDepth, readAheadBytes=ortsReadAhead.defaultMaxBytes, verbose=0) :
+    stats = collections.Counter() if stats is None else stats
+    doEng = doWag = True
+    if not includeNotUsed and filter == 'wag' : doEng = False
+    elif not includeNotUsed and filter == 'eng' : doWag = False
+    processed = set()  # the consists, engines and wagons already listed
+
+    def row( type, contentDir, dirName, fileName, path) :
+        stats[type] += 1
+        return UsedRow( type, contentDir, dirName, fileName, path)
+
+    # for each service file; the service files are read ahead
+    for servicePath, serviceFuture in ortsReadAhead.readAhead( listFiles( dirPath, '.srv', catalog), readFile,
+                                                               0 if catalog else readAhead, maxBytes=readAheadBytes) :
+        if verbose > 0 : print( 'Info: service', servicePath, file=sys.stderr)
+
+        # find reference to consist file
+        if catalog :
+            consistFileName = catalog.getServiceConsistName( servicePath)
+        else :
+            consistFileName = getServiceConsistName( serviceFuture.result())
+        if not consistFileName :
+            warn( "Unable to find consist name in", servicePath)
+            continue
+        stats['services'] += 1
+
+        rootPath, contentDir, routeDir = getContextDirs( servicePath)
+        consistPath = rootPath / 'TRAINS' / 'CONSISTS' / (consistFileName + '.con')
+        consistPath = getFile( consistPath, catalog) or consistPath
+
+        # skip already processed consist
+        if str(consistPath) in processed :
+            continue
+        if verbose > 0 : print( 'Info: unique consist', consistPath, file=sys.stderr)
+
+        if not getFile( consistPath, catalog) :
+            warn( f'Consist file does not exist: service {servicePath}; consist {consistPath}')
+            continue
+
+        yield row( 'Consist', contentDir, '', consistFileName + '.con', consistPath)
+        processed.add( str(consistPath))
+
+        entries = catalog.getConsist( consistPath) if catalog else parseConsist( readFile( consistPath))[1]
+        if not entries :
+            warn( "No engines or wagons found in consist", consistPath)
+            continue
+
+        # engines first, then wagons
+        for entry in [entry for entry in entries if entry.kind == 'Engine'] + [entry for entry in entries if entry.kind == 'Wagon'] :
+            isEngine = entry.kind == 'Engine'
+            if not (doEng if isEngine else doWag) :
+                continue
+            if not entry.fileName or not entry.dirName :
+                warn( f'Failed to parse {entry.kind}Data value for consist {consistPath}: UiD {entry.uid}')
+                continue
+            fileName = entry.fileName + ('.eng' if isEngine else '.wag')
+            vehiclePath = rootPath / 'TRAINS' / 'TRAINSET' / entry.dirName / fileName
+            vehiclePath = getFile( vehiclePath, catalog) or vehiclePath
+            if str(vehiclePath) in processed :
+                continue
+            if verbose > 0 : print( f'Info: unique {entry.kind.lower()}', vehiclePath, file=sys.stderr)
+            if not getFile( vehiclePath, catalog) :
+                warn( f'{entry.kind} file does not exist: consist {consistPath}; {entry.kind.lower()} {vehiclePath}')
+            else :
+                yield row( entry.kind, contentDir, entry.dirName, fileName, vehiclePath)
+                processed.add( str(vehiclePath))
+    # end for each service
+
+    if not includeNotUsed :
+        return
+    rootPath = getRootPath( dirPath)
+    if not rootPath :
+        warn( 'Unable to find root path in', dirPath)
+        return
+
+    # unused consists
+    consistPath = rootPath / 'TRAINS' / 'CONSISTS'
+    if not consistPath.is_dir() :
+        warn( 'Consist folder does not exist:', consistPath)
+    else :
+        for conPath in listFiles( consistPath, '.con', catalog) :
+            if not str(conPath) in processed :
+                yield row( 'unused-Consist', rootPath.name, '', conPath.name, conPath)
+
+    # unused engines and wagons
+    engWagPath = rootPath / 'TRAINS' / 'TRAINSET'
+    if not engWagPath.is_dir() :
+        warn( 'Engine/Waggon folder does not exist:', engWagPath)
+    else :
+        for ext, type in (('.eng', 'unused-Engine'), ('.wag', 'unused-Wagon')) :
+            for path in listFiles( engWagPath, ext, catalog) :
+                if not str(path) in processed :
+                    yield row( type, rootPath.name, path.parent.name, path.name, path)
+
+
+### format a row of list-used as CSV, as ORTS-ListRollingStockUsed
+def formatUsedRow( row) :
+    return f'{row.type},"{row.contentDir}","{row.dirName}","{row.fileName}","{row.path}"'
+
+
+### check the folders of copy: the route Services folder, the Consists and Trainset folders of the content folder of
+### the route (to copy to) and of the content folders (to copy from; one or a list); raises NotADirectoryError
+### returns [toConsists, toTrainset, fromConsists, fromTrainset, ...], the from folders of each content folder
+def getCopyFolders( routePath, contentPaths) :
+    if not routePath.is_dir() :
+        raise NotADirectoryError( '"{}" is not a folder.'.format(routePath))
+    if not (routePath / 'Services').is_dir() :
+        raise NotADirectoryError( '"{}" does not contain a Services folder.'.format(routePath))
+    targetPath = routePath.parent.parent / 'Trains'
+    folders = []
+    for path, sub in ((targetPath, 'Consists'), (targetPath, 'Trainset')) :
+        if not (path / sub).is_dir() :
+            raise NotADirectoryError( 'Content folder of route "{}" does not contain a {} sub-folder ({}).'.format(
+                                      routePath.name, sub, path / sub))
+        folders.append( path / sub)
+    for contentPath in getContentPaths( contentPaths) :
+        if not contentPath.is_dir() :
+            raise NotADirectoryError( '"{}" is not a folder.'.format(contentPath))
+        sourcePath = contentPath / 'Trains'
+        for sub in ('Consists', 'Trainset') :
+            if not (sourcePath / sub).is_dir() :
+                raise NotADirectoryError( 'Content folder "{}" to copy from does not contain a {} sub-folder ({}).'.format(
+                                          contentPath.name, sub, sourcePath / sub))
+            folders.append( sourcePath / sub)
+    return folders
+
+
+### a content folder or a list of them, as a list
+def getContentPaths( contentPaths) :
+    return [contentPaths] if isinstance( contentPaths, pathlib.PurePath) else list( contentPaths)
+
+
+### the consists (files) and trainset folders of content folders, from one listing of the Trains/Consists and
+### Trainset folders of each; the names are looked up case insensitive (as on Windows)
+### with several content folders, the first one (in priority order) that has a consist or trainset folder wins
+class TrainsIndex :
+    def __init__( self, contentPaths) :
+        self.names = {'Consist': {}, 'Trainset': {}}  # type -> casefolded name -> (actual path, content folder)
+        for contentPath in getContentPaths( contentPaths) :
+            for type, sub in (('Consist', 'Consists'), ('Trainset', 'Trainset')) :
+                with os.scandir( contentPath / 'Trains' / sub) as entries :
+                    for entry in entries :
+                        if entry.is_dir() if type == 'Trainset' else entry.name.casefold().endswith( '.con') :
+                            self.add( type, pathlib.Path( entry.path), contentPath)
+
+    ### add a consist or trainset folder, unless there is one with that name
+    def add( self, type, path, contentPath) :
+        self.names[type].setdefault( path.name.casefold(), (path, contentPath))
+
+    ### get (actual path, content folder) of a consist (file name) or trainset folder; (None, None) if not found
+    def get( self, type, name) :
+        return self.names[type].get( name.casefold(), (None, None))
+
+
+### copy: copy the consists and trainset folders needed by the services of a route from content folders (one or a
+### list, in priority order); yields CopyRow, the status is copied, exists (not copied) or missing; the reference is
+### the service or consist that uses it; the content path is the content folder it is copied from
+### the folders are checked first, raises NotADirectoryError if one is missing
+def copyTrains( routePath, contentPaths, catalog=None, warn=printWarning, verbose=0) :
+    getCopyFolders( routePath, contentPaths)
+    return copyTrainsRows( routePath, getContentPaths( contentPaths), catalog, warn, verbose)
+
+
+### the rows of copyTrains(), after the folders are checked
+### the content folders (and the content folder of the route) are listed once, into a TrainsIndex
+def copyTrainsRows( routePath, contentPaths, catalog, warn, verbose) :
+    toContentPath = routePath.parent.parent
+    fromIndex = TrainsIndex( contentPaths)
+    toIndex = TrainsIndex( toContentPath)
+    if verbose > 0 :
+        print( 'Info: found {} Consists and {} Trainset folders in {} content folders to copy from.'.format(
+               len(fromIndex.names['Consist']), len(fromIndex.names['Trainset']), len(contentPaths)), file=sys.stderr)
+
+    servicesDirPath = routePath / 'Services'
+    if catalog and catalog.contains( servicesDirPath) :
+        servicePaths = catalog.listFiles( servicesDirPath, '.srv', recursive=False)
+    else :
+        servicePaths = servicesDirPath.glob( '*.srv')
+
+    ### the row of a consist or trainset folder; copied if it is not yet in the content folder of the route
+    def copy( type, name, reference) :
+        fromPath, contentPath = fromIndex.get( type, name)
+        sub = 'Consists' if type == 'Consist' else 'Trainset'
+        toPath = toContentPath / 'Trains' / sub / name
+        if not fromPath :
+            return CopyRow( type, name, contentPaths[0] / 'Trains' / sub / name, toPath, 'missing', reference, None)
+        if toIndex.get( type, name)[0] :
+            return CopyRow( type, name, fromPath, toPath, 'exists', reference, contentPath)
+        if type == 'Consist' :
+            shutil.copy2( fromPath, toPath)
+        else :
+            shutil.copytree( fromPath, toPath)
+        toIndex.add( type, toPath, toContentPath)
+        return CopyRow( type, name, fromPath, toPath, 'copied', reference, contentPath)
+
+    # for each service in the services folder
+    for serviceFilePath in servicePaths :
+        if verbose > 1 : print( 'Info: processing Service "{}", file "{}".'.format( serviceFilePath.name, serviceFilePath), file=sys.stderr)
+        if catalog and catalog.contains( serviceFilePath) :
+            consistName = catalog.getServiceConsistName( serviceFilePath)
+        else :
+            consistName = getServiceConsistName( readFile( serviceFilePath))
+        if not consistName :
+            warn( 'No train config found in Service "{}".'.format( serviceFilePath))
+            continue
+        consistFileName = consistName + '.con'
+        row = copy( 'Consist', consistFileName, serviceFilePath)
+        yield row
+        if row.status != 'copied' :
+            continue
+
+        # for each wagon or engine in the consist file
+        consistFromPath = row.source
+        if catalog and catalog.contains( consistFromPath) :
+            entries = catalog.getConsist( consistFromPath)
+        else :
+            entries = parseConsist( readFile( consistFromPath))[1]
+        if not entries :
+            warn( 'No Engines or Wagons found in Consist "{}".'.format(consistFromPath))
+            continue
+        for entry in entries :
+            if not entry.dirName :
+                warn( 'Unable to parse {}Data (UiD {}) in Consist "{}".'.format(entry.kind, entry.uid, consistFromPath))
+                continue
+            yield copy( 'Trainset', entry.dirName, consistFileName)
+
+
+### split a block path query like "Engine/Effects/DieselSpecialEffects/Exhaust1" into casefolded names
+### "*" matches any one block, "**" matches any number of nested blocks
+def compileQuery( query) :
+    return [seg.casefold() for seg in query.strip('/').split('/') if seg]
+
+
+### find the blocks matching the query segments below the block; yields (block, path of names)
+def findBlocks( block, segments, path=()) :
+    if not segments :
+        yield block, path
+        return
+    seg = segments[0]
+    if seg == '**' :
+        yield from findBlocks( block, segments[1:], path)
+        for child in block.blocks() :
+            yield from findBlocks( child, segments, path + (child.name,))
+        return
+    for child in block.blocks() :
+        if seg == '*' or child.name.casefold() == seg :
+            yield from findBlocks( child, segments[1:], path + (child.name,))
+
+
+### get the files to search, from the catalog or the folder tree
+### with the catalog, only the files that contain a block with one of the names (if specified) are searched
+def getSearchFiles( dirPath, filePat, names, catalog, expandIncludes) :
+    import ortsCatalog
+    ext = os.path.splitext( filePat)[1].casefold()
+    if not catalog or ext not in ortsCatalog.catalogExtensions or '/' in filePat or '\\' in filePat :
+        if catalog : print( 'Info: "{}" files are not in the catalog, searching the folder.'.format(filePat), file=sys.stderr)
+        yield from ortsArchive.rglob( dirPath, filePat)
+        return
+    keys = None
+    if names :
+        keys = set()
+        for name in names :
+            keys.update( catalog.getFilesWithName( name, expandIncludes))
+    for path in catalog.listFiles( dirPath, ext) :
+        if fnmatch.fnmatch( path.name.casefold(), filePat.casefold()) and (keys is None or catalog.getKey( path) in keys) :
+            yield path
+
+
+### find: the parameters (paramName, near the context regex) or the blocks (queries, block paths) in the config files
+### (filePat) in (or below) a folder; yields FindRow. The query and block path are None for a parameter search.
+### the files are read ahead; the stats count the files searched
+def findConfigParam( dirPath, filePat, paramName=None, context=None, contextRange=200, queries=None, expandIncludes=False,
+                     catalog=None, warn=printWarning, stats=None, readAhead=ortsReadAhead.defaultDepth,
+                     readAheadBytes=ortsReadAhead.defaultMaxBytes, verbose=0) :
+    stats = collections.Counter() if stats is None else stats
+
+    def readSourceFiles( paths) :
+        return ortsReadAhead.readAhead( paths, lambda path : readSourceFile( path, path.parent, expandIncludes, warn),
+                                        readAhead, maxBytes=readAheadBytes)
+
+    if queries :
+        # structure-aware search: parse each file once, evaluate all the queries on the block tree
+        compiledQueries = [(query, compileQuery( query)) for query in queries]
+        # a file can only match if it has the last block name of each query (unless a query has only wildcards)
+        names = [[seg for seg in segments if seg not in ('*', '**')][-1:] for query, segments in compiledQueries]
+        names = None if not all( names) else [nameList[0] for nameList in names]
+        for path, sourceFuture in readSourceFiles( getSearchFiles( dirPath, filePat, names, catalog, expandIncludes)) :
+            if verbose > 0 : print( "...processing config file ", path, file=sys.stderr)
+            stats['files'] += 1
+            txt, sourceMap = sourceFuture.result()
+            root = parseText( txt)
+            for query, segments in compiledQueries :
+                for block, blockPath in findBlocks( root, segments) :
+                    source, line = getSourceLine( sourceMap, block.pos)
+                    yield FindRow( path, source, line, ' '.join(block.values()), query, '/'.join(blockPath))
+        return
+
+    paramRe = re.compile( '\\s(' + paramName + ')\\s*\\(\\s*([^)(]+)[)(]', flags=re.IGNORECASE)
+    contextRe = re.compile( context, flags=re.IGNORECASE)
+
+    # with the catalog, only the files that have the parameter (if it is a literal name) are searched
+    names = [paramName] if re.escape( paramName) == paramName else None
+    for path, sourceFuture in readSourceFiles( getSearchFiles( dirPath, filePat, names, catalog, expandIncludes)) :
+        if verbose > 0 : print( "...processing config file ", path, file=sys.stderr)
+        stats['files'] += 1
+        txt, sourceMap = sourceFuture.result()
+
+        for paramMatch in paramRe.finditer( txt) :
+            if contextRange >= 0 :
+                start = paramMatch.start() - contextRange
+                end = paramMatch.start()
+            else :
+                start = paramMatch.start()
+                end = paramMatch.start() - contextRange
+            if contextRe.search( txt, pos=start, endpos=end) :
+                source, line = getSourceLine( sourceMap, paramMatch.start(1))
+                yield FindRow( path, source, line, paramMatch.group().strip(), None, None)
+
+
+### format a row of find, either as a JSON line or as text (path: value), as ORTS-FindConfigParam
+### the source is the file where the match was found, differs from path if the match is in an include file
+### with lineNumbers, the text has the line after the file (path:line: value); the JSON line always has it
+def formatFindRow( row, jsonOut=False, expandIncludes=False, lineNumbers=False) :
+    if jsonOut :
+        rec = {'file': str(row.path), 'line': row.line}
+        if expandIncludes : rec['source'] = str(row.source)
+        if row.query is not None : rec['query'] = row.query ; rec['path'] = row.blockPath
+        rec['value'] = row.value
+        return json.dumps( rec, ensure_ascii=False)
+    value = row.value
+    if len(value) > 80 : value = value[0:80] + '...'
+    if row.blockPath is not None : value = '{} ( {} )'.format( row.blockPath, value)
+    source = '{}:{}'.format(row.source, row.line) if lineNumbers else str(row.source)
+    if row.source == row.path : return '{}: {}'.format(source, value)
+    return '{} -> {}: {}'.format(row.path, source, value)
+
+
+### a listing of the files and folders below a folder, read once; lookups are case insensitive (as on Windows)
+class FileIndex :
+    def __init__( self, rootPath) :
+        self.rootPath = os.path.abspath( rootPath)
+        self.paths = {}  # key is the casefolded path relative to the root, with "/" separators
+        for dirName, subDirs, fileNames in os.walk( self.rootPath) :
+            for name in subDirs + fileNames :
+                path = os.path.join( dirName, name)
+                self.paths[self.getKey( path)] = pathlib.Path( path)
+
+    def getKey( self, path) :
+        return os.path.relpath( os.path.normpath( os.path.abspath( path)), self.rootPath).replace( '\\', '/').casefold()
+
+    ### the actual path of a file or folder, None if it does not exist
+    def get( self, path) :
+        return self.paths.get( self.getKey( path))
+
+    ### the files with the extension below a folder
+    def listFiles( self, dirPath, ext) :
+        prefix = self.getKey( dirPath) + '/'
+        if prefix == './' : prefix = ''
+        return sorted( path for key, path in self.paths.items() if key.startswith( prefix) and key.endswith( ext))
+
+
+BrokenRow = collections.namedtuple( 'BrokenRow', 'problem reference expected referencedBy')
+
+# the references of eng and wag files: block name -> (problem if missing, sub-folders of the vehicle folder to look in)
+# sounds are also looked for in the SOUND folder of the content folder
+vehicleReferences = {'wagonshape': ('missing-shape', ['']), 'freightanim': ('missing-freight-anim', ['']),
+                     'sound': ('missing-sound', ['SOUND']), 'cabview': ('missing-cabview', ['CABVIEW']),
+                     'orts3dcabfile': ('missing-cab3d', ['CABVIEW3D'])}
+
+shapeImageRe = re.compile( '(?<![\\w])image\\s*\\(\\s*"?([^")]+?)"?\\s*\\)', flags=re.IGNORECASE)
+
+
+### make a reference in a content file (eg. "..\\COMMON\\x.s") a relative path
+def getReferencePath( value) :
+    return value.strip().replace( '\\', '/')
+
+
+### get the content folder of a file (the folder above TRAINS), None if not below TRAINS
+def getContentRoot( filePath) :
+    return next( (p.parent for p in filePath.parents if p.name.casefold() == 'trains'), None)
+
+
+### get the references of an eng or wag file: (block name, value); and the include files (also the missing ones)
+### the file is read once, and parsed with its includes expanded
+def getVehicleReferences( path) :
+    txt = readFile( path)
+    includes = getIncludePaths( txt, path.parent)
+    refs = []
+
+    def collect( block, inFreightAnims) :
+        for item in block.items :
+            if not isinstance( item, Block) : continue
+            name = item.name.casefold()
+            values = item.values()
+            if values and values[0].strip() and (name in vehicleReferences or name == 'shape' and inFreightAnims) :
+                refs.append( ('freightanim' if name == 'shape' else name, values[0]))
+            collect( item, inFreightAnims or name == 'ortsfreightanims')
+
+    collect( parseText( expandText( txt, path, path.parent, lambda *args : None)[0]), False)
+    return refs, includes
+
+
+### get the textures (image names) of a shape file; None if it is a binary shape (not supported)
+def getShapeTextures( shapePath) :
+    data = shapePath.read_bytes()
+    if data[:8] == b'SIMISA@F' :
+        data = zlib.decompress( data[16:])  # compressed: header, size, "@@@@", zlib stream
+    if data[:2] == b'\xff\xfe' : text = data.decode( 'utf-16', errors='replace')
+    elif data[1:2] == b'\0' : text = data.decode( 'utf-16-le', errors='replace')
+    else : text = data.decode( 'latin-1')
+    if 'JINX0s1b' in text[:64] :
+        return None
+    return [m.group(1).strip() for m in shapeImageRe.finditer( text)]
+
+
+### validate: the broken references of the content in (or below) a folder; yields BrokenRow
+### for a route (or a ROUTES folder), the references of its services: consists, engines and wagons, and their shapes,
+### freight animations, sounds, cab views and includes, and the textures of the shapes. For a content folder (or a
+### folder of content folders), the same for all the services, consists, engines and wagons.
+### the existence is checked in one listing of the content folder; the files are read in parallel (jobs threads)
+### the stats count the files checked by kind, and the broken references by problem
+def validateReferences( dirPath, warn=printWarning, stats=None, jobs=8, verbose=0) :
+    stats = collections.Counter() if stats is None else stats
+    isRoute = any( p.name.casefold() == 'routes' for p in [dirPath.resolve()] + list( dirPath.resolve().parents))
+    indexPath = getRootPath( dirPath) if isRoute else dirPath
+    if verbose > 0 : print( 'Info: listing', indexPath, file=sys.stderr)
+    index = FileIndex( indexPath)
+
+    def broken( problem, reference, expected, referencedBy) :
+        stats[problem] += 1
+        return BrokenRow( problem, reference, expected, referencedBy)
+
+    # services -> consists
+    consists = {}  # key -> path
+    servicePaths = index.listFiles( dirPath, '.srv')
+    for servicePath, serviceFuture in ortsReadAhead.readAhead( servicePaths, readFile, jobs) :
+        stats['services'] += 1
+        try :
+            consistName = getServiceConsistName( serviceFuture.result())
+        except (OSError, UnicodeError) as e :
+            warn( 'Unable to read service {}: {}'.format(servicePath, e))
+            continue
+        if not consistName :
+            yield broken( 'no-consist-name', '', '', servicePath)
+            continue
+        rootPath = getServiceRootPath( servicePath)
+        if not rootPath :
+            warn( 'Service not in a route folder: {}'.format(servicePath))
+            continue
+        consistPath = rootPath / 'TRAINS' / 'CONSISTS' / (consistName + '.con')
+        actualPath = index.get( consistPath)
+        if not actualPath :
+            yield broken( 'missing-consist', consistName, consistPath, servicePath)
+            continue
+        consists.setdefault( index.getKey( actualPath), actualPath)
+    if not isRoute :
+        for path in index.listFiles( dirPath, '.con') :
+            consists.setdefault( index.getKey( path), path)
+
+    # consists -> engines and wagons
+    vehicles = {}  # key -> path
+    for consistPath, consistFuture in ortsReadAhead.readAhead( list( consists.values()), readFile, jobs) :
+        stats['consists'] += 1
+        try :
+            entries = parseConsist( consistFuture.result())[1]
+        except (OSError, UnicodeError) as e :
+            warn( 'Unable to read consist {}: {}'.format(consistPath, e))
+            continue
+        rootPath = consistPath.parents[2]
+        for entry in entries :
+            ext = '.eng' if entry.kind == 'Engine' else '.wag'
+            if not entry.fileName or not entry.dirName :
+                yield broken( 'unparsed-entry', 'UiD {}'.format(entry.uid), '', consistPath)
+                continue
+            vehiclePath = rootPath / 'TRAINS' / 'TRAINSET' / entry.dirName / (entry.fileName + ext)
+            actualPath = index.get( vehiclePath)
+            if not actualPath :
+                yield broken( 'missing-' + entry.kind.lower(), '{}/{}{}'.format(entry.dirName, entry.fileName, ext), vehiclePath, consistPath)
+                continue
+            vehicles.setdefault( index.getKey( actualPath), actualPath)
+    if not isRoute :
+        for ext in ('.eng', '.wag') :
+            for path in index.listFiles( dirPath, ext) :
+                vehicles.setdefault( index.getKey( path), path)
+
+    # engines and wagons -> includes, shapes, sounds, cab views; read in parallel
+    shapes = {}  # key -> path
+    with ThreadPoolExecutor( max_workers=jobs) as executor :
+        futures = [(path, executor.submit( getVehicleReferences, path)) for path in vehicles.values()]
+        for path, future in futures :
+            stats['engines and wagons'] += 1
+            try :
+                refs, includes = future.result()
+            except (OSError, UnicodeError) as e :
+                warn( 'Unable to read {}: {}'.format(path, e))
+                continue
+            for incPath in includes :
+                if not index.get( incPath) :
+                    yield broken( 'missing-include', incPath.name, incPath, path)
+            rootPath = getContentRoot( path)
+            for name, value in refs :
+                problem, subDirs = vehicleReferences[name]
+                candidates = [path.parent / subDir / getReferencePath( value) for subDir in subDirs]
+                if name == 'sound' and rootPath : candidates.append( rootPath / 'SOUND' / getReferencePath( value))
+                actualPath = next( (p for p in map( index.get, candidates) if p), None)
+                if not actualPath :
+                    yield broken( problem, value, candidates[0], path)
+                elif problem in ('missing-shape', 'missing-freight-anim') :
+                    shapes.setdefault( index.getKey( actualPath), actualPath)
+
+        # shapes -> textures, in the folder of the shape (or the .dds of an .ace)
+        futures = [(path, executor.submit( getShapeTextures, path)) for path in shapes.values()]
+        for path, future in futures :
+            stats['shapes'] += 1
+            try :
+                textures = future.result()
+            except (OSError, zlib.error) as e :
+                warn( 'Unable to read shape {}: {}'.format(path, e))
+                continue
+            if textures is None :
+                stats['binary shapes (textures not checked)'] += 1
+                continue
+            for texture in dict.fromkeys( textures) :
+                stats['textures'] += 1
+                texturePath = path.parent / getReferencePath( texture)
+                if not index.get( texturePath) and not index.get( texturePath.with_suffix( '.dds')) :
+                    yield broken( 'missing-texture', texture, texturePath, path)
+
+
+### format a row of validate, as CSV or as a JSON line
+def formatBrokenRow( row, jsonOut=False) :
+    if jsonOut :
+        return json.dumps( {'problem': row.problem, 'reference': row.reference, 'expected': str(row.expected),
+                            'referencedBy': str(row.referencedBy)}, ensure_ascii=False)
+    return '{},"{}","{}","{}"'.format(row.problem, row.reference, row.expected, row.referencedBy)
+
+
+FootprintRow = collections.namedtuple( 'FootprintRow', 'type package name path shapes shapeBytes textures textureBytes '
+                                                       'texturePixels textureMemory missing')
+
+# bytes per pixel of the texture formats: ACE surface formats, DDS four character codes; else 4 (RGBA)
+aceBytesPerPixel = {0x0E: 2, 0x10: 2, 0x11: 2, 0x12: 0.5}
+ddsBytesPerPixel = {b'DXT1': 0.5, b'DXT3': 1, b'DXT5': 1}
+
+
+### get the width, height and estimated memory (bytes, with mipmaps) of a texture (.ace or .dds); only the header is
+### read (memory-mapped). None if it is not a texture file.
+def getTextureInfo( path) :
+    with open( path, 'rb') as f :
+        if os.fstat( f.fileno()).st_size < 24 :
+            return None
+        with mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ) as m :
+            if m[:4] == b'DDS ' and len(m) >= 128 :
+                height, width = struct.unpack_from( '<II', m, 12)
+                hasMipmaps = struct.unpack_from( '<I', m, 28)[0] > 1
+                bytesPerPixel = ddsBytesPerPixel.get( m[84:88], 4)
+            else :
+                if m[:8] == b'SIMISA@F' :
+                    header = zlib.decompressobj().decompress( m[16:4096], 64)  # compressed: only the start of the stream
+                    if header[:6] == b'SIMISA' : header = header[16:]
+                elif m[:6] == b'SIMISA' :
+                    header = m[16:64]
+                else :
+                    return None
+                if len(header) < 24 :
+                    return None
+                version, flags, width, height, surfaceFormat = struct.unpack_from( '<5I', header, 0)
+                hasMipmaps = flags & 1
+                bytesPerPixel = aceBytesPerPixel.get( surfaceFormat, 4)
+    return width, height, width * height * bytesPerPixel * (4 / 3 if hasMipmaps else 1)
+
+
+### footprint: the shape and texture files that the engines, wagons and consists in (or below) a folder load; yields
+### FootprintRow (type Engine, Wagon or Consist), the sizes in bytes, the texture memory estimated from the texture
+### headers (width, height, format, mipmaps). An asset is counted once per row, eg. a shape used by several wagons of
+### a consist. For a route (or ROUTES folder), the consists used by its services and their engines and wagons; for a
+### content folder, all the consists, engines and wagons. The missing counts the shapes and textures not found.
+### the files are listed once (see validateReferences), and read in parallel (jobs threads)
+def assetFootprints( dirPath, warn=printWarning, stats=None, jobs=8, verbose=0) :
+    stats = collections.Counter() if stats is None else stats
+    isRoute = any( p.name.casefold() == 'routes' for p in [dirPath.resolve()] + list( dirPath.resolve().parents))
+    index = FileIndex( getRootPath( dirPath) if isRoute else dirPath)
+
+    # the consists, and the engines and wagons
+    consists = {}  # key -> path
+    if isRoute :
+        for servicePath in index.listFiles( dirPath, '.srv') :
+            try :
+                consistName = getServiceConsistName( readFile( servicePath))
+            except (OSError, UnicodeError) as e :
+                warn( 'Unable to read service {}: {}'.format(servicePath, e))
+                continue
+            rootPath = getServiceRootPath( servicePath)
+            if not rootPath :
+                warn( 'Service not in a route folder: {}'.format(servicePath))
+                continue
+            consistPath = consistName and index.get( rootPath / 'TRAINS' / 'CONSISTS' / (consistName + '.con'))
+            if consistPath : consists.setdefault( index.getKey( consistPath), consistPath)
+    else :
+        consists = {index.getKey( path) : path for path in index.listFiles( dirPath, '.con')}
+    consistVehicles = {}  # consist key -> keys of the engines and wagons
+    vehicles = {}  # key -> path
+    for key, consistPath in consists.items() :
+        try :
+            entries = parseConsist( readFile( consistPath))[1]
+        except (OSError, UnicodeError) as e :
+            warn( 'Unable to read consist {}: {}'.format(consistPath, e))
+            continue
+        consistVehicles[key] = []
+        for entry in entries :
+            ext = '.eng' if entry.kind == 'Engine' else '.wag'
+            vehiclePath = entry.fileName and entry.dirName and index.get(
+                          consistPath.parents[2] / 'TRAINS' / 'TRAINSET' / entry.dirName / (entry.fileName + ext))
+            if vehiclePath :
+                consistVehicles[key].append( index.getKey( vehiclePath))
+                vehicles.setdefault( index.getKey( vehiclePath), vehiclePath)
+    if not isRoute :
+        for ext in ('.eng', '.wag') :
+            for path in index.listFiles( dirPath, ext) :
+                vehicles.setdefault( index.getKey( path), path)
+
+    def getSize( path) :
+        return os.stat( path).st_size
+
+    with ThreadPoolExecutor( max_workers=jobs) as executor :
+        # the shapes of the engines and wagons (wagon shape, freight animations)
+        vehicleAssets = {}  # vehicle key -> (keys of the shapes, number missing)
+        shapes = {}  # key -> path
+        futures = [(key, path, executor.submit( getVehicleReferences, path)) for key, path in vehicles.items()]
+        for key, path, future in futures :
+            try :
+                refs = future.result()[0]
+            except (OSError, UnicodeError) as e :
+                warn( 'Unable to read {}: {}'.format(path, e))
+                refs = []
+            shapeKeys = [] ; missing = 0
+            for name, value in refs :
+                if name not in ('wagonshape', 'freightanim') : continue
+                shapePath = index.get( path.parent / getReferencePath( value))
+                if not shapePath : missing += 1 ; continue
+                shapeKeys.append( index.getKey( shapePath)) ; shapes.setdefault( index.getKey( shapePath), shapePath)
+            vehicleAssets[key] = (shapeKeys, missing)
+
+        # the textures of the shapes; OpenRails uses the .dds instead of the .ace, if there is one
+        shapeInfos = {}  # shape key -> (size, keys of the textures, number missing)
+        textures = {}  # key -> path
+        futures = [(key, path, executor.submit( getSize, path), executor.submit( getShapeTextures, path)) for key, path in shapes.items()]
+        for key, path, sizeFuture, texturesFuture in futures :
+            stats['shapes'] += 1
+            try :
+                names = texturesFuture.result()
+            except (OSError, zlib.error) as e :
+                warn( 'Unable to read shape {}: {}'.format(path, e))
+                names = []
+            if names is None :
+                stats['binary shapes (textures not counted)'] += 1
+                names = []
+            textureKeys = [] ; missing = 0
+            for name in dict.fromkeys( names) :
+                texturePath = path.parent / getReferencePath( name)
+                texturePath = index.get( texturePath.with_suffix( '.dds')) or index.get( texturePath)
+                if not texturePath : missing += 1 ; continue
+                textureKeys.append( index.getKey( texturePath)) ; textures.setdefault( index.getKey( texturePath), texturePath)
+            shapeInfos[key] = (sizeFuture.result(), textureKeys, missing)
+
+        # the texture headers
+        textureInfos = {}  # texture key -> (size, pixels, memory)
+        futures = [(key, path, executor.submit( getSize, path), executor.submit( getTextureInfo, path)) for key, path in textures.items()]
+        for key, path, sizeFuture, infoFuture in futures :
+            stats['textures'] += 1
+            try :
+                info = infoFuture.result()
+            except (OSError, ValueError, struct.error, zlib.error) as e :
+                warn( 'Unable to read texture {}: {}'.format(path, e))
+                info = None
+            if info is None :
+                stats['unknown textures'] += 1
+                info = (0, 0, 0)
+            textureInfos[key] = (sizeFuture.result(), info[0] * info[1], info[2])
+
+    ### the row of a set of engines and wagons; each shape and texture is counted once
+    def footprint( type, path, name, vehicleKeys) :
+        shapeKeys = {} ; textureKeys = {} ; missing = 0
+        for vehicleKey in vehicleKeys :
+            keys, numMissing = vehicleAssets[vehicleKey]
+            missing += numMissing
+            shapeKeys.update( dict.fromkeys( keys))
+        for shapeKey in shapeKeys :
+            size, keys, numMissing = shapeInfos[shapeKey]
+            missing += numMissing
+            textureKeys.update( dict.fromkeys( keys))
+        stats[type] += 1
+        return FootprintRow( type, getContentDir( path), name, path, len(shapeKeys), sum( shapeInfos[k][0] for k in shapeKeys),
+                             len(textureKeys), sum( textureInfos[k][0] for k in textureKeys),
+                             sum( textureInfos[k][1] for k in textureKeys), sum( textureInfos[k][2] for k in textureKeys), missing)
+
+    for key, path in vehicles.items() :
+        yield footprint( 'Engine' if path.suffix.casefold() == '.eng' else 'Wagon', path, '{}/{}'.format(path.parent.name, path.name), [key])
+    for key, path in consists.items() :
+        if key in consistVehicles :
+            yield footprint( 'Consist', path, path.name, consistVehicles[key])
+
+
+### format a row of footprint as CSV; the sizes in KB, the pixels in millions, the memory in MB
+def formatFootprintRow( row) :
+    return '{},"{}","{}",{},{:.0f},{},{:.0f},{:.2f},{:.1f},{}'.format(row.type, row.package, row.name, row.shapes,
+           row.shapeBytes / 1024, row.textures, row.textureBytes / 1024, row.texturePixels / 1e6, row.textureMemory / (1024 * 1024),
+           row.missing)
+
+footprintHeading = 'Type,Package,Name,Shapes,ShapeKB,Textures,TextureKB,TextureMpx,TextureMemoryMB,Missing'
+
+
+OutlierRow = collections.namedtuple( 'OutlierRow', 'severity metric value unit median group groupSize package directory file')
+
+# the units of the outlier metrics: weight in t, length in m, power in kW, forces in kN
+outlierUnits = {'Weight': 't', 'Length': 'm', 'MaxPower/Weight': 'kW/t', 'MaxForce/Weight': 'kN/t',
+                'MaxBrakeForce/Weight': 'kN/t', 'CouplerStrength/Weight': 'kN/t'}
+
+
+### get the robust z-scores of values (on a log scale): 0.6745 * (x - median) / MAD, with MAD the median absolute
+### deviation; if the MAD is 0, the mean absolute deviation (x 1.2533) is used. Returns the median and the scores;
+### the scores are None if all values are the same.
+def getRobustScores( logValues) :
+    median = statistics.median( logValues)
+    deviations = [abs( x - median) for x in logValues]
+    mad = statistics.median( deviations)
+    if mad > 0 :
+        return median, [0.6745 * (x - median) / mad for x in logValues]
+    meanDeviation = statistics.fmean( deviations)
+    if meanDeviation > 0 :
+        return median, [(x - median) / (1.253314 * meanDeviation) for x in logValues]
+    return median, None
+
+
+### outliers: the physics values of engines and wagons far from the ones of the same Type and SubType; yields
+### OutlierRow, the most severe first. The rows are the values of scanRollingStock (the columns of
+### ORTS-RollingStockScanner). The metrics (weight, length, and power, tractive force, brake force and coupler
+### strength per weight) are compared on a log scale (a 10x typo is as far as a 0.1x one), by robust z-score; the
+### severity is the absolute score, an outlier is above the threshold. A Type/SubType with fewer than minGroup
+### vehicles is compared to all the vehicles of its Type. Then, with missing, the vehicles without Davis
+### coefficients (Friction) or weight, with severity None.
+### the values are kept as columns (arrays), and each group and metric is scored in one pass
+def findOutliers( valueRows, threshold=3.5, minGroup=5, missing=True) :
+    names = []  # (package, directory, file)
+    types = [] ; subTypes = []
+    weight = array( 'd') ; length = array( 'd') ; power = array( 'd') ; force = array( 'd') ; brake = array( 'd') ; coupler = array( 'd')
+    noDavis = []
+
+    def getColumn( values, name, units) :
+        quantity = getQuantity( values.get( name, '_'), units)
+        return quantity if quantity is not None and quantity > 0 else math.nan
+
+    for values in valueRows :
+        names.append( (values.get( 'Package', '_'), values.get( 'Directory', '_'), values.get( 'File', '_')))
+        types.append( values.get( 'Type', '_')) ; subTypes.append( values.get( 'SubType', '_'))
+        weight.append( getColumn( values, 'Weight', massUnits))
+        length.append( getColumn( values, 'Length', lengthUnits))
+        power.append( getColumn( values, 'MaxPower', powerUnits))
+        force.append( getColumn( values, 'MaxForce', forceUnits))
+        brake.append( getColumn( values, 'MaxBrakeForce', forceUnits))
+        coupler.append( getColumn( values, 'CouplerStrength', forceUnits))
+        noDavis.append( values.get( 'Friction', '_') == '_')
+
+    metrics = {'Weight': weight, 'Length': length,
+               'MaxPower/Weight': array( 'd', map( operator.truediv, power, weight)),
+               'MaxForce/Weight': array( 'd', map( operator.truediv, force, weight)),
+               'MaxBrakeForce/Weight': array( 'd', map( operator.truediv, brake, weight)),
+               'CouplerStrength/Weight': array( 'd', map( operator.truediv, coupler, weight))}
+
+    # the groups: Type/SubType, or Type/* if too small
+    subTypeCounts = collections.Counter( zip( types, subTypes))
+    groups = collections.defaultdict( list)
+    for i, key in enumerate( zip( types, subTypes)) :
+        groups['{}/{}'.format(*key) if subTypeCounts[key] >= minGroup else '{}/*'.format(key[0])].append( i)
+
+    outliers = []
+    for group, indices in groups.items() :
+        for metric, column in metrics.items() :
+            known = [i for i in indices if column[i] > 0]  # NaN (unknown) is not > 0
+            if len(known) < minGroup : continue
+            median, scores = getRobustScores( [math.log10( column[i]) for i in known])
+            if scores is None : continue
+            for i, score in zip( known, scores) :
+                if abs( score) > threshold :
+                    outliers.append( OutlierRow( abs( score), metric, column[i], outlierUnits[metric], 10 ** median,
+                                                 group, len(known), *names[i]))
+    outliers.sort( key=lambda row : row.severity, reverse=True)
+    yield from outliers
+
+    if missing :
+        for i, (package, directory, file) in enumerate( names) :
+            group = '{}/{}'.format(types[i], subTypes[i])
+            if noDavis[i] :
+                yield OutlierRow( None, 'Davis', math.nan, '', math.nan, group, subTypeCounts[(types[i], subTypes[i])], package, directory, file)
+            if math.isnan( weight[i]) :
+                yield OutlierRow( None, 'Weight', math.nan, 't', math.nan, group, subTypeCounts[(types[i], subTypes[i])], package, directory, file)
+
+
+### format a row of outliers as CSV: the ratio is value / median, "_" for an unknown value
+def formatOutlierRow( row) :
+    def number( value, digits) :
+        return '_' if value is None or math.isnan( value) else '{:.{}f}'.format(value, digits)
+    ratio = row.value / row.median if row.median and not math.isnan( row.median) else math.nan
+    return '{},{},{},{},{},{},{},{},"{}","{}","{}"'.format(number( row.severity, 1) if row.severity is not None else 'missing',
+           row.metric, number( row.value, 3), row.unit, number( row.median, 3), number( ratio, 2), row.group, row.groupSize,
+           row.package, row.directory, row.file)
+
+outlierHeading = 'Severity,Metric,Value,Unit,Median,Ratio,Group,GroupSize,Package,Directory,File'
@@ -0,0 +1,165 @@
+# ortsWatch - watch a folder tree for changed content files, with inotify (Linux) or by polling
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Used (with --watch) by ORTS-RollingStockScanner and ORTS-ListRollingStockUsed.
+#
+# Notes:
+# - On Linux, inotify (through ctypes, no extra package) reports the changes as they happen. Elsewhere, or if
+#   inotify is not available (eg. the limit of watches is reached), the folder tree is polled: the size and
+#   modification time of the files are compared every interval.
+# - The changes are reported in batches: the events are collected until there are none for a short time, as
+#   editors often write a file in several steps (write a temporary file, rename it, etc.).
+# - Only the changed files are reported. Re-reading the files that depend on them (eg. that include them) is up
+#   to the caller; see ortsCatalog.Catalog.updateFiles().
+#
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+settleTime = 0.2  # seconds without events before a batch of changes is reported
+
+
+### the files with one of the extensions in (or below) a folder, with size and modification time
+def getFileStates( dirPath, extensions) :
+    states = {}
+    for dirName, subDirs, fileNames in os.walk( dirPath) :
+        for fileName in fileNames :
+            if os.path.splitext( fileName)[1].casefold() in extensions :
+                path = os.path.join( dirName, fileName)
+                try :
+                    st = os.stat( path)
+                except OSError :
+                    continue  # removed in the meantime
+                states[path] = (st.st_size, st.st_mtime_ns)
+    return states
+
+
+### watch by polling the folder tree
+class PollWatcher :
+    name = 'polling'
+
+    def __init__( self, dirPath, extensions, interval) :
+        self.dirPath = dirPath ; self.extensions = extensions ; self.interval = interval
+        self.states = getFileStates( dirPath, extensions)
+
+    ### yield the sets of changed (new, modified or removed) files, forever
+    def changes( self) :
+        while True :
+            time.sleep( self.interval)
+            states = getFileStates( self.dirPath, self.extensions)
+            changed = {path for path in self.states.keys() | states.keys() if self.states.get( path) != states.get( path)}
+            self.states = states
+            if changed :
+                yield changed
+
+    def close( self) :
+        pass
+
+
+### watch with inotify (Linux)
+class InotifyWatcher :
+    name = 'inotify'
+    IN_ATTRIB = 0x4 ; IN_CLOSE_WRITE = 0x8 ; IN_MOVED_FROM = 0x40 ; IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100 ; IN_DELETE = 0x200 ; IN_DELETE_SELF = 0x400 ; IN_ISDIR = 0x40000000 ; IN_IGNORED = 0x8000
+    IN_NONBLOCK = 0o4000 ; IN_CLOEXEC = 0o2000000
+    mask = IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    eventHeader = struct.Struct( 'iIII')
+
+    def __init__( self, dirPath, extensions, libc) :
+        self.extensions = extensions ; self.libc = libc
+        self.fd = libc.inotify_init1( self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0 :
+            raise OSError( ctypes.get_errno(), 'inotify_init1: ' + os.strerror( ctypes.get_errno()))
+        self.dirs = {}  # watch descriptor -> folder
+        try :
+            self.addTree( str(dirPath))
+        except OSError :
+            os.close( self.fd)
+            raise
+
+    ### watch a folder and its sub-folders; returns the files found in them (for folders created while watching)
+    def addTree( self, dirPath) :
+        found = set()
+        for dirName, subDirs, fileNames in os.walk( dirPath) :
+            wd = self.libc.inotify_add_watch( self.fd, os.fsencode( dirName), self.mask)
+            if wd < 0 :
+                raise OSError( ctypes.get_errno(), 'inotify_add_watch {}: {}'.format(dirName, os.strerror( ctypes.get_errno())))
+            self.dirs[wd] = dirName
+            found.update( os.path.join( dirName, fileName) for fileName in fileNames)
+        return found
+
+    ### read the pending events; returns the paths of the files affected
+    def readEvents( self) :
+        paths = set()
+        try :
+            buffer = os.read( self.fd, 65536)
+        except BlockingIOError :
+            return paths
+        offset = 0
+        while offset < len(buffer) :
+            wd, mask, cookie, length = self.eventHeader.unpack_from( buffer, offset)
+            offset += self.eventHeader.size
+            name = os.fsdecode( buffer[offset:offset + length].rstrip( b'\0'))
+            offset += length
+            dirName = self.dirs.get( wd)
+            if mask & self.IN_IGNORED :
+                self.dirs.pop( wd, None)  # folder removed
+            if dirName is None or not name :
+                continue
+            path = os.path.join( dirName, name)
+            if mask & self.IN_ISDIR :
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) :
+                    try :
+                        paths.update( self.addTree( path))
+                    except OSError as e :
+                        print( 'Warning: not watching', path, e, file=sys.stderr)
+                continue
+            paths.add( path)
+        return {path for path in paths if os.path.splitext( path)[1].casefold() in self.extensions}
+
+    ### yield the sets of changed (new, modified or removed) files, forever
+    def changes( self) :
+        while True :
+            select.select( [self.fd], [], [])
+            changed = self.readEvents()
+            while select.select( [self.fd], [], [], settleTime)[0] :
+                changed |= self.readEvents()
+            if changed :
+                yield changed
+
+    def close( self) :
+        os.close( self.fd)
+
+
+### get the inotify functions of the C library, None if not available
+def getInotify() :
+    if not sys.platform.startswith( 'linux') :
+        return None
+    try :
+        libc = ctypes.CDLL( ctypes.util.find_library( 'c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError) :
+        return None
+    return libc
+
+
+### watch the content files (catalog extensions) in (or below) a folder; inotify if possible, else polling
+def openWatcher( dirPath, extensions, interval=1.0, verbose=0) :
+    extensions = [ext.casefold() for ext in extensions]
+    libc = getInotify()
+    if libc :
+        try :
+            watcher = InotifyWatcher( dirPath, extensions, libc)
+        except OSError as e :
+            print( 'Info: inotify not available ({}), polling every {}s'.format(e, interval), file=sys.stderr)
+        else :
+            if verbose > 0 : print( 'Info: watching {} folders with inotify'.format(len(watcher.dirs)), file=sys.stderr)
+            return watcher
+    return PollWatcher( dirPath, extensions, interval)
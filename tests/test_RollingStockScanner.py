@@ -0,0 +1,142 @@
+# test_RollingStockScanner - tests of the shards (--shard) and their merge (--merge) of ORTS-RollingStockScanner
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Run from the repository folder: python -m pytest tests (or python -m unittest discover tests)
+#
+
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+
+scriptPath = pathlib.Path( __file__).resolve().parent.parent / 'ORTS-RollingStockScanner.py'
+
+engText = '''Wagon ( GP38
+	Type ( Engine )
+	Size ( 3m 4m 18m )
+	Mass ( 110t )
+	MaxBrakeForce ( 200kN )
+	include ( "common.inc" )
+	DerailRailForce ( 10 ) DerailBufferForce ( 10 )
+	NumWheels ( 4 )
+)
+Engine ( GP38
+	Type ( Diesel )
+	Name ( "GP38 test" )
+	MaxVelocity ( 65mph )
+	MaxPower ( 1500kW )
+	MaxForce ( 300kN )
+)
+'''
+
+wagText = '''Wagon ( {name}
+	Type ( Freight )
+	Size ( 3m 4m 15m )
+	Mass ( {mass}t )
+	MaxBrakeForce ( 50kN )
+	Coupling ( Type ( Chain ) Spring ( Break ( 1e7N 5e7N ) ) )
+	{friction}
+	DerailRailForce ( 10 ) DerailBufferForce ( 10 )
+	NumWheels ( 4 )
+)
+'''
+
+
+### a content folder with an engine (with an include) and wagons, some of them with warnings (no friction)
+def makeContent( rootPath) :
+    trainset = rootPath / 'Pack' / 'TRAINS' / 'TRAINSET'
+    (trainset / 'GP38').mkdir( parents=True)
+    (trainset / 'GP38' / 'gp38.eng').write_text( engText)
+    (trainset / 'GP38' / 'common.inc').write_text( '\tCoupling ( Type ( Chain ) Spring ( Break ( 1e7N 5e7N ) ) )\n')
+    for folder, count in (('Box', 7), ('Tank', 5)) :
+        (trainset / folder).mkdir()
+        for i in range( 1, count + 1) :
+            friction = 'Friction ( 1 2 3 4 5 6 7 8 9 10 )' if i % 3 else ''
+            (trainset / folder / '{}{}.wag'.format(folder.lower(), i)).write_text(
+                wagText.format( name='{}{}'.format(folder.lower(), i), mass=10 * i, friction=friction))
+    return rootPath / 'Pack'
+
+
+### run the scanner; returns the completed process (returncode, stdout, stderr)
+def runScanner( *args) :
+    return subprocess.run( [sys.executable, str(scriptPath)] + [str(arg) for arg in args],
+                           capture_output=True, text=True, encoding='utf-8')
+
+
+class ShardMergeTest( unittest.TestCase) :
+
+    def setUp( self) :
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.tempPath = pathlib.Path( self.tempDir.name)
+        self.dirPath = makeContent( self.tempPath)
+
+    def tearDown( self) :
+        self.tempDir.cleanup()
+
+    ### run the shards i/N, and write their partial results; returns the paths of the partial results
+    def runShards( self, numShards, *args) :
+        partialPaths = []
+        for shard in range( 1, numShards + 1) :
+            result = runScanner( '--shard', '{}/{}'.format(shard, numShards), *args, self.dirPath)
+            self.assertEqual( result.returncode, 0, result.stderr)
+            partialPath = self.tempPath / 'shard{}of{}.json'.format(shard, numShards)
+            partialPath.write_text( result.stdout, encoding='utf-8')
+            partialPaths.append( partialPath)
+        return partialPaths
+
+    ### the merge of the shards, in any order, is the same (CSV, warnings and counts) as a run without shards
+    def testMergeSameAsPlainRun( self) :
+        plain = runScanner( self.dirPath)
+        self.assertEqual( plain.returncode, 0, plain.stderr)
+        self.assertIn( 'Warning', plain.stderr)
+        partialPaths = self.runShards( 3)
+        args = []
+        for partialPath in reversed( partialPaths) :
+            args += ['--merge', partialPath]
+        merged = runScanner( *args, self.dirPath)
+        self.assertEqual( merged.returncode, 0, merged.stderr)
+        self.assertEqual( merged.stdout, plain.stdout)
+        self.assertEqual( merged.stderr, plain.stderr)
+
+    ### each file is in exactly one partial result, with its row and warnings
+    def testPartialResults( self) :
+        partials = [json.loads( path.read_text( encoding='utf-8')) for path in self.runShards( 3, '-f', 'wag')]
+        self.assertEqual( [(p['shard'], p['shards'], p['filter']) for p in partials], [(1, 3, 'wag'), (2, 3, 'wag'), (3, 3, 'wag')])
+        paths = [record['path'] for p in partials for record in p['files']]
+        self.assertEqual( len(paths), 12)
+        self.assertEqual( len(set(paths)), 12)
+        self.assertEqual( sum( p['numWag'] for p in partials), 12)
+        self.assertEqual( sum( p['numEng'] for p in partials), 0)
+        records = {record['path'] : record for p in partials for record in p['files']}
+        self.assertEqual( records['TRAINS/TRAINSET/Box/box3.wag']['row']['Weight'], '30t')
+        self.assertTrue( records['TRAINS/TRAINSET/Box/box3.wag']['warnings'])
+        self.assertFalse( records['TRAINS/TRAINSET/Box/box1.wag']['warnings'])
+
+    ### a missing shard is an error
+    def testMissingShard( self) :
+        partialPaths = self.runShards( 3)
+        merged = runScanner( '--merge', partialPaths[0], '--merge', partialPaths[2], self.dirPath)
+        self.assertEqual( merged.returncode, 1)
+        self.assertIn( 'shards 2 are missing', merged.stderr)
+        self.assertEqual( merged.stdout, '')
+
+    ### the partial results must be for the same filter and number of shards, each shard once
+    def testMismatch( self) :
+        partialPaths = self.runShards( 2, '-f', 'wag')
+        merged = runScanner( '--merge', partialPaths[0], '--merge', partialPaths[1], self.dirPath)
+        self.assertEqual( merged.returncode, 1)
+        self.assertIn( 'filter wag', merged.stderr)
+        merged = runScanner( '-f', 'wag', '--merge', partialPaths[0], '--merge', partialPaths[0], self.dirPath)
+        self.assertEqual( merged.returncode, 1)
+        self.assertIn( 'does not fit', merged.stderr)
+        otherPath = self.runShards( 3, '-f', 'wag')[2]
+        merged = runScanner( '-f', 'wag', '--merge', partialPaths[0], '--merge', otherPath, self.dirPath)
+        self.assertEqual( merged.returncode, 1)
+        self.assertIn( 'does not fit', merged.stderr)
+
+
+if __name__ == '__main__' :
+    unittest.main()
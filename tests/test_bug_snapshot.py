@@ -0,0 +1,122 @@
+# test_bug_snapshot - tests of the sync of the bug snapshot (launchpad-bugs-tools), against the launchpadlib stand-in
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Run from the repository folder: python -m pytest tests (or python -m unittest discover tests)
+#
+
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+toolsDir = pathlib.Path( __file__).resolve().parent.parent / 'launchpad-bugs-tools'
+sys.path.insert( 0, str(toolsDir))
+sys.path.insert( 0, str(toolsDir / 'standin'))
+os.environ.setdefault( 'LP_STANDIN_DATA', 'synthetic:300')
+
+import bug_snapshot
+from launchpadlib import launchpad
+
+
+### a new synthetic data set of the stand-in, and the "or" project
+def resetDataset( numBugs=300) :
+    launchpad.dataset = launchpad.synthetic_dataset( numBugs, 1)
+    return launchpad.Launchpad.login_anonymously( 'test').projects['or']
+
+
+def connect() :
+    return launchpad.Launchpad.login_anonymously( 'test')
+
+
+### a connection that fails to load one bug, eg. a network error in the middle of a sync
+class FailingLaunchpad( launchpad.Launchpad) :
+    failLink = None
+
+    def load( self, link) :
+        if link == FailingLaunchpad.failLink :
+            raise ConnectionError( 'simulated network error')
+        return super().load( link)
+
+
+### change the status of the task of a bug, as launchpad does (the bug is modified now)
+def closeTask( task, status='Fix Released') :
+    now = datetime.now( tz=timezone.utc)
+    task.status = status ; task.date_closed = now
+    launchpad.dataset.bugs[task.bug_link].date_last_updated = now
+
+
+class SyncSnapshotTest( unittest.TestCase) :
+
+    def setUp( self) :
+        self.project = resetDataset()
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.conn = bug_snapshot.open_snapshot( os.path.join( self.tempDir.name, 'bugs.sqlite'), create=True)
+        self.batchSize = bug_snapshot.sync_batch_size
+
+    def tearDown( self) :
+        bug_snapshot.sync_batch_size = self.batchSize
+        self.conn.close()
+        self.tempDir.cleanup()
+
+    def snapshotTasks( self) :
+        return {task.self_link : (task.status, task.date_closed) for task in
+                bug_snapshot.search_tasks( self.conn, status=bug_snapshot.all_states)}
+
+    def datasetTasks( self) :
+        return {task.self_link : (task.status, task.date_closed) for task in launchpad.dataset.tasks}
+
+    def testFullSync( self) :
+        numTasks = bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2)
+        self.assertEqual( numTasks, 300)
+        self.assertEqual( self.snapshotTasks(), self.datasetTasks())
+        self.assertIsNotNone( bug_snapshot.get_meta( self.conn, 'last_sync'))
+        task = bug_snapshot.search_tasks( self.conn, status=bug_snapshot.all_states, order_by=['id'])[0]
+        self.assertEqual( task.bug.owner.display_name, launchpad.dataset.people[task.bug.owner_link].display_name)
+
+    ### a later sync only fetches the tasks of the bugs modified since the previous one, and updates them
+    def testIncrementalSync( self) :
+        bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2)
+        lastSync = bug_snapshot.get_meta( self.conn, 'last_sync')
+        openTasks = [task for task in launchpad.dataset.tasks if task.status in bug_snapshot.open_states]
+        for task in openTasks[:3] :
+            closeTask( task)
+        now = datetime.now( tz=timezone.utc)
+        launchpad.dataset.add_bug( 999, 'New bug', ['ui'], next( iter( launchpad.dataset.people)), now, now)
+        launchpad.dataset.add_task( 999, 'New', 'High', now, None, None)
+
+        numTasks = bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2)
+        self.assertEqual( numTasks, 4)
+        self.assertEqual( self.snapshotTasks(), self.datasetTasks())
+        self.assertGreater( bug_snapshot.get_meta( self.conn, 'last_sync'), lastSync)
+        self.assertEqual( bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2), 4)  # margin
+
+    ### a sync that fails keeps the batches written before, and does not move last_sync; the next sync completes it
+    def testFailedSync( self) :
+        bug_snapshot.sync_batch_size = 50
+        FailingLaunchpad.failLink = launchpad.dataset.tasks[120].bug_link
+        failingConnect = lambda : FailingLaunchpad.login_anonymously( 'test')
+        with self.assertRaises( ConnectionError) :
+            bug_snapshot.sync_snapshot( self.conn, self.project, failingConnect, workers=2)
+        self.assertEqual( len( self.snapshotTasks()), 100)
+        self.assertIsNone( bug_snapshot.get_meta( self.conn, 'last_sync'))
+
+        self.assertEqual( bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2), 300)
+        self.assertEqual( self.snapshotTasks(), self.datasetTasks())
+
+    ### a full sync removes the tasks no longer in the project, and their bugs
+    def testFullSyncRemoves( self) :
+        bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2)
+        removed = launchpad.dataset.tasks.pop( 10)
+        bug_snapshot.sync_snapshot( self.conn, self.project, connect, workers=2)
+        self.assertIn( removed.self_link, self.snapshotTasks())  # an incremental sync does not see it
+        bug_snapshot.sync_snapshot( self.conn, self.project, connect, full=True, workers=2)
+        self.assertEqual( self.snapshotTasks(), self.datasetTasks())
+        bugId = launchpad.dataset.bugs[removed.bug_link].id
+        self.assertIsNone( self.conn.execute( 'SELECT id FROM bugs WHERE id = ?', (bugId,)).fetchone())
+
+
+if __name__ == '__main__' :
+    unittest.main()
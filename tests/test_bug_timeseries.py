@@ -0,0 +1,133 @@
+# test_bug_timeseries - tests of the time series of the bugs (launchpad-bugs-tools): the counters per period, their
+# incremental update, and ORTS-Create-Bug-Stats --timeseries against a snapshot synced from the launchpadlib stand-in
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Run from the repository folder: python -m pytest tests (or python -m unittest discover tests)
+#
+
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+toolsDir = pathlib.Path( __file__).resolve().parent.parent / 'launchpad-bugs-tools'
+sys.path.insert( 0, str(toolsDir))
+sys.path.insert( 0, str(toolsDir / 'standin'))
+os.environ.setdefault( 'LP_STANDIN_DATA', 'synthetic:300')
+
+import bug_snapshot
+import bug_timeseries
+from launchpadlib import launchpad
+
+
+def task( link, created, closed=None, status='New', importance='High') :
+    return SimpleNamespace( self_link=link, date_created=datetime.fromisoformat( created).replace( tzinfo=timezone.utc),
+                            date_closed=closed and datetime.fromisoformat( closed).replace( tzinfo=timezone.utc),
+                            status=status, importance=importance)
+
+
+class TimeSeriesTest( unittest.TestCase) :
+
+    def rows( self, series, field='importance', values=('High', 'Low')) :
+        return [(start.isoformat(), opened, closed, backlog, byValue)
+                for start, opened, closed, backlog, byValue in series.rows( field, list(values), until=date( 2025, 4, 15))]
+
+    def testRows( self) :
+        series = bug_timeseries.TimeSeries( 'month')
+        self.assertTrue( series.update( task( 'a', '2025-01-10', '2025-03-05', 'Fix Released')))
+        self.assertTrue( series.update( task( 'b', '2025-02-01', importance='Low')))
+        self.assertEqual( self.rows( series), [
+            ('2025-01-01', 1, 0, 1, {'High': 1, 'Low': 0}),
+            ('2025-02-01', 1, 0, 2, {'High': 1, 'Low': 1}),
+            ('2025-03-01', 0, 1, 1, {'High': 0, 'Low': 1}),
+            ('2025-04-01', 0, 0, 1, {'High': 0, 'Low': 1})])
+        self.assertEqual( [row[4] for row in self.rows( series, 'status', ['Fix Released'])],
+                          [{'Fix Released': 0}, {'Fix Released': 0}, {'Fix Released': 1}, {'Fix Released': 0}])
+
+    def testWeeks( self) :
+        series = bug_timeseries.TimeSeries( 'week')
+        series.update( task( 'a', '2025-03-31', '2025-04-09', 'Invalid'))
+        self.assertEqual( [(bug_timeseries.period_label( start, 'week'), backlog) for start, opened, closed, backlog, byValue
+                           in series.rows( 'importance', ['High'], until=date( 2025, 4, 15))],
+                          [('2025-W14', 1), ('2025-W15', 0), ('2025-W16', 0)])
+
+    ### an update replaces the contribution of a task: the same record changes nothing, a changed one moves the counts
+    def testUpdate( self) :
+        series = bug_timeseries.TimeSeries( 'month')
+        series.update( task( 'a', '2025-01-10', importance='High'))
+        self.assertFalse( series.update( task( 'a', '2025-01-10', importance='High')))
+        self.assertTrue( series.update( task( 'a', '2025-01-10', '2025-02-20', 'Fix Released', 'Low')))
+        rebuilt = bug_timeseries.TimeSeries( 'month')
+        rebuilt.update( task( 'a', '2025-01-10', '2025-02-20', 'Fix Released', 'Low'))
+        self.assertEqual( self.rows( series), self.rows( rebuilt))
+        self.assertEqual( self.rows( series)[0], ('2025-01-01', 1, 0, 1, {'High': 0, 'Low': 1}))
+
+    def testSaveLoad( self) :
+        series = bug_timeseries.TimeSeries( 'month')
+        series.update( task( 'a', '2025-01-10', '2025-03-05', 'Fix Released'))
+        series.last_update = '2025-04-01T00:00:00+00:00'
+        with tempfile.TemporaryDirectory() as tempDir :
+            path = os.path.join( tempDir, 'series.json')
+            series.save( path)
+            loaded = bug_timeseries.load_timeseries( path, 'month')
+            self.assertEqual( loaded.last_update, series.last_update)
+            self.assertEqual( self.rows( loaded), self.rows( series))
+            self.assertEqual( bug_timeseries.load_timeseries( path, 'week').tasks, {})  # another period: empty
+            self.assertEqual( bug_timeseries.load_timeseries( os.path.join( tempDir, 'none.json'), 'month').tasks, {})
+
+
+### the incremental update of ORTS-Create-Bug-Stats --timeseries (from a snapshot) gives the same report as --rebuild
+class CreateBugStatsTest( unittest.TestCase) :
+
+    def setUp( self) :
+        launchpad.dataset = launchpad.synthetic_dataset( 300, 1)
+        self.project = launchpad.Launchpad.login_anonymously( 'test').projects['or']
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.snapshotPath = os.path.join( self.tempDir.name, 'bugs.sqlite')
+        self.conn = bug_snapshot.open_snapshot( self.snapshotPath, create=True)
+
+    def tearDown( self) :
+        self.conn.close()
+        self.tempDir.cleanup()
+
+    def sync( self) :
+        bug_snapshot.sync_snapshot( self.conn, self.project, lambda : launchpad.Launchpad.login_anonymously( 'test'), workers=2)
+
+    def runStats( self, *args) :
+        result = subprocess.run( [sys.executable, str(toolsDir / 'ORTS-Create-Bug-Stats.py'), '--snapshot', self.snapshotPath,
+                                  '--timeseries', 'month'] + list(args), capture_output=True, text=True, cwd=self.tempDir.name)
+        self.assertEqual( result.returncode, 0, result.stderr)
+        return result
+
+    def testIncrementalSameAsRebuild( self) :
+        self.sync()
+        first = self.runStats()
+        self.assertIn( 'Fetching all bug tasks', first.stderr)
+        self.assertTrue( os.path.isfile( bug_timeseries.default_state_path( 'month', self.snapshotPath)))
+
+        now = datetime.now( tz=timezone.utc)
+        openTasks = [task for task in launchpad.dataset.tasks if task.status in bug_snapshot.open_states]
+        for task in openTasks[:5] :
+            task.status = 'Fix Released' ; task.date_closed = now
+            launchpad.dataset.bugs[task.bug_link].date_last_updated = now
+        openTasks[5].importance = 'Critical' if openTasks[5].importance != 'Critical' else 'Low'
+        launchpad.dataset.bugs[openTasks[5].bug_link].date_last_updated = now
+        launchpad.dataset.add_bug( 999, 'New bug', [], next( iter( launchpad.dataset.people)), now, now)
+        launchpad.dataset.add_task( 999, 'New', 'High', now, None, None)
+        self.sync()
+
+        incremental = self.runStats( '--by', 'status')
+        self.assertIn( 'Fetching bug tasks modified since', incremental.stderr)
+        self.assertIn( '7 changed, 301 in time series', incremental.stderr)
+        self.assertNotEqual( incremental.stdout, first.stdout)
+        self.assertEqual( incremental.stdout, self.runStats( '--by', 'status', '--rebuild').stdout)
+        self.assertEqual( self.runStats().stdout, self.runStats( '--rebuild').stdout)
+
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,62 @@
+# test_ortsContent - tests of the parsing of content files
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Run from the repository folder: python -m pytest tests (or python -m unittest discover tests)
+#
+
+import pathlib
+import sys
+import unittest
+
+sys.path.insert( 0, str(pathlib.Path( __file__).resolve().parent.parent))
+
+import ortsContent
+
+
+class DecodeFileTest( unittest.TestCase) :
+
+    def testEmpty( self) :
+        self.assertEqual( ortsContent.decodeFile( b''), '')
+
+    def testEncodings( self) :
+        self.assertEqual( ortsContent.decodeFile( 'Wagon ( x )'.encode( 'utf-8')), 'Wagon ( x )')
+        self.assertEqual( ortsContent.decodeFile( 'Wagon ( x )'.encode( 'utf-16')), 'Wagon ( x )')
+
+
+class ParseConsistTest( unittest.TestCase) :
+
+    ### a backslash at the end of a quoted name is not an escape; the next entry is not swallowed
+    def testTrailingBackslash( self) :
+        text = ('Train ( TrainCfg ( "Test"\n'
+                ' Wagon ( UiD ( 1 ) WagonData ( car "Dir\\" ) )\n'
+                ' Wagon ( UiD ( 2 ) WagonData ( "car 2" Dir2 ) )\n'
+                ') )\n')
+        name, entries = ortsContent.parseConsist( text)
+        self.assertEqual( name, 'Test')
+        self.assertEqual( [(e.uid, e.fileName, e.dirName) for e in entries], [(1, 'car', 'Dir\\'), (2, 'car 2', 'Dir2')])
+
+    ### quoted names with spaces and parentheses, entries over several lines
+    def testQuotedNames( self) :
+        text = ('Train ( TrainCfg ( "Test"\n'
+                ' Engine ( UiD ( 0 ) Flip ( )\n'
+                '  EngineData ( "GP38 (2)" "My Engines" ) )\n'
+                ') )\n')
+        name, entries = ortsContent.parseConsist( text)
+        self.assertEqual( entries, [ortsContent.ConsistEntry( 'Engine', 0, True, 'GP38 (2)', 'My Engines')])
+
+
+class ParseTextTest( unittest.TestCase) :
+
+    ### the block positions, and the block names (without the comment blocks)
+    def testBlocks( self) :
+        text = 'Wagon ( gp38\n Comment ( Skip ( x ) )\n Coupling ( Break ( 1 2 ) )\n)'
+        wagon = ortsContent.parseText( text).block( 'wagon')
+        self.assertEqual( wagon.values(), ['gp38'])
+        self.assertEqual( [block.name for block in wagon.blocks()], ['Coupling'])
+        self.assertEqual( text[wagon.block( 'coupling').pos:].split()[0], 'Coupling')
+        self.assertEqual( ortsContent.getBlockNames( text), {'wagon', 'coupling', 'break'})
+
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,74 @@
+# test_ortsTools - tests of the outliers of the physics values (findOutliers, getRobustScores)
+#
+# Copyright (c) 2025 Roger Fischer. MIT License.
+#
+# Run from the repository folder: python -m pytest tests (or python -m unittest discover tests)
+#
+
+import pathlib
+import sys
+import unittest
+
+sys.path.insert( 0, str(pathlib.Path( __file__).resolve().parent.parent))
+
+import ortsTools
+
+
+### the scanner values of a wagon (see ortsContent.getRollingStockValues), only the columns used by findOutliers
+def wagon( file, weight, subType='_', friction='1 | 2 | 3') :
+    return {'Package': 'Pack', 'Directory': 'Box', 'File': file, 'Type': 'Freight', 'SubType': subType,
+            'Weight': weight, 'Friction': friction}
+
+
+class RobustScoresTest( unittest.TestCase) :
+
+    def testOutlier( self) :
+        median, scores = ortsTools.getRobustScores( [1.0, 1.1, 0.9, 1.05, 0.95, 2.0])
+        self.assertAlmostEqual( median, 1.025)
+        self.assertGreater( scores[-1], 3.5)
+        self.assertTrue( all( abs( score) < 3.5 for score in scores[:-1]))
+
+    ### more than half the values are the same (the MAD is 0): scored by the mean absolute deviation
+    def testZeroMad( self) :
+        median, scores = ortsTools.getRobustScores( [1.0, 1.0, 1.0, 1.0, 2.0])
+        self.assertEqual( median, 1.0)
+        self.assertEqual( scores[:4], [0.0] * 4)
+        self.assertAlmostEqual( scores[4], 1 / (1.253314 * 0.2))
+
+    ### all the values are the same: no scores
+    def testIdentical( self) :
+        self.assertEqual( ortsTools.getRobustScores( [1.5] * 6), (1.5, None))
+
+
+class FindOutliersTest( unittest.TestCase) :
+
+    ### a 10x weight typo is an outlier; the others are not
+    def testOutlier( self) :
+        rows = [wagon( 'w{}.wag'.format(i), weight) for i, weight in enumerate( ['30t', '32t', '31t', '29t', '30t', '300t'])]
+        outliers = list( ortsTools.findOutliers( rows, missing=False))
+        self.assertEqual( [(row.metric, row.file, row.value, row.group, row.groupSize) for row in outliers],
+                          [('Weight', 'w5.wag', 300.0, 'Freight/_', 6)])
+        self.assertGreater( outliers[0].severity, 3.5)
+        self.assertAlmostEqual( outliers[0].median, 30.5, places=0)
+
+    def testIdenticalValues( self) :
+        rows = [wagon( 'w{}.wag'.format(i), '30t') for i in range( 8)]
+        self.assertEqual( list( ortsTools.findOutliers( rows, missing=False)), [])
+
+    ### a group below the minimum size is not scored; a small SubType is compared to all the vehicles of its Type
+    def testMinGroup( self) :
+        rows = [wagon( 'w{}.wag'.format(i), weight) for i, weight in enumerate( ['30t', '31t', '300t', '29t'])]
+        self.assertEqual( list( ortsTools.findOutliers( rows, minGroup=5, missing=False)), [])
+        rows += [wagon( 't{}.wag'.format(i), '30t', subType='Tank') for i in range( 2)]
+        outliers = list( ortsTools.findOutliers( rows, minGroup=5, missing=False))
+        self.assertEqual( [(row.file, row.group, row.groupSize) for row in outliers], [('w2.wag', 'Freight/*', 6)])
+
+    ### the vehicles without Davis coefficients or weight come after the outliers, without severity
+    def testMissing( self) :
+        rows = [wagon( 'w0.wag', '30t', friction='_'), wagon( 'w1.wag', '_')]
+        self.assertEqual( [(row.severity, row.metric, row.file) for row in ortsTools.findOutliers( rows)],
+                          [(None, 'Davis', 'w0.wag'), (None, 'Weight', 'w1.wag')])
+
+
+if __name__ == '__main__' :
+    unittest.main()